@@ -0,0 +1,66 @@
+"""
+Per-request setup cost of get_structured_response's chain: building the
+LLM client, parser, format instructions and prompt on every call versus
+looking the chain up in the per-process registry. Nothing is sent to Gemini.
+
+    python -m benchmarks.chain_setup_bench [--iterations 200] [--output results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+os.environ.setdefault("GOOGLE_LLM_MODEL", "gemini-2.0-flash")
+
+from benchmarks import results as bench_results
+from domain.captions_dto import CaptiononResponse
+from domain.images_dto import ImageGenerationResponse
+from domain.videos_dto import StoryboardResponse
+from infrastructure.ai_services import build_chain, get_chain
+from templates.prompt_templates import (
+    Caption_PROMPT_TEMPLATE,
+    IMAGE_GENERATION_PROMPT_TEMPLATE,
+    STORYBOARD_PROMPT_TEMPLATE,
+)
+
+CASES = {
+    "storyboard": (STORYBOARD_PROMPT_TEMPLATE, StoryboardResponse),
+    "caption": (Caption_PROMPT_TEMPLATE, CaptiononResponse),
+    "image_prompt": (IMAGE_GENERATION_PROMPT_TEMPLATE, ImageGenerationResponse),
+}
+
+
+def time_calls(fn, iterations: int) -> dict:
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", default=None, help="Also save the results as a JSON result file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, (template, model) in CASES.items():
+        results[name] = {
+            "rebuild_per_request": time_calls(lambda: build_chain(template, model), args.iterations),
+            "registry": time_calls(lambda: get_chain(template, model), args.iterations),
+        }
+    print(json.dumps(results, indent=2))
+    if args.output:
+        bench_results.save("chain_setup_bench", results, args.output, vars(args))
+
+
+if __name__ == "__main__":
+    main()
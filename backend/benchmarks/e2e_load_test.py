@@ -0,0 +1,317 @@
+"""
+End-to-end load test of a running stack (API, Celery workers, Horde poller,
+Redis, MinIO), from request to finished artifact.
+
+Virtual users loop over a weighted mix of /generate/*, /render/image,
+/render/video and /schedule. Render and schedule requests are followed on
+/tasks/{id} (or its /events stream with --follow sse) until the task is
+finished, so their latency covers the whole path: queueing, Stable Horde
+polling, Pixabay/Freesound downloads, ffmpeg stitching and the MinIO upload. Meanwhile the Celery queue depth and
+worker utilization are sampled, and Prometheus endpoints passed with
+--scrape are diffed over the run.
+
+Run the stack against the local stand-ins (benchmarks/stubs.py and
+LLM_BACKEND=fake, see docker-compose.bench.yml), then:
+
+    python -m benchmarks.e2e_load_test [--base-url http://localhost:8000] [--users 8] [--duration 120] [--follow sse]
+        [--mix generate=6,render_image=2,render_video=1,schedule=1] [--scrape http://localhost:8000/metrics]
+        [--output results.json] [--baseline previous.json --tolerance 0.15]
+
+p50/p95/p99 latency and throughput per scenario are written to a JSON file
+(benchmarks/results/ by default). With --baseline, the exit code is 1 when
+a latency percentile or throughput regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import redis
+
+from benchmarks import results as bench_results
+
+BRAND = {"name": "Acme", "colors": ["#c85a28", "#ffffff"], "tone": "warm", "default_hashtags": ["#acme"]}
+IDEAS = ["morning coffee ritual", "summer sale on sneakers", "behind the scenes at the bakery", "new yoga class"]
+
+TERMINAL_STATUSES = {"ready", "failed", "FAILURE", "REVOKED"}
+
+
+class Recorder:
+    def __init__(self):
+        self.request_latency: Dict[str, List[float]] = defaultdict(list)
+        self.artifact_latency: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.completed: Dict[str, int] = defaultdict(int)
+        self.status_requests = 0
+
+    def summary(self, wall: float) -> dict:
+        summary = {}
+        for scenario in sorted(set(self.request_latency) | set(self.errors)):
+            entry = {
+                "completed": self.completed[scenario],
+                "errors": self.errors[scenario],
+                "throughput_per_s": round(self.completed[scenario] / wall, 3),
+                "request": bench_results.percentiles(self.request_latency[scenario]),
+            }
+            if self.artifact_latency[scenario]:
+                entry["request_to_artifact"] = bench_results.percentiles(self.artifact_latency[scenario])
+            summary[scenario] = entry
+        return summary
+
+
+class Scenarios:
+    """
+    One coroutine per scenario; each raises on failure and records its own latencies.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, args):
+        self.client = client
+        self.recorder = recorder
+        self.args = args
+        self.random = random.Random(args.seed)
+
+    async def _post(self, scenario: str, path: str, payload: dict) -> dict:
+        started = time.perf_counter()
+        response = await self.client.post(path, json=payload)
+        self.recorder.request_latency[scenario].append(time.perf_counter() - started)
+        response.raise_for_status()
+        return response.json()
+
+    async def _wait_for_task(self, task_id: str) -> dict:
+        if self.args.follow == "sse":
+            return await self._watch_task(task_id)
+        deadline = time.monotonic() + self.args.artifact_timeout
+        while time.monotonic() < deadline:
+            self.recorder.status_requests += 1
+            response = await self.client.get(f"/tasks/{task_id}")
+            response.raise_for_status()
+            status = response.json()
+            if status.get("status") in TERMINAL_STATUSES:
+                if status["status"] != "ready":
+                    raise Exception(f"Task {task_id} ended as {status['status']}")
+                return status
+            await asyncio.sleep(self.args.poll_interval)
+        raise Exception(f"Task {task_id} not finished after {self.args.artifact_timeout}s")
+
+    async def _watch_task(self, task_id: str) -> dict:
+        self.recorder.status_requests += 1
+        async with asyncio.timeout(self.args.artifact_timeout):
+            async with self.client.stream("GET", f"/tasks/{task_id}/events", timeout=None) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    status = json.loads(line[len("data: "):])
+                    if "detail" in status:
+                        raise Exception(status["detail"])
+                    if status.get("status") in TERMINAL_STATUSES:
+                        if status["status"] != "ready":
+                            raise Exception(f"Task {task_id} ended as {status['status']}")
+                        return status
+        raise Exception(f"Status stream of task {task_id} ended early")
+
+    async def _artifact(self, scenario: str, path: str, payload: dict, task_key: str = "task_id"):
+        started = time.perf_counter()
+        created = await self._post(scenario, path, payload)
+        if created.get("status") != "ready":
+            await self._wait_for_task(created[task_key])
+        self.recorder.artifact_latency[scenario].append(time.perf_counter() - started)
+
+    def _idea(self) -> str:
+        idea = self.random.choice(IDEAS)
+        # Unique ideas keep the LLM cache and render deduplication out of the measurement
+        return f"{idea} {uuid.uuid4().hex[:8]}" if self.args.unique else idea
+
+    async def generate(self):
+        kind = self.random.choice(["caption", "storyboard", "image", "post-kit"])
+        payload = {"idea": self._idea(), "platform": "instagram", "brand_presets": BRAND, "use_cache": not self.args.unique}
+        if kind == "storyboard":
+            payload.update(language="English", cta="Shop now", number_of_shots=3)
+        if kind == "image":
+            payload = {"prompt": payload["idea"], "platform": "instagram", "brand_presets": BRAND,
+                       "use_cache": payload["use_cache"]}
+        await self._post("generate", f"/generate/{kind}", payload)
+
+    async def render_image(self):
+        payload = {"prompt_used": self._idea(), "style": "realistic", "aspect_ratio": "1:1", "platform": "instagram"}
+        await self._artifact("render_image", "/render/image", payload)
+
+    async def render_video(self):
+        idea = self._idea()
+        payload = {
+            "shots": [{"duration": 3, "text": f"{idea} shot {i}"} for i in range(3)],
+            "music": self.random.choice(["upbeat", "acoustic", "electronic"]),
+            "profile": {"preset": "veryfast", "platform": "reels"},
+        }
+        await self._artifact("render_video", "/render/video", payload)
+
+    async def schedule(self):
+        payload = {"asset_id": self.args.asset_url, "platforms": ["instagram"], "post_text": self._idea()}
+        await self._artifact("schedule", "/schedule", payload, task_key="postID")
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+async def virtual_user(scenarios: Scenarios, weights: Dict[str, float], deadline: float):
+    names, values = list(weights), list(weights.values())
+    while time.monotonic() < deadline:
+        name = scenarios.random.choices(names, values)[0]
+        try:
+            await getattr(scenarios, name)()
+            scenarios.recorder.completed[name] += 1
+        except Exception as e:
+            scenarios.recorder.errors[name] += 1
+            logging.getLogger("e2e_load_test").warning(f"{name} failed: {e}")
+
+
+class StackSampler:
+    """
+    Samples the Celery queue depth, outstanding Horde jobs and worker
+    utilization (busy pool slots / all pool slots) while the test runs.
+    """
+
+    def __init__(self, broker_url: Optional[str], queues: List[str], interval: float):
+        self.redis = redis.Redis.from_url(broker_url) if broker_url else None
+        self.queues = queues
+        self.interval = interval
+        self.samples = defaultdict(list)
+
+    def _sample_queues(self):
+        for queue in self.queues:
+            self.samples[f"queue_depth.{queue}"].append(self.redis.llen(queue))
+        self.samples["horde_jobs_outstanding"].append(self.redis.hlen("horde:jobs"))
+
+    def _sample_workers(self):
+        from infrastructure.celery_app import celery_app
+
+        inspect = celery_app.control.inspect(timeout=max(self.interval / 2, 0.5))
+        active = inspect.active() or {}
+        stats = inspect.stats() or {}
+        slots = sum(worker.get("pool", {}).get("max-concurrency", 0) for worker in stats.values())
+        if slots:
+            self.samples["worker_utilization"].append(sum(len(tasks) for tasks in active.values()) / slots)
+
+    async def run(self, done: asyncio.Event):
+        while not done.is_set():
+            try:
+                if self.redis is not None:
+                    await asyncio.to_thread(self._sample_queues)
+                await asyncio.to_thread(self._sample_workers)
+            except Exception as e:
+                logging.getLogger("e2e_load_test").warning(f"Sampling failed: {e}")
+            try:
+                await asyncio.wait_for(done.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def summary(self) -> dict:
+        return {
+            name: {"mean": round(sum(values) / len(values), 3), "max": round(max(values), 3)}
+            for name, values in self.samples.items()
+            if values
+        }
+
+
+async def scrape(client: httpx.AsyncClient, urls: List[str]) -> Dict[str, float]:
+    """
+    Counter and summary samples of Prometheus endpoints, keyed by name and labels.
+    """
+    from prometheus_client.parser import text_string_to_metric_families
+
+    samples = {}
+    for url in urls:
+        response = await client.get(url)
+        response.raise_for_status()
+        for family in text_string_to_metric_families(response.text):
+            for sample in family.samples:
+                labels = ",".join(f"{key}={value}" for key, value in sorted(sample.labels.items()))
+                samples[f"{sample.name}{{{labels}}}"] = sample.value
+    return samples
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=8, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=120, help="Seconds to keep starting new requests")
+    parser.add_argument("--mix", default="generate=6,render_image=2,render_video=1,schedule=1")
+    parser.add_argument("--unique", action=argparse.BooleanOptionalAction, default=True,
+                        help="Vary every request so caches and render deduplication do not short-circuit it")
+    parser.add_argument("--asset-url", default="http://stubs:8900/media/image.webp",
+                        help="Image the workers download for /schedule")
+    parser.add_argument("--follow", choices=["poll", "sse"], default="poll",
+                        help="Follow tasks by polling /tasks/{id} or on its /events stream")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--artifact-timeout", type=float, default=600)
+    parser.add_argument("--broker-url", default=os.getenv("CELERY_BROKER_URI"))
+    parser.add_argument("--queues", default="video,image,publish,reminders,celery",
+                        help="Comma separated Celery queues to sample")
+    parser.add_argument("--sample-interval", type=float, default=2.0)
+    parser.add_argument("--scrape", action="append", default=[], help="Prometheus endpoint to diff over the run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    parser.add_argument("--baseline", default=None, help="Earlier result file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    weights = parse_mix(args.mix)
+    recorder = Recorder()
+    sampler = StackSampler(args.broker_url, args.queues.split(","), args.sample_interval)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=httpx.Timeout(120, connect=10)) as client:
+        before = await scrape(client, args.scrape) if args.scrape else {}
+        scenarios = Scenarios(client, recorder, args)
+        done = asyncio.Event()
+        sampling = asyncio.create_task(sampler.run(done))
+
+        started = time.perf_counter()
+        deadline = time.monotonic() + args.duration
+        await asyncio.gather(*(virtual_user(scenarios, weights, deadline) for _ in range(args.users)))
+        wall = time.perf_counter() - started
+        done.set()
+        await sampling
+        after = await scrape(client, args.scrape) if args.scrape else {}
+
+    results = {
+        "wall_s": round(wall, 2),
+        "scenarios": recorder.summary(wall),
+        "status_requests": recorder.status_requests,
+        "stack": sampler.summary(),
+        "metrics_delta": {
+            name: round(value - before.get(name, 0), 6) for name, value in sorted(after.items())
+            if value != before.get(name, 0)
+        },
+    }
+    config = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    config["env"] = {key: os.getenv(key) for key in ("LLM_BACKEND", "LLM_FAKE_LATENCY", "STABLE_HORDE_POLL_MODE")}
+    path = bench_results.save("e2e_load_test", results, args.output, config)
+    print(json.dumps(results["scenarios"], indent=2))
+    print(f"Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(path) as f:
+            regressions = bench_results.compare(json.load(f), baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Concurrency of /generate/caption under a burst, with the LLM replaced by a
+fixed-latency stand-in (no network, no Redis: the response cache is bypassed).
+
+Fires ``--requests`` simultaneous caption requests at the async route and at
+the same handler mounted as a sync ``def`` route, and meanwhile polls a sync
+status-style route to show whether it is starved of threadpool threads.
+
+    python -m benchmarks.generate_load_test [--requests 200] [--latency 1.0]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+
+os.environ.setdefault("GOOGLE_LLM_MODEL", "load-test")
+
+import httpx
+from fastapi import APIRouter
+from langchain_core.runnables import RunnableLambda
+
+import infrastructure.ai_services as ai_services
+from delivery.api.controllers import captions_controller
+from delivery.main import create_app
+from domain.captions_dto import CaptionRequest, CaptiononResponse
+
+PAYLOAD = {
+    "idea": "morning coffee",
+    "brand_presets": {"name": "Acme", "colors": ["#000"], "tone": "warm", "default_hashtags": ["#acme"]},
+    "use_cache": False,
+}
+
+
+def install_fake_llm(latency: float):
+    def invoke(_):
+        time.sleep(latency)
+        return CaptiononResponse(caption="ok", hashtags=["#ok"])
+
+    async def ainvoke(_):
+        await asyncio.sleep(latency)
+        return CaptiononResponse(caption="ok", hashtags=["#ok"])
+
+    chain = RunnableLambda(invoke, afunc=ainvoke)
+    ai_services.get_chain = lambda *args, **kwargs: chain
+
+
+def build_app():
+    app = create_app()
+    bench = APIRouter()
+
+    @bench.post("/bench/sync/generate/caption")
+    def generate_caption_sync(request: CaptionRequest):
+        return captions_controller.generate_caption_controller(request)
+
+    @bench.get("/bench/status")
+    def status():
+        return {"status": "queued"}
+
+    app.include_router(bench)
+    return app
+
+
+async def burst(client: httpx.AsyncClient, path: str, count: int) -> dict:
+    probe_latencies = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            started = time.perf_counter()
+            await client.get("/bench/status")
+            probe_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.05)
+
+    prober = asyncio.create_task(probe())
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(client.post(path, json=PAYLOAD) for _ in range(count)))
+    wall = time.perf_counter() - started
+    done.set()
+    await prober
+
+    return {
+        "requests": count,
+        "ok": sum(response.status_code == 200 for response in responses),
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(count / wall, 1),
+        "status_probe_max_s": round(max(probe_latencies), 3) if probe_latencies else None,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=1.0, help="Simulated LLM latency in seconds")
+    args = parser.parse_args()
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    install_fake_llm(args.latency)
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        results = {
+            "sync_def_route": await burst(client, "/bench/sync/generate/caption", args.requests),
+            "async_route": await burst(client, "/generate/caption", args.requests),
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Render time for a storyboard with repeated search terms, streaming remote
+clip URLs into ffmpeg (before) versus reading them through the media cache
+(after, cold and warm).
+
+Clips are generated locally with ffmpeg and served by a throttled HTTP
+server that stands in for the Pixabay/Freesound CDNs.
+
+    python -m benchmarks.media_cache_bench --latency 0.2 --kbps 4000
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from infrastructure.media_cache import MediaCache
+from usecases.tasks import stitch_clips
+
+TERMS = ["coffee", "beach", "coffee", "city", "beach", "coffee"]
+
+
+class ThrottledHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+    bytes_per_second = 0
+
+    def copyfile(self, source, outputfile):
+        time.sleep(self.latency)
+        while chunk := source.read(64 * 1024):
+            outputfile.write(chunk)
+            if self.bytes_per_second:
+                time.sleep(len(chunk) / self.bytes_per_second)
+
+    def log_message(self, *args):
+        pass
+
+
+def make_samples(directory: str):
+    for i, term in enumerate(sorted(set(TERMS))):
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", f"testsrc=size=960x540:rate=25:duration=6",
+             "-vf", f"hue=h={i * 90}", "-c:v", "libx264", "-pix_fmt", "yuv420p", os.path.join(directory, f"{term}.mp4")],
+            check=True,
+        )
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", "sine=frequency=440:duration=30",
+         "-c:a", "libmp3lame", os.path.join(directory, "music.mp3")],
+        check=True,
+    )
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return round(time.perf_counter() - started, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each response")
+    parser.add_argument("--kbps", type=int, default=4000, help="per-connection bandwidth in kB/s, 0 for unlimited")
+    args = parser.parse_args()
+
+    samples = tempfile.mkdtemp()
+    make_samples(samples)
+    ThrottledHandler.latency = args.latency
+    ThrottledHandler.bytes_per_second = args.kbps * 1024
+    server = ThreadingHTTPServer(("127.0.0.1", 0), partial(ThrottledHandler, directory=samples))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    clip_urls = [f"{base}/{term}.mp4" for term in TERMS]
+    music_url = f"{base}/music.mp3"
+    durations = [3] * len(TERMS)
+    output = os.path.join(tempfile.mkdtemp(), "out.mp4")
+    cache = MediaCache(tempfile.mkdtemp(), max_bytes=1024**3)
+
+    def cached_render():
+        with cache.lease() as lease:
+            paths = lease.fetch_all(clip_urls + [music_url])
+            stitch_clips(paths[:-1], durations, output, paths[-1])
+
+    results = {
+        "shots": len(TERMS),
+        "distinct_terms": len(set(TERMS)),
+        "latency_s": args.latency,
+        "kbps": args.kbps,
+        "remote_urls_s": timed(lambda: stitch_clips(clip_urls, durations, output, music_url)),
+        "media_cache_cold_s": timed(cached_render),
+        "media_cache_warm_s": timed(cached_render),
+    }
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Latency and prompt size of one /generate/post-kit call against the three
+separate storyboard, caption and image-prompt calls, on the live Gemini API
+(needs GOOGLE_API_KEY and GOOGLE_LLM_MODEL; the LLM cache is bypassed).
+
+    python -m benchmarks.post_kit_bench [--repeat 5]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from domain.brand_dto import Brand
+from domain.captions_dto import CaptionRequest
+from domain.images_dto import ImageGenerationRequest
+from domain.post_kit_dto import PostKitRequest
+from domain.videos_dto import StoryboardRequest
+from usecases.captions_service import agenerate_captions
+from usecases.images_service import agenerate_image_prompt
+from usecases.post_kit_service import agenerate_post_kit
+from usecases.videos_service import agenerate_storyboard
+
+BRAND = Brand(name="Acme Coffee", colors=["#3b2f2f", "#f5deb3"], tone="warm and playful", default_hashtags=["#acme"])
+IDEA = "a cozy autumn morning with our new pumpkin latte"
+PLATFORM = "instagram"
+
+
+async def three_calls(sequential: bool):
+    calls = [
+        lambda: agenerate_storyboard(StoryboardRequest(
+            idea=IDEA, language="English", number_of_shots=3, platform=PLATFORM, brand_presets=BRAND,
+            cta="order now", use_cache=False,
+        )),
+        lambda: agenerate_captions(CaptionRequest(idea=IDEA, platform=PLATFORM, brand_presets=BRAND, use_cache=False)),
+        lambda: agenerate_image_prompt(ImageGenerationRequest(
+            prompt=IDEA, platform=PLATFORM, brand_presets=BRAND, use_cache=False,
+        )),
+    ]
+    if sequential:
+        for call in calls:
+            await call()
+    else:
+        await asyncio.gather(*(call() for call in calls))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = {"three_calls_sequential": [], "three_calls_parallel": [], "post_kit": []}
+    report = None
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        await three_calls(sequential=True)
+        timings["three_calls_sequential"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await three_calls(sequential=False)
+        timings["three_calls_parallel"].append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        kit = await agenerate_post_kit(PostKitRequest(
+            idea=IDEA, platform=PLATFORM, brand_presets=BRAND, cta="order now", use_cache=False,
+        ))
+        timings["post_kit"].append(time.perf_counter() - started)
+        report = kit.report
+
+    print(json.dumps({
+        "p50_seconds": {name: round(statistics.median(values), 2) for name, values in timings.items()},
+        "last_post_kit_report": report.model_dump(),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
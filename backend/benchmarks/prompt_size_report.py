@@ -0,0 +1,29 @@
+"""
+How much of each prompt is the template itself and how much is the
+PydanticOutputParser format instructions (JSON schema) appended to it.
+No model calls are made.
+
+    python -m benchmarks.prompt_size_report
+"""
+import json
+
+from domain.captions_dto import CaptiononResponse
+from domain.images_dto import ImageGenerationResponse
+from domain.post_kit_dto import PostKitDraft
+from domain.videos_dto import StoryboardResponse
+from infrastructure.llm_instrumentation import prompt_size_report
+
+RESPONSE_MODELS = {
+    "storyboard": StoryboardResponse,
+    "caption": CaptiononResponse,
+    "image_generation": ImageGenerationResponse,
+    "post_kit": PostKitDraft,
+}
+
+
+def main():
+    print(json.dumps(prompt_size_report(RESPONSE_MODELS), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Wall time and output size of stitch_clips across render profiles, on a
+fixed set of locally generated sample clips (no network involved).
+
+    python -m benchmarks.render_profiles_bench [--repeat 3] [--output results.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from benchmarks import results as bench_results
+from domain.videos_dto import RenderProfile
+from usecases.tasks import stitch_clips
+
+# Mixed sources like Pixabay returns them: different sizes and frame rates
+SAMPLES = [
+    ("testsrc2", "1920x1080", 30),
+    ("mandelbrot", "1280x720", 25),
+    ("testsrc", "960x540", 24),
+    ("smptebars", "1920x1080", 60),
+]
+
+PROFILES = {
+    "ultrafast_16x9": RenderProfile(preset="ultrafast", platform="youtube"),
+    "veryfast_16x9": RenderProfile(preset="veryfast", platform="youtube"),
+    "medium_16x9": RenderProfile(preset="medium", platform="youtube"),
+    "veryfast_reels_9x16": RenderProfile(preset="veryfast", platform="reels"),
+    "veryfast_feed_1x1": RenderProfile(preset="veryfast", platform="feed"),
+    "veryfast_crf28_2threads": RenderProfile(preset="veryfast", crf=28, threads=2),
+}
+
+
+def make_samples(directory: str) -> list[str]:
+    paths = []
+    for i, (source, size, rate) in enumerate(SAMPLES):
+        path = os.path.join(directory, f"clip_{i}.mp4")
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", f"{source}=size={size}:rate={rate}", "-t", "5",
+             "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path],
+            check=True,
+        )
+        paths.append(path)
+    music = os.path.join(directory, "music.mp3")
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", "sine=frequency=330:duration=8",
+         "-c:a", "libmp3lame", music],
+        check=True,
+    )
+    return paths + [music]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--output", default=None, help="Also save the results as a JSON result file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    *clips, music = make_samples(workdir)
+    durations = [4] * len(clips)
+
+    results = []
+    for name, profile in PROFILES.items():
+        output = os.path.join(workdir, f"{name}.mp4")
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            stitch_clips(clips, durations, output, music, profile)
+            timings.append(time.perf_counter() - started)
+        results.append(
+            {
+                "profile": name,
+                "settings": profile.model_dump(),
+                "resolution": "x".join(map(str, profile.resolution())),
+                "wall_time_s": round(min(timings), 3),
+                "size_bytes": os.path.getsize(output),
+            }
+        )
+    print(json.dumps(results, indent=2))
+    if args.output:
+        bench_results.save("render_profiles_bench", results, args.output, vars(args))
+
+
+if __name__ == "__main__":
+    main()
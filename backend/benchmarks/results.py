@@ -0,0 +1,85 @@
+"""
+Shared helpers for benchmark output: latency percentiles, and JSON result
+files that can be compared release over release.
+"""
+import datetime
+import json
+import os
+import platform
+import subprocess
+from typing import Dict, List, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    """
+    Nearest-rank p50/p95/p99 of ``samples`` (seconds), reported in milliseconds.
+    """
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    ordered = sorted(samples)
+
+    def rank(q: float) -> float:
+        return round(ordered[max(0, int(len(ordered) * q + 0.5) - 1)] * 1000, 1)
+
+    return {"p50_ms": rank(0.50), "p95_ms": rank(0.95), "p99_ms": rank(0.99)}
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save(benchmark: str, results, output: Optional[str] = None, config: Optional[dict] = None) -> str:
+    """
+    Writes ``results`` with the revision, time and settings they were taken
+    with. Defaults to benchmarks/results/<benchmark>-<timestamp>.json.
+    Returns the path written.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{benchmark}-{now.strftime('%Y%m%dT%H%M%SZ')}.json")
+    document = {
+        "benchmark": benchmark,
+        "revision": _git_revision(),
+        "created_at": now.isoformat(),
+        "python": platform.python_version(),
+        "config": config or {},
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    return output
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Regressions of ``current`` against ``baseline`` result documents: any
+    latency (``*_ms``, ``*time_s``) more than ``tolerance`` (a fraction)
+    higher, or any throughput more than ``tolerance`` lower, matched by
+    key path.
+    """
+    regressions = []
+
+    def walk(now, before, path):
+        if isinstance(now, dict) and isinstance(before, dict):
+            for key in now.keys() & before.keys():
+                walk(now[key], before[key], f"{path}.{key}" if path else key)
+        elif isinstance(now, list) and isinstance(before, list):
+            for i, (item_now, item_before) in enumerate(zip(now, before)):
+                walk(item_now, item_before, f"{path}[{i}]")
+        elif isinstance(now, (int, float)) and isinstance(before, (int, float)) and before:
+            name = path.rsplit(".", 1)[-1]
+            if name.endswith(("_ms", "time_s")) and now > before * (1 + tolerance):
+                regressions.append(f"{path}: {before} -> {now}")
+            elif name.startswith("throughput") and now < before * (1 - tolerance):
+                regressions.append(f"{path}: {before} -> {now}")
+
+    walk(current.get("results"), baseline.get("results"), "")
+    return sorted(regressions)
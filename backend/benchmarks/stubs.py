@@ -0,0 +1,144 @@
+"""
+Local stand-ins for Stable Horde, Pixabay, Freesound and Ayrshare, so the
+full request-to-artifact path can be load tested without third-party
+quotas. MinIO and Redis are already local (docker compose); pair this with
+LLM_BACKEND=fake for the LLM.
+
+Point the app at it with:
+
+    STABLE_HORDE_BASE_URL=http://stubs:8900/horde/api/v2
+    PIXABAY_VIDEO_URL=http://stubs:8900/pixabay/api/videos/
+    FREESOUND_SEARCH_URL=http://stubs:8900/freesound/apiv2/search/text/
+    AYRSHARE_POST_URL=http://stubs:8900/ayrshare/api/post
+
+    python -m benchmarks.stubs [--port 8900] [--public-url http://stubs:8900] [--horde-seconds 8]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import subprocess
+import tempfile
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse
+from PIL import Image
+
+CLIP_COUNT = 4
+CLIP_SOURCES = ["testsrc2", "mandelbrot", "testsrc", "smptebars"]
+
+
+def make_media(directory: str):
+    """
+    Sample clips (H.264, like Pixabay's), a music preview and a generated image.
+    """
+    for i in range(CLIP_COUNT):
+        subprocess.run(
+            ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", f"{CLIP_SOURCES[i]}=size=640x360:rate=25", "-t", "6",
+             "-c:v", "libx264", "-pix_fmt", "yuv420p", os.path.join(directory, f"clip_{i}.mp4")],
+            check=True,
+        )
+    subprocess.run(
+        ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", "sine=frequency=440:duration=30",
+         "-b:a", "64k", os.path.join(directory, "music.mp3")],
+        check=True,
+    )
+    Image.new("RGB", (512, 512), (200, 120, 40)).save(os.path.join(directory, "image.webp"))
+
+
+def create_stub_app(media_dir: str, public_url: str, horde_seconds: float, api_latency: float) -> FastAPI:
+    app = FastAPI(title="SocialSpark upstream stubs")
+    # Stable Horde request id -> submit time
+    generations: dict[str, float] = {}
+
+    async def latency():
+        if api_latency:
+            await asyncio.sleep(api_latency)
+
+    @app.post("/horde/api/v2/generate/async", status_code=202)
+    async def horde_submit():
+        await latency()
+        request_id = str(uuid.uuid4())
+        generations[request_id] = time.time()
+        return {"id": request_id, "kudos": 10}
+
+    @app.get("/horde/api/v2/generate/check/{request_id}")
+    async def horde_check(request_id: str):
+        await latency()
+        if request_id not in generations:
+            raise HTTPException(404, "Request not found")
+        remaining = max(0.0, generations[request_id] + horde_seconds - time.time())
+        return {
+            "done": remaining == 0,
+            "faulted": False,
+            "finished": int(remaining == 0),
+            "processing": int(remaining > 0),
+            "waiting": 0,
+            "queue_position": 0,
+            "wait_time": round(remaining),
+            "is_possible": True,
+        }
+
+    @app.get("/horde/api/v2/generate/status/{request_id}")
+    async def horde_status(request_id: str):
+        await latency()
+        if request_id not in generations:
+            raise HTTPException(404, "Request not found")
+        return {
+            "done": True,
+            "generations": [{
+                "img": f"{public_url}/media/image.webp",
+                "seed": "1",
+                "worker_id": "stub",
+                "worker_name": "stub",
+                "model": "stable_diffusion",
+            }],
+        }
+
+    @app.get("/pixabay/api/videos/")
+    async def pixabay_search(q: str = ""):
+        await latency()
+        clip = int(hashlib.sha256(q.encode()).hexdigest(), 16) % CLIP_COUNT
+        return {"total": 1, "hits": [{"videos": {"tiny": {"url": f"{public_url}/media/clip_{clip}.mp4"}}}]}
+
+    @app.get("/freesound/apiv2/search/text/")
+    async def freesound_search(query: str = ""):
+        await latency()
+        return {"count": 1, "results": [{"previews": {"preview-lq-mp3": f"{public_url}/media/music.mp3"}}]}
+
+    @app.post("/ayrshare/api/post")
+    async def ayrshare_post():
+        await latency()
+        return {"status": "success", "id": str(uuid.uuid4())}
+
+    @app.get("/media/{name}")
+    def media(name: str):
+        path = os.path.join(media_dir, os.path.basename(name))
+        if not os.path.exists(path):
+            raise HTTPException(404, "Not found")
+        return FileResponse(path)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--public-url", default=None, help="Base URL the app and workers reach the stubs on")
+    parser.add_argument("--horde-seconds", type=float, default=8.0, help="Time until a Stable Horde job is done")
+    parser.add_argument("--api-latency", type=float, default=0.05, help="Seconds added to every API response")
+    args = parser.parse_args()
+
+    media_dir = tempfile.mkdtemp(prefix="socialspark-stubs-")
+    make_media(media_dir)
+    public_url = (args.public_url or f"http://localhost:{args.port}").rstrip("/")
+    app = create_stub_app(media_dir, public_url, args.horde_seconds, args.api_latency)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
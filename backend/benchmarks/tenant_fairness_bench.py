@@ -0,0 +1,116 @@
+"""
+How long a small tenant's render waits behind another tenant's campaign.
+
+One tenant submits --flood bulk video renders at once; --probe-delay
+seconds later each of --probes other tenants submits a single render (with
+--probe-priority). All tasks are followed with POST /tasks:status until
+they finish. With the fair dispatcher the probes finish after about one
+render's time instead of after the whole campaign; compare against a stack
+running RENDER_DISPATCH_MODE=direct.
+
+    python -m benchmarks.tenant_fairness_bench [--base-url http://localhost:8000] [--flood 40] [--probes 3]
+        [--probe-priority interactive|bulk] [--probe-delay 5] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+
+from benchmarks import results as bench_results
+
+TERMINAL_STATUSES = {"ready", "failed", "FAILURE", "REVOKED"}
+
+
+def video_payload(tenant: str, priority: str) -> dict:
+    # Unique shot texts keep render deduplication out of the measurement
+    tag = uuid.uuid4().hex[:8]
+    return {
+        "shots": [{"duration": 3, "text": f"{tenant} {tag} shot {i}"} for i in range(3)],
+        "music": "upbeat",
+        "profile": {"preset": "veryfast", "platform": "reels"},
+        "tenant": tenant,
+        "priority": priority,
+    }
+
+
+async def submit(client: httpx.AsyncClient, tenant: str, priority: str) -> str:
+    response = await client.post("/render/video", json=video_payload(tenant, priority))
+    response.raise_for_status()
+    return response.json()["task_id"]
+
+
+async def follow(client: httpx.AsyncClient, submitted: Dict[str, float], timeout: float, interval: float) -> Dict[str, dict]:
+    """
+    Polls the pending tasks in bulk; returns each task's final status and
+    seconds from submission to completion.
+    """
+    finished = {}
+    deadline = time.monotonic() + timeout
+    while len(finished) < len(submitted) and time.monotonic() < deadline:
+        pending = [task_id for task_id in submitted if task_id not in finished]
+        for i in range(0, len(pending), 500):
+            response = await client.post("/tasks:status", json={"task_ids": pending[i : i + 500]})
+            response.raise_for_status()
+            for item in response.json()["results"]:
+                if item["status"] in TERMINAL_STATUSES:
+                    finished[item["task_id"]] = {
+                        "status": item["status"],
+                        "seconds": time.perf_counter() - submitted[item["task_id"]],
+                    }
+        await asyncio.sleep(interval)
+    return finished
+
+
+def summarize(task_ids: List[str], finished: Dict[str, dict]) -> dict:
+    done = [finished[task_id] for task_id in task_ids if task_id in finished]
+    return {
+        "submitted": len(task_ids),
+        "ready": sum(1 for entry in done if entry["status"] == "ready"),
+        "unfinished": len(task_ids) - len(done),
+        "time_to_ready": bench_results.percentiles([entry["seconds"] for entry in done if entry["status"] == "ready"]),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--flood", type=int, default=40, help="Bulk renders submitted by the flooding tenant")
+    parser.add_argument("--probes", type=int, default=3, help="Other tenants submitting one render each")
+    parser.add_argument("--probe-priority", choices=["interactive", "bulk"], default="interactive")
+    parser.add_argument("--probe-delay", type=float, default=5)
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=1800)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    submitted: Dict[str, float] = {}
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=httpx.Timeout(60, connect=10)) as client:
+        flood_ids = []
+        for _ in range(args.flood):
+            started = time.perf_counter()
+            task_id = await submit(client, "campaign", "bulk")
+            submitted[task_id] = started
+            flood_ids.append(task_id)
+
+        await asyncio.sleep(args.probe_delay)
+        probe_ids = []
+        for i in range(args.probes):
+            started = time.perf_counter()
+            task_id = await submit(client, f"tenant-{i}", args.probe_priority)
+            submitted[task_id] = started
+            probe_ids.append(task_id)
+
+        finished = await follow(client, submitted, args.timeout, args.poll_interval)
+
+    results = {"campaign": summarize(flood_ids, finished), "probes": summarize(probe_ids, finished)}
+    path = bench_results.save("tenant_fairness_bench", results, args.output, {key: value for key, value in vars(args).items() if key != "output"})
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
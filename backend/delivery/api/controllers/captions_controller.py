@@ -1,5 +1,6 @@
-from domain.captions_dto import CaptionRequest
-from usecases.captions_service import generate_captions
+from domain.captions_dto import CaptionRequest, CaptionBatchRequest
+from usecases.captions_service import generate_captions, agenerate_captions, agenerate_captions_batch, astream_captions
+from delivery.api.controllers.streaming import sse_response
 from fastapi import HTTPException
 
 def generate_caption_controller(request: CaptionRequest):
@@ -7,3 +8,24 @@ def generate_caption_controller(request: CaptionRequest):
         return generate_captions(request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate captions: {e}")
+
+
+async def agenerate_caption_controller(request: CaptionRequest):
+    try:
+        return await agenerate_captions(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate captions: {e}")
+
+
+async def agenerate_caption_batch_controller(request: CaptionBatchRequest):
+    try:
+        return await agenerate_captions_batch(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate captions: {e}")
+
+
+def stream_caption_controller(request: CaptionRequest):
+    try:
+        return sse_response(astream_captions(request), "Failed to generate captions")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate captions: {e}")
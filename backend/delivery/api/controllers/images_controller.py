@@ -1,5 +1,10 @@
-from domain.images_dto import ImageGenerationRequest, RenderImageRequest
-from usecases.images_service import generate_image_prompt, create_render_image_task
+from domain.images_dto import ImageGenerationRequest, ImageGenerationBatchRequest, RenderImageRequest
+from usecases.images_service import (
+    generate_image_prompt,
+    agenerate_image_prompt,
+    agenerate_image_prompts_batch,
+    create_render_image_task,
+)
 from usecases.tasks_service import get_task_status
 from fastapi import HTTPException
 
@@ -11,6 +16,20 @@ def generate_image_prompt_controller(request: ImageGenerationRequest):
         raise HTTPException(status_code=500, detail=f"Failed to generate image prompt: {e}")
 
 
+async def agenerate_image_prompt_controller(request: ImageGenerationRequest):
+    try:
+        return await agenerate_image_prompt(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate image prompt: {e}")
+
+
+async def agenerate_image_prompt_batch_controller(request: ImageGenerationBatchRequest):
+    try:
+        return await agenerate_image_prompts_batch(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate image prompts: {e}")
+
+
 def render_image_controller(request: RenderImageRequest):
     try:
         return create_render_image_task(request)
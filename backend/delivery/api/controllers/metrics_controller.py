@@ -0,0 +1,9 @@
+from infrastructure.prometheus_exporter import render_latest
+from fastapi import HTTPException, Response
+
+def get_metrics_controller():
+    try:
+        content, content_type = render_latest()
+        return Response(content=content, media_type=content_type)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to export metrics: {e}")
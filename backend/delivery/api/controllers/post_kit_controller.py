@@ -0,0 +1,10 @@
+from domain.post_kit_dto import PostKitRequest
+from usecases.post_kit_service import agenerate_post_kit
+from fastapi import HTTPException
+
+
+async def agenerate_post_kit_controller(request: PostKitRequest):
+    try:
+        return await agenerate_post_kit(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate post kit: {e}")
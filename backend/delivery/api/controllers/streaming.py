@@ -0,0 +1,36 @@
+import json
+import logging
+from typing import Any, AsyncIterator, Tuple
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+logger = logging.getLogger("streaming")
+
+
+def sse_event(event: str, data: Any) -> str:
+    if isinstance(data, BaseModel):
+        data = data.model_dump(mode="json")
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(events: AsyncIterator[Tuple[str, Any]], error_prefix: str) -> StreamingResponse:
+    """
+    Sends (event, data) pairs as Server-Sent Events. Once the stream has
+    started the status code is already sent, so failures become an "error" event.
+    """
+
+    async def body():
+        try:
+            async for event, data in events:
+                yield sse_event(event, data)
+        except Exception as e:
+            logger.warning(f"{error_prefix}: {e}")
+            yield sse_event("error", {"detail": f"{error_prefix}: {e}"})
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        # Stop nginx-style proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
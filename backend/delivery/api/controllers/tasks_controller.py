@@ -1,8 +1,48 @@
-from usecases.tasks_service import get_task_status as get_task_status_usecase
-from fastapi import HTTPException
+from usecases.tasks_service import get_task_status as get_task_status_usecase, get_task_statuses, watch_task
+from domain.tasks_dto import TaskStatusBatchRequest
+from delivery.api.controllers.streaming import sse_response
+from contextlib import aclosing
+from fastapi import HTTPException, WebSocketDisconnect
+from infrastructure.metrics import metrics
 
 def get_task_status_controller(task_id: str):
     try:
         return get_task_status_usecase(task_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get task status: {e}")
+
+
+def get_task_statuses_controller(request: TaskStatusBatchRequest):
+    try:
+        return get_task_statuses(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get task statuses: {e}")
+
+
+async def _status_events(task_id: str):
+    async with aclosing(watch_task(task_id)) as statuses:
+        async for status in statuses:
+            if status is None:
+                yield "heartbeat", {}
+            else:
+                yield "status", {"task_id": task_id, **status}
+
+
+def task_events_controller(task_id: str):
+    metrics.increment("task_event_subscriptions_total", transport="sse")
+    return sse_response(_status_events(task_id), "Failed to watch task")
+
+
+async def task_events_websocket_controller(websocket, task_id: str):
+    metrics.increment("task_event_subscriptions_total", transport="websocket")
+    await websocket.accept()
+    try:
+        # aclosing: unsubscribe as soon as the client goes away
+        async with aclosing(_status_events(task_id)) as events:
+            async for event, data in events:
+                await websocket.send_json({"event": event, **data})
+    except WebSocketDisconnect:
+        return
+    except Exception as e:
+        await websocket.send_json({"event": "error", "detail": f"Failed to watch task: {e}"})
+    await websocket.close()
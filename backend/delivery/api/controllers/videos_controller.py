@@ -1,5 +1,6 @@
-from domain.videos_dto import StoryboardRequest, RenderRequest
-from usecases.videos_service import generate_storyboard, create_render_task
+from domain.videos_dto import StoryboardRequest, StoryboardBatchRequest, RenderRequest
+from usecases.videos_service import generate_storyboard, agenerate_storyboard, agenerate_storyboards_batch, astream_storyboard, create_render_task
+from delivery.api.controllers.streaming import sse_response
 from fastapi import HTTPException
 
 def generate_storyboard_controller(request: StoryboardRequest):
@@ -8,6 +9,24 @@ def generate_storyboard_controller(request: StoryboardRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate storyboard: {e}")
 
+async def agenerate_storyboard_controller(request: StoryboardRequest):
+    try:
+        return await agenerate_storyboard(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate storyboard: {e}")
+
+async def agenerate_storyboard_batch_controller(request: StoryboardBatchRequest):
+    try:
+        return await agenerate_storyboards_batch(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate storyboards: {e}")
+
+def stream_storyboard_controller(request: StoryboardRequest):
+    try:
+        return sse_response(astream_storyboard(request), "Failed to generate storyboard")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to generate storyboard: {e}")
+
 def render_video_controller(request: RenderRequest):
     try:
         return create_render_task(request)
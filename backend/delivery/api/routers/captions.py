@@ -1,12 +1,28 @@
 from fastapi import APIRouter,HTTPException
 from delivery.api.controllers import captions_controller
-from domain.captions_dto import CaptionRequest
+from domain.captions_dto import CaptionRequest, CaptionBatchRequest, CaptionBatchResponse
 
 router = APIRouter()
 
 @router.post("/generate/caption")
-def generate_storyboard(request: CaptionRequest):
+async def generate_storyboard(request: CaptionRequest):
     try:
-        return captions_controller.generate_caption_controller(request)
+        return await captions_controller.agenerate_caption_controller(request)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/generate/caption:batch", response_model=CaptionBatchResponse)
+async def generate_caption_batch(request: CaptionBatchRequest):
+    try:
+        return await captions_controller.agenerate_caption_batch_controller(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/generate/caption:stream")
+async def generate_caption_stream(request: CaptionRequest):
+    try:
+        return captions_controller.stream_caption_controller(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,13 +1,20 @@
 from fastapi import APIRouter, HTTPException
-from domain.images_dto import ImageGenerationRequest, RenderImageRequest
+from domain.images_dto import ImageGenerationRequest, ImageGenerationBatchRequest, ImageGenerationBatchResponse, RenderImageRequest
 from delivery.api.controllers import images_controller
 
 router = APIRouter()
 
 @router.post("/generate/image")
-def generate_image_prompt(request: ImageGenerationRequest):
+async def generate_image_prompt(request: ImageGenerationRequest):
     try:
-        return images_controller.generate_image_prompt_controller(request)
+        return await images_controller.agenerate_image_prompt_controller(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/generate/image:batch", response_model=ImageGenerationBatchResponse)
+async def generate_image_prompt_batch(request: ImageGenerationBatchRequest):
+    try:
+        return await images_controller.agenerate_image_prompt_batch_controller(request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
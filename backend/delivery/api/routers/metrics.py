@@ -0,0 +1,14 @@
+from fastapi import APIRouter, HTTPException
+from delivery.api.controllers import metrics_controller
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    try:
+        return metrics_controller.get_metrics_controller()
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
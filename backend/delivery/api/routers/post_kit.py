@@ -0,0 +1,12 @@
+from fastapi import APIRouter, HTTPException
+from domain.post_kit_dto import PostKitRequest, PostKitResponse
+from delivery.api.controllers import post_kit_controller
+
+router = APIRouter()
+
+@router.post("/generate/post-kit", response_model=PostKitResponse)
+async def generate_post_kit(request: PostKitRequest):
+    try:
+        return await post_kit_controller.agenerate_post_kit_controller(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,5 +1,6 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 from delivery.api.controllers import tasks_controller
+from domain.tasks_dto import TaskStatusBatchRequest, TaskStatusBatchResponse
 
 router = APIRouter()
 
@@ -10,3 +11,31 @@ def get_task_status(task_id: str):
         return tasks_controller.get_task_status_controller(task_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/tasks:status", response_model=TaskStatusBatchResponse, response_model_exclude_none=True)
+def get_task_statuses(request: TaskStatusBatchRequest):
+    try:
+        return tasks_controller.get_task_statuses_controller(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/tasks/{task_id}/events")
+def task_events(task_id: str):
+    """
+    Server-Sent Events: a "status" event with the current status, then one
+    per change (progress, completion, failure) until the task finishes.
+    """
+    return tasks_controller.task_events_controller(task_id)
+
+
+@router.websocket("/tasks/{task_id}/ws")
+async def task_events_websocket(websocket: WebSocket, task_id: str):
+    """
+    The same status events as /tasks/{task_id}/events over a WebSocket.
+    """
+    try:
+        await tasks_controller.task_events_websocket_controller(websocket, task_id)
+    except WebSocketDisconnect:
+        pass
@@ -1,13 +1,27 @@
 from fastapi import APIRouter, HTTPException
-from domain.videos_dto import StoryboardRequest, RenderRequest
+from domain.videos_dto import StoryboardRequest, StoryboardBatchRequest, StoryboardBatchResponse, RenderRequest
 from delivery.api.controllers import videos_controller
 
 router = APIRouter()
 
 @router.post("/generate/storyboard")
-def generate_storyboard(request: StoryboardRequest):
+async def generate_storyboard(request: StoryboardRequest):
     try:
-        return videos_controller.generate_storyboard_controller(request)
+        return await videos_controller.agenerate_storyboard_controller(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/generate/storyboard:batch", response_model=StoryboardBatchResponse)
+async def generate_storyboard_batch(request: StoryboardBatchRequest):
+    try:
+        return await videos_controller.agenerate_storyboard_batch_controller(request)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/generate/storyboard:stream")
+async def generate_storyboard_stream(request: StoryboardRequest):
+    try:
+        return videos_controller.stream_storyboard_controller(request)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -2,7 +2,7 @@ import os
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from delivery.api.routers import captions, images, videos, schedule, tasks
+from delivery.api.routers import captions, images, videos, schedule, tasks, post_kit, metrics
 
 load_dotenv()
 
@@ -24,6 +24,8 @@ def create_app():
     app.include_router(images.router, prefix="", tags=["images"])
     app.include_router(schedule.router, prefix="", tags=["schedule"])
     app.include_router(tasks.router, prefix="", tags=["tasks"])
+    app.include_router(post_kit.router, prefix="", tags=["post kit"])
+    app.include_router(metrics.router, prefix="", tags=["metrics"])
     app.include_router(
         captions.router,
         prefix="",
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from domain.brand_dto import Brand
 from typing import Optional,List
 
@@ -10,9 +10,24 @@ class CaptionRequest(BaseModel):
     language: Optional[str] = "English"
     hashtags_count :Optional[int] = 4
     brand_presets: Brand
+    use_cache: bool = True
 
 
 
 class CaptiononResponse(BaseModel):
    caption:str
    hashtags: List[str]
+
+
+class CaptionBatchRequest(BaseModel):
+    items: List[CaptionRequest] = Field(min_length=1, max_length=50)
+
+
+class CaptionBatchItem(BaseModel):
+    index: int
+    result: Optional[CaptiononResponse] = None
+    error: Optional[str] = None
+
+
+class CaptionBatchResponse(BaseModel):
+    results: List[CaptionBatchItem]
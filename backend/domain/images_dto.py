@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic import BaseModel, Field
 from domain.brand_dto import Brand
 
@@ -8,6 +9,7 @@ class ImageGenerationRequest(BaseModel):
     aspect_ratio: str | None = Field(default="1:1", description="Image aspect ratio (1:1, 16:9, 9:16, etc.)")
     brand_presets: Brand
     platform: str = Field(description="Target platform (instagram, facebook, twitter, etc.)")
+    use_cache: bool = Field(default=True, description="Set to false to skip the LLM response cache")
 
 
 class ImageGenerationResponse(BaseModel):
@@ -17,8 +19,26 @@ class ImageGenerationResponse(BaseModel):
     platform: str = Field(description="Target platform")
 
 
+class ImageGenerationBatchRequest(BaseModel):
+    items: list[ImageGenerationRequest] = Field(min_length=1, max_length=50)
+
+
+class ImageGenerationBatchItem(BaseModel):
+    index: int
+    result: ImageGenerationResponse | None = None
+    error: str | None = None
+
+
+class ImageGenerationBatchResponse(BaseModel):
+    results: list[ImageGenerationBatchItem]
+
+
 class RenderImageRequest(BaseModel):
     prompt_used: str
     style: str
     aspect_ratio: str
-    platform: str
\ No newline at end of file
+    platform: str
+    tenant: str | None = Field(default=None, description="Tenant or brand key renders are shared out fairly between")
+    priority: Literal["interactive", "bulk"] = Field(
+        default="interactive", description="interactive renders are dispatched ahead of bulk campaign renders"
+    )
\ No newline at end of file
@@ -0,0 +1,46 @@
+from pydantic import BaseModel, Field
+from domain.brand_dto import Brand
+from domain.captions_dto import CaptiononResponse
+from domain.images_dto import ImageGenerationResponse
+from domain.videos_dto import StoryboardResponse
+
+
+class PostKitRequest(BaseModel):
+    idea: str
+    platform: str
+    brand_presets: Brand
+    language: str | None = "English"
+    number_of_shots: int | None = 3
+    cta: str | None = None
+    hashtags_count: int | None = 4
+    image_prompt: str | None = Field(default=None, description="Subject of the image; defaults to the idea")
+    style: str | None = Field(default="realistic", description="Image style (realistic, cartoon, artistic, etc.)")
+    aspect_ratio: str | None = Field(default="1:1", description="Image aspect ratio (1:1, 16:9, 9:16, etc.)")
+    use_cache: bool = Field(default=True, description="Set to false to skip the LLM response cache")
+
+
+class PostKitDraft(BaseModel):
+    """
+    What the one-shot prompt asks the model for.
+    """
+
+    storyboard: StoryboardResponse
+    caption: CaptiononResponse
+    image: ImageGenerationResponse
+
+
+class PostKitReport(BaseModel):
+    llm_calls: int = Field(description="Gemini calls made, including per-part fallbacks")
+    fallback_parts: list[str] = Field(description="Parts regenerated with their own prompt")
+    latency_ms: float
+    prompt_tokens_estimate: int = Field(description="Estimated prompt tokens sent for this kit")
+    three_call_prompt_tokens_estimate: int = Field(
+        description="Estimated prompt tokens the separate storyboard, caption and image calls would send"
+    )
+
+
+class PostKitResponse(BaseModel):
+    storyboard: StoryboardResponse
+    caption: CaptiononResponse
+    image: ImageGenerationResponse
+    report: PostKitReport
@@ -0,0 +1,20 @@
+from pydantic import BaseModel, Field
+
+
+class TaskStatusBatchRequest(BaseModel):
+    task_ids: list[str] = Field(min_length=1, max_length=500, description="Render and publish task ids")
+
+
+class TaskStatusItem(BaseModel):
+    task_id: str
+    status: str = Field(description="queued, ready, failed or the in-progress Celery state (e.g. PROCESSING)")
+    progress: int | None = None
+    message: str | None = None
+    video_url: str | None = None
+    image_url: str | None = None
+    metadata: dict | None = Field(default=None, description="Stable Horde seed, worker and model of a rendered image")
+    error: str | None = None
+
+
+class TaskStatusBatchResponse(BaseModel):
+    results: list[TaskStatusItem]
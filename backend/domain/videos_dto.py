@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic import BaseModel, Field
 from domain.brand_dto import Brand
 
@@ -9,11 +10,12 @@ class StoryboardRequest(BaseModel):
     platform: str
     brand_presets: Brand
     cta: str
+    use_cache: bool = Field(default=True, description="Set to false to skip the LLM response cache")
 
 
 class Shot(BaseModel):
     duration: int = Field(
-        description="The duration of the scene in seconds, between 3 - 5 (inclusive)"
+        ge=3, le=5, description="The duration of the scene in seconds, between 3 - 5 (inclusive)"
     )
     text: str = Field(description="a short phrase describing a scene")
 
@@ -26,6 +28,68 @@ class StoryboardResponse(BaseModel):
     )
 
 
+class StoryboardBatchRequest(BaseModel):
+    items: list[StoryboardRequest] = Field(min_length=1, max_length=50)
+
+
+class StoryboardBatchItem(BaseModel):
+    index: int
+    result: StoryboardResponse | None = None
+    error: str | None = None
+
+
+class StoryboardBatchResponse(BaseModel):
+    results: list[StoryboardBatchItem]
+
+
+# Output frame size per aspect ratio, kept at 720p-class sizes for render speed
+RESOLUTIONS = {
+    "16:9": (1280, 720),
+    "9:16": (720, 1280),
+    "1:1": (720, 720),
+    "4:5": (720, 900),
+}
+
+# Default aspect ratio for each target platform/placement
+PLATFORM_ASPECT_RATIOS = {
+    "reels": "9:16",
+    "instagram_reels": "9:16",
+    "tiktok": "9:16",
+    "youtube_shorts": "9:16",
+    "stories": "9:16",
+    "feed": "1:1",
+    "instagram": "1:1",
+    "facebook": "1:1",
+    "youtube": "16:9",
+}
+
+
+class RenderProfile(BaseModel):
+    preset: Literal["ultrafast", "superfast", "veryfast", "faster", "fast", "medium"] = Field(
+        default="veryfast", description="libx264 speed preset; faster presets trade size for encode time"
+    )
+    crf: int = Field(default=23, ge=0, le=51, description="libx264 constant rate factor (lower is better quality)")
+    threads: int | None = Field(default=None, ge=0, description="Encoder threads, None lets ffmpeg decide")
+    platform: str | None = Field(
+        default=None, description="Target platform/placement (reels, tiktok, feed, youtube, ...)"
+    )
+    aspect_ratio: Literal["16:9", "9:16", "1:1", "4:5"] | None = Field(
+        default=None, description="Overrides the platform default"
+    )
+    fps: int | None = Field(default=30, ge=1, le=60, description="Normalize all clips to this frame rate")
+
+    def resolution(self) -> tuple[int, int]:
+        aspect_ratio = self.aspect_ratio or PLATFORM_ASPECT_RATIOS.get(
+            (self.platform or "").lower(), "16:9"
+        )
+        return RESOLUTIONS.get(aspect_ratio, RESOLUTIONS["16:9"])
+
+
 class RenderRequest(BaseModel):
     shots: list[Shot]
     music: str
+    profile: RenderProfile = Field(default_factory=RenderProfile)
+    tenant: str | None = Field(default=None, description="Tenant or brand key renders are shared out fairly between")
+    priority: Literal["interactive", "bulk"] = Field(
+        default="interactive", description="interactive renders are dispatched ahead of bulk campaign renders"
+    )
@@ -1,47 +1,321 @@
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.output_parsers import JsonOutputParser, PydanticOutputParser, StrOutputParser
+from langchain_core.outputs import Generation
 from langchain.prompts import PromptTemplate
 from pydantic import BaseModel
-from typing import Type
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Type, Union
+import asyncio
+import threading
+import time
+from langchain_core.runnables import Runnable
 import os
 from dotenv import load_dotenv
+from infrastructure.llm_backends import wrap_llm
+from infrastructure.llm_cache import llm_cache
+from infrastructure.llm_instrumentation import instrument, record_item_failures
+from infrastructure.output_repair import RepairingOutputParser
+from templates.prompt_templates import FIX_UP_PROMPT_TEMPLATE
+from infrastructure.metrics import metrics
 
 load_dotenv()
 
+# Send output that local repairs cannot fix back to the model with a fix-up prompt
+LLM_REPAIR_WITH_LLM = os.getenv("LLM_REPAIR_WITH_LLM", "true").lower() == "true"
 
-def get_llm():
-    """
-    Returns the Gemini Model object to be invoked by the caller.
-    """
+# Upper bound on concurrent model calls per batch request (all calls in the
+# process are further capped by LLM_MAX_CONCURRENCY, see llm_backends)
+LLM_BATCH_CONCURRENCY = int(os.getenv("LLM_BATCH_CONCURRENCY", "4"))
+
+_chains: Dict[tuple, Runnable] = {}
+_chains_lock = threading.Lock()
+
+
+def _gemini(model_name: Optional[str] = None):
     api_key = os.getenv("GOOGLE_API_KEY")
     if not api_key:
         raise ValueError("GOOGLE_API_KEY not found in environment variables.")
 
     llm = ChatGoogleGenerativeAI(
-        model=os.getenv("GOOGLE_LLM_MODEL"), google_api_key=api_key
+        model=model_name or os.getenv("GOOGLE_LLM_MODEL"), google_api_key=api_key
     )
     return llm
 
 
+def get_llm(model_name: Optional[str] = None):
+    """
+    Returns the Model object to be invoked by the caller: Gemini, or the
+    offline stand-in selected by LLM_BACKEND (see llm_backends).
+    """
+    return wrap_llm(lambda: _gemini(model_name))
+
+
 def get_structured_response(
-    prompt_template_str: str, input_variables: dict, pydantic_model: Type[BaseModel]
+    prompt_template_str: str,
+    input_variables: dict,
+    pydantic_model: Type[BaseModel],
+    endpoint: Optional[str] = None,
+    use_cache: bool = True,
 ):
     """
     Generates a structured Pydantic object based on a prompt template and a Pydantic model.
+
+    When ``endpoint`` is given, responses are served from and stored in
+    llm_cache under that name unless ``use_cache`` is False.
+    """
+    if endpoint is None:
+        return _generate(prompt_template_str, input_variables, pydantic_model)
+    if not use_cache:
+        metrics.increment("llm_cache_requests_total", endpoint=endpoint, result="bypass")
+        return _generate(prompt_template_str, input_variables, pydantic_model, endpoint)
+
+    key = llm_cache.key(prompt_template_str, input_variables, os.getenv("GOOGLE_LLM_MODEL"), pydantic_model)
+    return llm_cache.get_or_generate(
+        endpoint,
+        key,
+        pydantic_model,
+        lambda: _generate(prompt_template_str, input_variables, pydantic_model, endpoint),
+    )
+
+
+async def aget_structured_response(
+    prompt_template_str: str,
+    input_variables: dict,
+    pydantic_model: Type[BaseModel],
+    endpoint: Optional[str] = None,
+    use_cache: bool = True,
+):
+    """
+    Async get_structured_response for the API: awaits the model with
+    ``ainvoke`` instead of holding a threadpool thread for the whole call.
+    """
+    if endpoint is None:
+        return await _agenerate(prompt_template_str, input_variables, pydantic_model)
+    if not use_cache:
+        metrics.increment("llm_cache_requests_total", endpoint=endpoint, result="bypass")
+        return await _agenerate(prompt_template_str, input_variables, pydantic_model, endpoint)
+
+    key = llm_cache.key(prompt_template_str, input_variables, os.getenv("GOOGLE_LLM_MODEL"), pydantic_model)
+    return await llm_cache.aget_or_generate(
+        endpoint,
+        key,
+        pydantic_model,
+        lambda: _agenerate(prompt_template_str, input_variables, pydantic_model, endpoint),
+    )
+
+
+async def abatch_structured_responses(
+    prompt_template_str: str,
+    inputs: List[dict],
+    pydantic_model: Type[BaseModel],
+    endpoint: Optional[str] = None,
+    use_cache: Optional[List[bool]] = None,
+    max_concurrency: int = LLM_BATCH_CONCURRENCY,
+) -> List[Union[BaseModel, Exception]]:
+    """
+    Generates one structured response per input, in input order. Cached
+    items are answered from llm_cache, the rest go to the model through
+    ``chain.abatch`` with at most ``max_concurrency`` calls in flight.
+    A failed item is returned as its exception instead of failing the batch.
     """
-    llm = get_llm()
+    use_cache = use_cache or [True] * len(inputs)
+    results: List[Union[BaseModel, Exception, None]] = [None] * len(inputs)
+    keys: List[Optional[str]] = [None] * len(inputs)
+
+    for i, input_variables in enumerate(inputs):
+        if endpoint is None:
+            continue
+        if not use_cache[i]:
+            metrics.increment("llm_cache_requests_total", endpoint=endpoint, result="bypass")
+            continue
+        keys[i] = llm_cache.key(prompt_template_str, input_variables, os.getenv("GOOGLE_LLM_MODEL"), pydantic_model)
+        results[i] = await asyncio.to_thread(llm_cache.lookup, endpoint, keys[i], pydantic_model)
+
+    pending = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
 
-    parser = PydanticOutputParser(pydantic_object=pydantic_model)
-    format_instructions = parser.get_format_instructions()
+    chain = get_chain(prompt_template_str, pydantic_model)
+    started = time.time()
+    with instrument(prompt_template_str, endpoint) as callback:
+        generated = await chain.abatch(
+            [inputs[i] for i in pending],
+            config={"max_concurrency": max_concurrency, "callbacks": [callback]},
+            return_exceptions=True,
+        )
+    record_item_failures(prompt_template_str, endpoint, generated)
+    # abatch does not time items individually; calls run in waves of
+    # max_concurrency, so the batch time per wave approximates one call
+    latency = (time.time() - started) * min(max_concurrency, len(pending)) / len(pending)
 
-    prompt = PromptTemplate(
-        template=prompt_template_str + "\n{format_instructions}\n",
-        input_variables=list(input_variables.keys()),
+    for i, response in zip(pending, generated):
+        results[i] = response
+        if keys[i] is not None and not isinstance(response, Exception):
+            await asyncio.to_thread(llm_cache.save, endpoint, keys[i], response, latency)
+    if endpoint is not None:
+        failed = sum(isinstance(response, Exception) for response in generated)
+        metrics.increment("llm_batch_items_total", len(generated) - failed, endpoint=endpoint, result="ok")
+        metrics.increment("llm_batch_items_total", failed, endpoint=endpoint, result="error")
+    return results
+
+
+async def aget_json_response(
+    prompt_template_str: str,
+    input_variables: dict,
+    pydantic_model: Type[BaseModel],
+    endpoint: Optional[str] = None,
+) -> Any:
+    """
+    Asks for ``pydantic_model`` but returns the parsed JSON unvalidated, so
+    the caller can validate and recover its parts separately.
+    """
+    with instrument(prompt_template_str, endpoint) as callback:
+        return await get_chain(prompt_template_str, pydantic_model, raw=True).ainvoke(
+            input_variables, config={"callbacks": [callback]}
+        )
+
+
+def estimate_prompt_tokens(prompt_template_str: str, input_variables: dict, pydantic_model: Type[BaseModel]) -> int:
+    """
+    Rough prompt size (about 4 characters per token) including the format
+    instructions, without calling the model's token counter.
+    """
+    prompt = get_chain(prompt_template_str, pydantic_model).first
+    return len(prompt.format(**input_variables)) // 4
+
+
+async def astream_structured_response(
+    prompt_template_str: str,
+    input_variables: dict,
+    pydantic_model: Type[BaseModel],
+    endpoint: Optional[str] = None,
+    use_cache: bool = True,
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streams a structured response as ("partial", dict) events while the model
+    is still writing, followed by one ("result", validated object) event.
+    A cached response is sent as the result straight away.
+
+    The complete text goes through the same RepairingOutputParser as
+    aget_structured_response, so streaming fails on nothing the other
+    endpoints would repair.
+    """
+    key = None
+    if endpoint is not None and use_cache:
+        key = llm_cache.key(prompt_template_str, input_variables, os.getenv("GOOGLE_LLM_MODEL"), pydantic_model)
+        cached = await asyncio.to_thread(llm_cache.lookup, endpoint, key, pydantic_model)
+        if cached is not None:
+            yield "result", cached
+            return
+    elif endpoint is not None:
+        metrics.increment("llm_cache_requests_total", endpoint=endpoint, result="bypass")
+
+    started = time.time()
+    first_chunk_at = None
+    text = ""
+    partial = None
+    partial_parser = JsonOutputParser()
+    with instrument(prompt_template_str, endpoint) as callback:
+        chain = get_chain(prompt_template_str, pydantic_model, text=True)
+        try:
+            async for chunk in chain.astream(input_variables, config={"callbacks": [callback]}):
+                if first_chunk_at is None:
+                    first_chunk_at = time.time()
+                    if endpoint is not None:
+                        metrics.observe("llm_stream_first_chunk_seconds", first_chunk_at - started, endpoint=endpoint)
+                text += chunk
+                parsed = partial_parser.parse_result([Generation(text=text)], partial=True)
+                if parsed is not None and parsed != partial:
+                    partial = parsed
+                    yield "partial", partial
+        except ValueError as e:
+            # LangChain raises this when the model sent no chunks at all
+            if text:
+                raise
+            raise Exception(f"The model's stream ended without any output ({e})")
+
+        if not text.strip():
+            raise Exception("The model's stream ended without any output")
+        response = await get_chain(prompt_template_str, pydantic_model).last.aparse(text)
+    if key is not None:
+        await asyncio.to_thread(llm_cache.save, endpoint, key, response, time.time() - started)
+    yield "result", response
+
+
+def get_chain(
+    prompt_template_str: str,
+    pydantic_model: Type[BaseModel],
+    model_name: Optional[str] = None,
+    raw: bool = False,
+    text: bool = False,
+):
+    """
+    Returns the prompt | llm | parser chain for a template and response model,
+    built once per process. Chains hold no per-request state, so concurrent
+    requests share them.
+
+    Raw chains end in a JSON parser instead: they return the unvalidated dict,
+    and the caller validates it. Text chains return (and stream) the model's
+    text as it is.
+    """
+    model_name = model_name or os.getenv("GOOGLE_LLM_MODEL")
+    key = (prompt_template_str, pydantic_model, model_name, raw, text)
+    chain = _chains.get(key)
+    if chain is None:
+        with _chains_lock:
+            chain = _chains.get(key)
+            if chain is None:
+                chain = _chains[key] = build_chain(prompt_template_str, pydantic_model, model_name, raw, text)
+    return chain
+
+
+def build_chain(
+    prompt_template_str: str,
+    pydantic_model: Type[BaseModel],
+    model_name: Optional[str] = None,
+    raw: bool = False,
+    text: bool = False,
+):
+    llm = get_llm(model_name)
+
+    format_instructions = PydanticOutputParser(pydantic_object=pydantic_model).get_format_instructions()
+    if text:
+        parser = StrOutputParser()
+    elif raw:
+        # Unvalidated dict: the caller validates (and recovers) its parts
+        parser = JsonOutputParser()
+    else:
+        fixer = None
+        if LLM_REPAIR_WITH_LLM:
+            fixer = PromptTemplate.from_template(FIX_UP_PROMPT_TEMPLATE) | llm | StrOutputParser()
+        parser = RepairingOutputParser(pydantic_object=pydantic_model, fixer=fixer)
+
+    prompt = PromptTemplate.from_template(
+        prompt_template_str + "\n{format_instructions}\n",
         partial_variables={"format_instructions": format_instructions},
     )
 
-    chain = prompt | llm | parser
+    return prompt | llm | parser
+
+
+def _generate(
+    prompt_template_str: str,
+    input_variables: dict,
+    pydantic_model: Type[BaseModel],
+    endpoint: Optional[str] = None,
+):
+    with instrument(prompt_template_str, endpoint) as callback:
+        return get_chain(prompt_template_str, pydantic_model).invoke(
+            input_variables, config={"callbacks": [callback]}
+        )
 
-    response = chain.invoke(input_variables)
 
-    return response
+async def _agenerate(
+    prompt_template_str: str,
+    input_variables: dict,
+    pydantic_model: Type[BaseModel],
+    endpoint: Optional[str] = None,
+):
+    with instrument(prompt_template_str, endpoint) as callback:
+        return await get_chain(prompt_template_str, pydantic_model).ainvoke(
+            input_variables, config={"callbacks": [callback]}
+        )
@@ -1,6 +1,9 @@
 import os
+from datetime import datetime, timezone
 from dotenv import load_dotenv
 from celery import Celery
+from celery.signals import worker_init, worker_process_init
+from kombu import Queue
 
 load_dotenv()
 
@@ -11,13 +14,69 @@ celery_app = Celery(
     include=["usecases.tasks"]
 )
 
+# One queue per kind of work, so each can get a worker pool that suits it:
+# video is CPU-bound ffmpeg (prefork), the others mostly wait on the network (threads)
+TASK_QUEUES = {
+    "usecases.tasks.render_video": "video",
+    "usecases.tasks.render_image": "image",
+    "usecases.tasks.publish_post": "publish",
+    "usecases.tasks.send_reminder": "reminders",
+}
+
+VISIBILITY_TIMEOUT = int(os.getenv("CELERY_VISIBILITY_TIMEOUT", "3600"))
+
 celery_app.conf.update(
     task_serializer="json",
     accept_content=["json"],
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
+    task_queues=[Queue(name, routing_key=name) for name in ["celery", *dict.fromkeys(TASK_QUEUES.values())]],
+    task_default_queue="celery",
+    task_routes={task: {"queue": queue} for task, queue in TASK_QUEUES.items()},
+    # Long tasks: take one message at a time and acknowledge it only once done,
+    # so a lost worker's task is redelivered instead of silently dropped
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    # Unacknowledged messages are redelivered after this many seconds; keep it
+    # above the longest task. ETA/countdown messages stay unacknowledged until
+    # they run, so ones scheduled further out than this are delivered twice
+    # (see eta_beyond_visibility_timeout)
+    broker_transport_options={"visibility_timeout": VISIBILITY_TIMEOUT},
+    # Results only hold object keys (URLs are presigned on read), but still
+    # expire so the result backend's memory stays bounded
+    result_expires=int(os.getenv("CELERY_RESULT_EXPIRES", "86400")),
 )
 
+
+def eta_beyond_visibility_timeout(eta: datetime) -> bool:
+    """
+    Whether a task scheduled for ``eta`` waits longer than the Redis
+    visibility timeout, after which the broker hands it out a second time.
+    """
+    if eta.tzinfo is None:
+        eta = eta.replace(tzinfo=timezone.utc)  # enable_utc: naive ETAs are UTC
+    return (eta - datetime.now(timezone.utc)).total_seconds() >= VISIBILITY_TIMEOUT
+
+
+_metrics_publisher_pid = None
+
+
+@worker_init.connect
+@worker_process_init.connect
+def _publish_worker_metrics(**kwargs):
+    # worker_init covers the thread pool (tasks run in the main process),
+    # worker_process_init each forked child of a prefork pool
+    global _metrics_publisher_pid
+    from infrastructure.prometheus_exporter import METRICS_PUBLISH_INTERVAL, start_metrics_publisher
+
+    broker_url = os.getenv("CELERY_BROKER_URI")
+    if METRICS_PUBLISH_INTERVAL <= 0 or not broker_url or _metrics_publisher_pid == os.getpid():
+        return
+    start_metrics_publisher(broker_url, "worker")
+    _metrics_publisher_pid = os.getpid()
+
+
 if __name__ == "__main__":
     celery_app.start()
@@ -0,0 +1,123 @@
+import random
+import time
+from typing import Dict, Optional
+
+
+class JobPollState:
+    def __init__(self, first_check_at: float):
+        self.next_check_at = first_check_at
+        self.checks = 0
+        self.consecutive_errors = 0
+        self.last_pending_at: Optional[float] = None
+        self.last_wait_time: Optional[float] = None
+
+
+class PollSchedule:
+    """
+    Decides when each outstanding Stable Horde request should be checked next.
+
+    - Sleeps until shortly before the horde's own ``wait_time`` estimate,
+      capped at ``max_interval`` so changing estimates are picked up.
+    - Polls every ``near_front_interval`` seconds once the request is within
+      ``near_front_position`` of the front of the queue or about to finish.
+    - Backs off exponentially with jitter after 429/5xx responses and
+      transport errors, honouring ``Retry-After`` when the horde sends it.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 2,
+        max_interval: float = 60,
+        lead_time: float = 3,
+        near_front_position: int = 2,
+        near_front_interval: float = 2,
+        backoff_base: float = 5,
+        backoff_max: float = 120,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.lead_time = lead_time
+        self.near_front_position = near_front_position
+        self.near_front_interval = near_front_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._jobs: Dict[str, JobPollState] = {}
+
+    def state(self, request_id: str, now: Optional[float] = None) -> JobPollState:
+        if request_id not in self._jobs:
+            # Unknown jobs (new, or the poller restarted) are checked right away
+            self._jobs[request_id] = JobPollState(now if now is not None else time.time())
+        return self._jobs[request_id]
+
+    def is_due(self, request_id: str, now: float) -> bool:
+        return self.state(request_id, now).next_check_at <= now
+
+    def record_pending(self, request_id: str, status_data: dict, now: float) -> float:
+        """
+        Schedules the next check from a not-yet-done /generate/check payload.
+        Returns the chosen delay in seconds.
+        """
+        state = self.state(request_id, now)
+        state.checks += 1
+        state.consecutive_errors = 0
+        state.last_pending_at = now
+
+        wait_time = status_data.get("wait_time")
+        queue_position = status_data.get("queue_position")
+        state.last_wait_time = float(wait_time) if wait_time is not None else None
+
+        if (
+            queue_position is not None and queue_position <= self.near_front_position
+        ) or (state.last_wait_time is not None and state.last_wait_time <= self.lead_time):
+            delay = self.near_front_interval
+        elif state.last_wait_time is not None:
+            delay = state.last_wait_time - self.lead_time
+        else:
+            delay = self.max_interval
+
+        delay = min(max(delay, self.min_interval), self.max_interval)
+        state.next_check_at = now + delay
+        return delay
+
+    def record_error(self, request_id: str, now: float, retry_after: Optional[float] = None) -> float:
+        """
+        Backs off after a failed check (429, 5xx, timeout). Returns the delay.
+        """
+        state = self.state(request_id, now)
+        state.checks += 1
+        state.consecutive_errors += 1
+
+        ceiling = min(self.backoff_max, self.backoff_base * 2 ** (state.consecutive_errors - 1))
+        # "Equal jitter": at least half the ceiling so retries still spread out
+        delay = ceiling / 2 + random.uniform(0, ceiling / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        state.next_check_at = now + delay
+        return delay
+
+    def record_done(self, request_id: str, now: float) -> Dict[str, Optional[float]]:
+        """
+        Drops the job and returns its check count and estimated detection lag.
+
+        The horde does not report when a generation actually finished, so the
+        finish time is estimated as the last pending check plus the wait_time it
+        reported, clamped between that check and the moment done was observed.
+        """
+        state = self._jobs.pop(request_id, None) or JobPollState(now)
+        state.checks += 1
+
+        lag = None
+        if state.last_pending_at is not None:
+            estimated_finish = state.last_pending_at + (state.last_wait_time or 0)
+            estimated_finish = min(max(estimated_finish, state.last_pending_at), now)
+            lag = now - estimated_finish
+
+        return {"checks": state.checks, "detection_lag": lag}
+
+    def forget(self, request_id: str):
+        self._jobs.pop(request_id, None)
+
+    def retain_only(self, request_ids):
+        for request_id in set(self._jobs) - set(request_ids):
+            del self._jobs[request_id]
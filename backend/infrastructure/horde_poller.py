@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+import time
+from typing import List
+
+import httpx
+from celery import states
+from dotenv import load_dotenv
+
+from infrastructure.celery_app import celery_app
+from infrastructure.horde_poll_schedule import PollSchedule
+from infrastructure.http_client import create_async_client
+from infrastructure.image_storage import build_render_image_result
+from infrastructure.metrics import metrics
+from infrastructure.prometheus_exporter import start_metrics_server
+from infrastructure.stable_horde_service import StableHordeService, StableHordeHTTPError
+from repository import horde_job_repository
+from repository.horde_job_repository import HordeJob
+
+load_dotenv()
+
+logger = logging.getLogger("horde_poller")
+logger.setLevel(logging.INFO)
+if not logger.hasHandlers():
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    ch.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    logger.addHandler(ch)
+
+
+class HordePoller:
+    """
+    Single asyncio loop that checks every outstanding Stable Horde generation
+    and finalizes the render_image Celery task that submitted it.
+
+    render_image submits to /generate/async and registers the request in
+    repository.horde_job_repository; one poller process serves all workers.
+    When each request is checked is decided by a PollSchedule.
+    """
+
+    def __init__(
+        self,
+        service: StableHordeService,
+        schedule: PollSchedule,
+        tick: float = 1,
+        batch_size: int = 20,
+        max_wait: float = 1200,
+        stats_interval: float = 300,
+    ):
+        self.service = service
+        self.schedule = schedule
+        self.tick = tick
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.stats_interval = stats_interval
+
+    async def run(self):
+        logger.info(f"Polling Stable Horde in batches of {self.batch_size}")
+        last_stats = time.time()
+        async with create_async_client() as client:
+            while True:
+                try:
+                    await self.poll_once(client)
+                except Exception as e:
+                    logger.error(f"Poll cycle failed: {e}", exc_info=True)
+                if time.time() - last_stats >= self.stats_interval:
+                    logger.info(f"Poller metrics: {metrics.snapshot()}")
+                    last_stats = time.time()
+                await asyncio.sleep(self.tick)
+
+    async def poll_once(self, client: httpx.AsyncClient):
+        # Redis calls run in threads: a slow Redis must not stall the checks in flight
+        jobs = await asyncio.to_thread(horde_job_repository.list_all)
+        self.schedule.retain_only(job.request_id for job in jobs)
+        now = time.time()
+        due = [job for job in jobs if self.schedule.is_due(job.request_id, now)]
+        if not due:
+            return
+        logger.info(f"Checking {len(due)} of {len(jobs)} outstanding generation(s)")
+        for batch in self._batches(due):
+            await asyncio.gather(*(self._check(client, job) for job in batch))
+
+    def _batches(self, jobs: List[HordeJob]):
+        for i in range(0, len(jobs), self.batch_size):
+            yield jobs[i : i + self.batch_size]
+
+    async def _check(self, client: httpx.AsyncClient, job: HordeJob):
+        if time.time() - job.submitted_at > self.max_wait:
+            await self._fail(job, "Image generation timed out waiting for Stable Horde")
+            return
+
+        metrics.increment("horde_checks_total")
+        try:
+            status_data = await self.service.check_generation_async(client, job.request_id)
+        except StableHordeHTTPError as e:
+            if e.status_code == 404:
+                await self._fail(job, "Stable Horde no longer knows this request")
+                return
+            if not e.retryable:
+                # Bad request or rejected credentials: retrying cannot help
+                await self._fail(job, f"Stable Horde rejected the status check ({e})")
+                return
+            metrics.increment("horde_check_errors_total", status=str(e.status_code))
+            delay = self.schedule.record_error(job.request_id, time.time(), e.retry_after)
+            logger.warning(f"Status check for {job.request_id} failed ({e}); retrying in {delay:.1f}s")
+            return
+        except Exception as e:
+            metrics.increment("horde_check_errors_total", status="transport")
+            delay = self.schedule.record_error(job.request_id, time.time())
+            logger.warning(f"Status check for {job.request_id} failed ({e}); retrying in {delay:.1f}s")
+            return
+
+        if status_data.get("faulted", False):
+            await self._fail(job, "Image generation failed on Stable Horde")
+            return
+
+        if not status_data.get("done", False):
+            delay = self.schedule.record_pending(job.request_id, status_data, time.time())
+            logger.info(
+                f"{job.request_id}: queue position {status_data.get('queue_position')}, "
+                f"wait {status_data.get('wait_time')}s, next check in {delay:.1f}s"
+            )
+            return
+
+        stats = self.schedule.record_done(job.request_id, time.time())
+        metrics.observe("horde_checks_per_job", stats["checks"])
+        if stats["detection_lag"] is not None:
+            metrics.observe("horde_detection_lag_seconds", stats["detection_lag"])
+
+        try:
+            result = await self.service.get_generation_result_async(client, job.request_id)
+            final_result = await asyncio.to_thread(build_render_image_result, job.task_id, job.image_data, result)
+        except Exception as e:
+            await self._fail(job, f"Image generation failed: {e}")
+            return
+
+        await self._complete(job, final_result)
+
+    async def _complete(self, job: HordeJob, final_result: dict):
+        await asyncio.to_thread(celery_app.backend.store_result, job.task_id, final_result, states.SUCCESS)
+        await asyncio.to_thread(horde_job_repository.remove, job.request_id)
+        metrics.increment("horde_jobs_total", outcome="completed")
+        logger.info(f"Task {job.task_id} completed (Stable Horde request {job.request_id})")
+
+    async def _fail(self, job: HordeJob, message: str):
+        await asyncio.to_thread(celery_app.backend.store_result, job.task_id, Exception(message), states.FAILURE)
+        await asyncio.to_thread(horde_job_repository.remove, job.request_id)
+        self.schedule.forget(job.request_id)
+        metrics.increment("horde_jobs_total", outcome="failed")
+        logger.error(f"Task {job.task_id} failed: {message}")
+
+
+def main():
+    metrics_port = os.getenv("HORDE_POLLER_METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(int(metrics_port))
+
+    schedule = PollSchedule(
+        min_interval=float(os.getenv("HORDE_POLL_MIN_INTERVAL", "2")),
+        max_interval=float(os.getenv("HORDE_POLL_MAX_INTERVAL", "60")),
+        lead_time=float(os.getenv("HORDE_POLL_LEAD_TIME", "3")),
+    )
+    poller = HordePoller(
+        StableHordeService(),
+        schedule,
+        batch_size=int(os.getenv("HORDE_POLL_BATCH_SIZE", "20")),
+        max_wait=float(os.getenv("HORDE_MAX_WAIT", "1200")),
+    )
+    asyncio.run(poller.run())
+
+
+if __name__ == "__main__":
+    main()
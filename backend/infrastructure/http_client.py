@@ -0,0 +1,134 @@
+import os
+import threading
+from typing import Dict, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+from infrastructure.metrics import metrics
+
+load_dotenv()
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# Keep-alive pool size per upstream host. Hosts not listed share the default pool.
+HOST_POOL_SIZES: Dict[str, int] = {
+    "stablehorde.net": int(os.getenv("HTTP_POOL_STABLE_HORDE", "20")),
+    "pixabay.com": int(os.getenv("HTTP_POOL_PIXABAY", "16")),
+    "cdn.pixabay.com": int(os.getenv("HTTP_POOL_PIXABAY_CDN", "16")),
+    "freesound.org": int(os.getenv("HTTP_POOL_FREESOUND", "8")),
+    "cdn.freesound.org": int(os.getenv("HTTP_POOL_FREESOUND_CDN", "8")),
+    "api.ayrshare.com": int(os.getenv("HTTP_POOL_AYRSHARE", "8")),
+}
+DEFAULT_POOL_SIZE = int(os.getenv("HTTP_POOL_DEFAULT", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+
+DEFAULT_TIMEOUT = httpx.Timeout(
+    float(os.getenv("HTTP_TIMEOUT", "30")),
+    connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")),
+    pool=float(os.getenv("HTTP_POOL_TIMEOUT", "10")),
+)
+
+
+def _limits(pool_size: int) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def _record(pool: str, opened_connection: bool):
+    metrics.increment("http_requests_total", pool=pool)
+    if opened_connection:
+        metrics.increment("http_connections_opened_total", pool=pool)
+    else:
+        metrics.increment("http_pool_hits_total", pool=pool)
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    """
+    Counts, per pool, requests served on a kept-alive connection versus
+    requests that had to open a new TCP connection.
+    """
+
+    def __init__(self, pool: str, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        opened = []
+
+        def trace(event_name: str, info: dict):
+            if event_name == "connection.connect_tcp.complete":
+                opened.append(True)
+
+        request.extensions["trace"] = trace
+        response = super().handle_request(request)
+        _record(self.pool, bool(opened))
+        return response
+
+
+class _CountingAsyncTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, pool: str, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        opened = []
+
+        async def trace(event_name: str, info: dict):
+            if event_name == "connection.connect_tcp.complete":
+                opened.append(True)
+
+        request.extensions["trace"] = trace
+        response = await super().handle_async_request(request)
+        _record(self.pool, bool(opened))
+        return response
+
+
+def _client_kwargs(transport_cls) -> dict:
+    return {
+        "timeout": DEFAULT_TIMEOUT,
+        "follow_redirects": True,
+        "transport": transport_cls("default", http2=HTTP2_AVAILABLE, limits=_limits(DEFAULT_POOL_SIZE)),
+        "mounts": {
+            f"all://{host}": transport_cls(host, http2=HTTP2_AVAILABLE, limits=_limits(size))
+            for host, size in HOST_POOL_SIZES.items()
+        },
+    }
+
+
+_client: Optional[httpx.Client] = None
+_client_pid: Optional[int] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> httpx.Client:
+    """
+    Returns the process-wide pooled HTTP client.
+
+    Celery's prefork pool forks after import, so the client is (re)built the
+    first time it is used in each process rather than shared across a fork.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = httpx.Client(**_client_kwargs(_CountingTransport))
+                _client_pid = os.getpid()
+    return _client
+
+
+def create_async_client() -> httpx.AsyncClient:
+    """
+    Builds a pooled async client with the same per-host limits and timeouts.
+    Async clients are bound to an event loop, so the caller owns and closes it.
+    """
+    return httpx.AsyncClient(**_client_kwargs(_CountingAsyncTransport))
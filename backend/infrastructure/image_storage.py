@@ -0,0 +1,48 @@
+import base64
+import io
+import mimetypes
+from typing import Dict
+
+from infrastructure.http_client import get_client
+from infrastructure.storage_service import upload_file
+
+
+def store_generated_image(image: str, task_id: str) -> str:
+    """
+    Copies a Stable Horde generation into the images bucket and returns its
+    object key. ``image`` is either a download URL, which Stable Horde only
+    keeps for a while, or the image itself as (data URI) base64.
+    """
+    if image.startswith(("http://", "https://")):
+        response = get_client().get(image, timeout=60)
+        response.raise_for_status()
+        data = response.content
+        content_type = response.headers.get("content-type", "image/webp").split(";")[0]
+    else:
+        header, _, encoded = image.rpartition(",")
+        data = base64.b64decode(encoded)
+        content_type = header[len("data:"):].split(";")[0] if header.startswith("data:") else "image/webp"
+
+    object_name = f"image_{task_id}{mimetypes.guess_extension(content_type) or '.webp'}"
+    upload_file(io.BytesIO(data), object_name, "images", content_type=content_type)
+    return object_name
+
+
+def build_render_image_result(task_id: str, image_data: Dict, result: Dict) -> Dict:
+    """
+    Stores a Stable Horde generation in MinIO and shapes the render_image
+    task result around its object key.
+    """
+    return {
+        "status": "completed",
+        "image_key": store_generated_image(result["image_url"], task_id),
+        "style": image_data["style"],
+        "aspect_ratio": image_data["aspect_ratio"],
+        "platform": image_data["platform"],
+        "metadata": {
+            "seed": result.get("seed"),
+            "worker_id": result.get("worker_id"),
+            "worker_name": result.get("worker_name"),
+            "model": result.get("model"),
+        },
+    }
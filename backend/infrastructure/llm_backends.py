@@ -0,0 +1,449 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict
+
+from infrastructure.metrics import metrics
+
+load_dotenv()
+
+_SCHEMA_BLOCK = re.compile(r"```(?:json)?\s*(\{.*?\})\s*```", re.DOTALL)
+
+WORDS = [
+    "coffee", "sunrise", "city", "ocean", "forest", "market", "studio", "street",
+    "mountain", "kitchen", "garden", "festival", "beach", "office", "night", "team",
+]
+
+
+def prompt_key(messages: List[BaseMessage]) -> str:
+    """
+    Identity of a prompt for fixtures and for the fake model's seed.
+    """
+    text = "\n".join(f"{message.type}:{message.content}" for message in messages)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class LatencyModel:
+    """
+    Simulated model latency, parsed from specs like "fixed:800",
+    "uniform:300,1500" or "lognormal:900,0.4" (median ms, sigma).
+    """
+
+    def __init__(self, spec: str, seed: int = 0):
+        kind, _, args = spec.partition(":")
+        self.kind = kind or "fixed"
+        self.args = [float(arg) for arg in args.split(",") if arg]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """
+        Returns a latency in seconds.
+        """
+        with self._lock:
+            if self.kind == "uniform":
+                low, high = self.args
+                ms = self._random.uniform(low, high)
+            elif self.kind == "lognormal":
+                median, sigma = self.args
+                ms = self._random.lognormvariate(0, sigma) * median
+            else:
+                ms = self.args[0] if self.args else 0
+        return ms / 1000
+
+
+class _SchemaFaker:
+    """
+    Builds a deterministic JSON value matching a JSON schema, seeded per prompt.
+    """
+
+    def __init__(self, schema: dict, seed: str):
+        self.defs = schema.get("$defs", {})
+        self.random = random.Random(seed)
+
+    def value(self, schema: dict, name: str = "") -> Any:
+        if "$ref" in schema:
+            return self.value(self.defs[schema["$ref"].split("/")[-1]], name)
+        if "anyOf" in schema:
+            options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+            return self.value(options[0] if options else {}, name)
+        if schema.get("examples"):
+            return self.random.choice(schema["examples"])
+
+        kind = schema.get("type")
+        # PydanticOutputParser drops "type" from the top-level schema
+        if kind == "object" or "properties" in schema:
+            return {key: self.value(prop, key) for key, prop in schema.get("properties", {}).items()}
+        if kind == "array":
+            return [self.value(schema.get("items", {}), name) for _ in range(3)]
+        if kind == "integer":
+            return self.random.randint(3, 5)
+        if kind == "number":
+            return round(self.random.uniform(3, 5), 1)
+        if kind == "boolean":
+            return self.random.random() < 0.5
+        if "hashtag" in name:
+            return "#" + self.random.choice(WORDS)
+        if "caption" in name or "prompt" in name:
+            return " ".join(self.random.choice(WORDS) for _ in range(8)).capitalize()
+        return self.random.choice(WORDS)
+
+
+class FakeStructuredChatModel(BaseChatModel):
+    """
+    Offline stand-in for Gemini. Answers with JSON that matches the output
+    schema embedded in the prompt's format instructions, so every response
+    model (storyboard, caption, image prompt, post kit, fix-up) works without
+    knowing about it. The same prompt always gets the same answer; latency
+    is drawn from ``latency``. Token usage is estimated at 4 characters per token.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    latency: LatencyModel
+    seed: int = 0
+    chunk_size: int = 16
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-structured"
+
+    def _answer(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        seed = f"{self.seed}:{prompt_key(messages)}"
+        schemas = _SCHEMA_BLOCK.findall(prompt)
+        if not schemas:
+            return json.dumps({"text": random.Random(seed).choice(WORDS)})
+        schema = json.loads(schemas[-1])
+        return json.dumps(_SchemaFaker(schema, seed).value(schema))
+
+    def _message(self, messages: List[BaseMessage], content: str) -> AIMessage:
+        prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+        completion_tokens = len(content) // 4
+        return AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency.sample())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, self._answer(messages)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency.sample())
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, self._answer(messages)))])
+
+    def _chunks(self, messages: List[BaseMessage]) -> List[str]:
+        answer = self._answer(messages)
+        return [answer[i : i + self.chunk_size] for i in range(0, len(answer), self.chunk_size)]
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        # Half the latency before the first token, the rest spread over the chunks
+        total = self.latency.sample()
+        chunks = self._chunks(messages)
+        time.sleep(total / 2)
+        for chunk in chunks:
+            time.sleep(total / 2 / len(chunks))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        total = self.latency.sample()
+        chunks = self._chunks(messages)
+        await asyncio.sleep(total / 2)
+        for chunk in chunks:
+            await asyncio.sleep(total / 2 / len(chunks))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+
+class FixtureStore:
+    """
+    Append-only JSONL file of recorded model answers keyed by prompt_key.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, dict]] = None
+
+    def load(self) -> Dict[str, dict]:
+        with self._lock:
+            if self._entries is None:
+                self._entries = {}
+                if os.path.exists(self.path):
+                    with open(self.path) as fixtures:
+                        for line in fixtures:
+                            if line.strip():
+                                entry = json.loads(line)
+                                self._entries[entry["key"]] = entry
+            return self._entries
+
+    def append(self, key: str, content: str, latency: float, usage: Optional[dict]):
+        entry = {"key": key, "content": content, "latency": latency, "usage": usage}
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a") as fixtures:
+                fixtures.write(line)
+            if self._entries is not None:
+                self._entries[key] = entry
+
+
+class RecordingChatModel(BaseChatModel):
+    """
+    Passes calls through to ``inner`` (the real Gemini model) and records
+    every answer, its latency and token usage as a fixture.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    store: FixtureStore
+
+    @property
+    def _llm_type(self) -> str:
+        return f"recording-{self.inner._llm_type}"
+
+    def _record(self, messages: List[BaseMessage], message: BaseMessage, started: float) -> ChatResult:
+        self.store.append(
+            prompt_key(messages), str(message.content), time.time() - started, getattr(message, "usage_metadata", None)
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        started = time.time()
+        return self._record(messages, self.inner.invoke(messages, stop=stop, **kwargs), started)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        started = time.time()
+        return self._record(messages, await self.inner.ainvoke(messages, stop=stop, **kwargs), started)
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Answers from recorded fixtures, optionally with the recorded latency.
+    Prompts that were never recorded go to ``fallback`` (usually the fake
+    model) or, without one, raise.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    store: FixtureStore
+    fallback: Optional[BaseChatModel] = None
+    replay_latency: bool = True
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _lookup(self, messages: List[BaseMessage]) -> Optional[dict]:
+        return self.store.load().get(prompt_key(messages))
+
+    def _result(self, entry: dict) -> ChatResult:
+        message = AIMessage(content=entry["content"], usage_metadata=entry.get("usage") or None)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        entry = self._lookup(messages)
+        if entry is None:
+            if self.fallback is None:
+                raise Exception("No recorded LLM fixture for this prompt")
+            return ChatResult(generations=[ChatGeneration(message=self.fallback.invoke(messages, stop=stop))])
+        if self.replay_latency:
+            time.sleep(entry.get("latency", 0))
+        return self._result(entry)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        entry = self._lookup(messages)
+        if entry is None:
+            if self.fallback is None:
+                raise Exception("No recorded LLM fixture for this prompt")
+            return ChatResult(generations=[ChatGeneration(message=await self.fallback.ainvoke(messages, stop=stop))])
+        if self.replay_latency:
+            await asyncio.sleep(entry.get("latency", 0))
+        return self._result(entry)
+
+
+class ConcurrencyLimit:
+    """
+    A semaphore shared by threads and event loops: sync callers block in
+    ``acquire``, async callers await ``aacquire`` without blocking their
+    loop. Slots are handed to waiters in arrival order.
+    """
+
+    def __init__(self, limit: int):
+        self._lock = threading.Lock()
+        self._available = limit
+        # threading.Event for sync waiters, (loop, future) for async ones
+        self._waiters: deque = deque()
+
+    def acquire(self):
+        with self._lock:
+            if self._available > 0 and not self._waiters:
+                self._available -= 1
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()
+
+    async def aacquire(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._available > 0 and not self._waiters:
+                self._available -= 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            # Already handed a slot: pass it on (_wake does that itself if
+            # the future was cancelled before it ran)
+            if waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        with self._lock:
+            if not self._waiters:
+                self._available += 1
+                return
+            waiter = self._waiters.popleft()
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            loop.call_soon_threadsafe(self._wake, future)
+
+    def _wake(self, future: asyncio.Future):
+        if future.done():
+            self.release()
+        else:
+            future.set_result(None)
+
+
+class LimitedChatModel(BaseChatModel):
+    """
+    Passes calls through to ``inner`` while holding a slot of ``limit``,
+    which every model built by wrap_llm shares: batches, streams and
+    fix-up calls from all requests in the process count against the same
+    LLM_MAX_CONCURRENCY.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseChatModel
+    limit: ConcurrencyLimit
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    # The inner call runs without callbacks: this model's own run already
+    # reports the call and its usage
+    _INNER_CONFIG = {"callbacks": []}
+
+    def _acquire(self):
+        started = time.time()
+        self.limit.acquire()
+        metrics.observe("llm_concurrency_wait_seconds", time.time() - started)
+
+    async def _aacquire(self):
+        started = time.time()
+        await self.limit.aacquire()
+        metrics.observe("llm_concurrency_wait_seconds", time.time() - started)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self._acquire()
+        try:
+            message = self.inner.invoke(messages, self._INNER_CONFIG, stop=stop, **kwargs)
+        finally:
+            self.limit.release()
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await self._aacquire()
+        try:
+            message = await self.inner.ainvoke(messages, self._INNER_CONFIG, stop=stop, **kwargs)
+        finally:
+            self.limit.release()
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        self._acquire()
+        try:
+            for chunk in self.inner.stream(messages, self._INNER_CONFIG, stop=stop, **kwargs):
+                yield ChatGenerationChunk(message=chunk)
+        finally:
+            self.limit.release()
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await self._aacquire()
+        try:
+            async for chunk in self.inner.astream(messages, self._INNER_CONFIG, stop=stop, **kwargs):
+                yield ChatGenerationChunk(message=chunk)
+        finally:
+            self.limit.release()
+
+
+# gemini | fake | record | replay
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+LLM_FAKE_LATENCY = os.getenv("LLM_FAKE_LATENCY", "lognormal:900,0.4")
+LLM_FAKE_SEED = int(os.getenv("LLM_FAKE_SEED", "0"))
+LLM_FIXTURES_PATH = os.getenv("LLM_FIXTURES_PATH", "fixtures/llm.jsonl")
+# What replay does with an unrecorded prompt: "fake" answers it, "error" raises
+LLM_REPLAY_MISS = os.getenv("LLM_REPLAY_MISS", "fake").lower()
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "true").lower() == "true"
+# Model calls in flight per process, across all requests, batches and streams
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+_fake_latency = LatencyModel(LLM_FAKE_LATENCY, LLM_FAKE_SEED)
+fixture_store = FixtureStore(LLM_FIXTURES_PATH)
+llm_limit = ConcurrencyLimit(LLM_MAX_CONCURRENCY)
+
+
+def fake_llm() -> FakeStructuredChatModel:
+    return FakeStructuredChatModel(latency=_fake_latency, seed=LLM_FAKE_SEED)
+
+
+def wrap_llm(gemini_factory) -> BaseChatModel:
+    """
+    Returns the chat model for LLM_BACKEND, limited to LLM_MAX_CONCURRENCY
+    calls in flight per process. ``gemini_factory`` builds the real model
+    and is only called by the backends that need it.
+    """
+    return LimitedChatModel(inner=_backend_llm(gemini_factory), limit=llm_limit)
+
+
+def _backend_llm(gemini_factory) -> BaseChatModel:
+    if LLM_BACKEND == "fake":
+        return fake_llm()
+    if LLM_BACKEND == "record":
+        return RecordingChatModel(inner=gemini_factory(), store=fixture_store)
+    if LLM_BACKEND == "replay":
+        fallback = fake_llm() if LLM_REPLAY_MISS == "fake" else None
+        return ReplayChatModel(store=fixture_store, fallback=fallback, replay_latency=LLM_REPLAY_LATENCY)
+    if LLM_BACKEND != "gemini":
+        raise ValueError(f"Unknown LLM_BACKEND '{LLM_BACKEND}'")
+    return gemini_factory()
@@ -0,0 +1,157 @@
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Awaitable, Callable, Optional, Type, TypeVar
+
+import redis
+from cachetools import TTLCache
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from infrastructure.llm_backends import LLM_BACKEND
+from infrastructure.metrics import metrics
+from repository.cache_repository import RedisCache
+
+load_dotenv()
+
+logger = logging.getLogger("llm_cache")
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+def normalize_variables(input_variables: dict) -> dict:
+    """
+    Key form of prompt inputs: runs of whitespace in strings are collapsed so
+    "Acme  Coffee " and "Acme Coffee" share an entry. Case is kept, since
+    brand names and ideas are echoed into the generated text.
+    """
+    return {
+        name: " ".join(value.split()) if isinstance(value, str) else value
+        for name, value in sorted(input_variables.items())
+    }
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache of validated structured LLM responses.
+
+    - L1 is an optional per-process TTL/LRU map holding the Pydantic objects.
+    - L2 is a RedisCache shared by every API process, holding their JSON.
+
+    Entries are keyed on the prompt template, the normalized input variables,
+    the model name (under LLM_BACKEND, so fake, replayed or recorded answers
+    never reach a Gemini deployment sharing the Redis) and the response
+    model, and remember how long the LLM call
+    took so hits can report the latency they saved. Redis errors fall back to
+    calling the LLM.
+    """
+
+    def __init__(self, ttl: int, max_entries: int, l1_size: int = 0, l1_ttl: int = 300):
+        self.store = RedisCache("llm", fresh_ttl=ttl, stale_ttl=ttl, max_entries=max_entries)
+        self.l1 = TTLCache(maxsize=l1_size, ttl=l1_ttl) if l1_size > 0 else None
+        self._l1_lock = threading.Lock()
+
+    def key(self, prompt_template_str: str, input_variables: dict, model_name: str, pydantic_model: Type[BaseModel]) -> str:
+        template_id = hashlib.sha256(prompt_template_str.encode()).hexdigest()
+        model_id = model_name or ""
+        if LLM_BACKEND != "gemini":
+            # Gemini keys are unchanged, so existing production entries stay valid
+            model_id = f"{LLM_BACKEND}:{model_id}"
+        return self.store.key(template_id, pydantic_model.__name__, model_id, normalize_variables(input_variables))
+
+    def get_or_generate(
+        self,
+        endpoint: str,
+        key: str,
+        pydantic_model: Type[ModelT],
+        generate: Callable[[], ModelT],
+    ) -> ModelT:
+        cached = self.lookup(endpoint, key, pydantic_model)
+        if cached is not None:
+            return cached
+
+        started = time.time()
+        response = generate()
+        self.save(endpoint, key, response, time.time() - started)
+        return response
+
+    async def aget_or_generate(
+        self,
+        endpoint: str,
+        key: str,
+        pydantic_model: Type[ModelT],
+        agenerate: Callable[[], Awaitable[ModelT]],
+    ) -> ModelT:
+        """
+        Async get_or_generate: Redis round trips run in a worker thread so
+        the event loop only ever waits on the LLM call itself.
+        """
+        cached = await asyncio.to_thread(self.lookup, endpoint, key, pydantic_model)
+        if cached is not None:
+            return cached
+
+        started = time.time()
+        response = await agenerate()
+        await asyncio.to_thread(self.save, endpoint, key, response, time.time() - started)
+        return response
+
+    def save(self, endpoint: str, key: str, response: BaseModel, latency: float):
+        metrics.observe("llm_latency_seconds", latency, endpoint=endpoint)
+        self._l1_set(key, (response, latency))
+        try:
+            self.store.set(key, {"response": response.model_dump(mode="json"), "latency": latency})
+        except redis.RedisError as e:
+            logger.warning(f"[{endpoint}] cache write failed: {e}")
+
+    def lookup(self, endpoint: str, key: str, pydantic_model: Type[ModelT]) -> Optional[ModelT]:
+        if self.l1 is not None:
+            with self._l1_lock:
+                entry = self.l1.get(key)
+            if entry is not None:
+                response, latency = entry
+                self._record_hit(endpoint, "hit_local", latency)
+                return response.model_copy(deep=True)
+
+        try:
+            entry = self.store.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"[{endpoint}] cache read failed, calling the LLM: {e}")
+            metrics.increment("llm_cache_requests_total", endpoint=endpoint, result="error")
+            return None
+
+        if entry is None:
+            metrics.increment("llm_cache_requests_total", endpoint=endpoint, result="miss")
+            return None
+
+        try:
+            response = pydantic_model.model_validate(entry.value["response"])
+        except Exception as e:
+            # The response model changed shape since this entry was written
+            logger.warning(f"[{endpoint}] dropping cached response that no longer validates: {e}")
+            metrics.increment("llm_cache_requests_total", endpoint=endpoint, result="miss")
+            return None
+
+        latency = entry.value.get("latency", 0)
+        self._l1_set(key, (response, latency))
+        self._record_hit(endpoint, "hit", latency)
+        return response.model_copy(deep=True)
+
+    def _l1_set(self, key: str, entry: tuple):
+        if self.l1 is not None:
+            with self._l1_lock:
+                self.l1[key] = entry
+
+    def _record_hit(self, endpoint: str, result: str, latency: float):
+        metrics.increment("llm_cache_requests_total", endpoint=endpoint, result=result)
+        metrics.increment("llm_cache_saved_seconds_total", latency, endpoint=endpoint)
+
+
+llm_cache = LLMResponseCache(
+    ttl=int(os.getenv("LLM_CACHE_TTL", "86400")),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+    l1_size=int(os.getenv("LLM_CACHE_LOCAL_SIZE", "256")),
+    l1_ttl=int(os.getenv("LLM_CACHE_LOCAL_TTL", "300")),
+)
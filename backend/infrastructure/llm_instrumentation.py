@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Type
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import PydanticOutputParser
+from pydantic import BaseModel, ValidationError
+
+from infrastructure.metrics import metrics
+from templates import prompt_templates
+
+load_dotenv()
+
+logger = logging.getLogger("llm")
+
+# USD per million tokens, for the cost counters; 0 disables them
+INPUT_COST_PER_MTOK = float(os.getenv("LLM_INPUT_COST_PER_MTOK", "0"))
+OUTPUT_COST_PER_MTOK = float(os.getenv("LLM_OUTPUT_COST_PER_MTOK", "0"))
+
+
+def _template_names() -> Dict[str, str]:
+    # STORYBOARD_PROMPT_TEMPLATE -> "storyboard", Caption_PROMPT_TEMPLATE -> "caption", ...
+    return {
+        value: name.lower().removesuffix("_prompt_template")
+        for name, value in vars(prompt_templates).items()
+        if name.upper().endswith("_PROMPT_TEMPLATE") and isinstance(value, str)
+    }
+
+
+TEMPLATE_NAMES = _template_names()
+
+
+def template_name(prompt_template_str: str) -> str:
+    return TEMPLATE_NAMES.get(prompt_template_str, "custom")
+
+
+class CallStats:
+    """
+    What one instrumented block spent: model calls, tokens and retries.
+    """
+
+    def __init__(self, template: str, endpoint: str):
+        self.template = template
+        self.endpoint = endpoint
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.retries = 0
+
+
+_current: ContextVar[Optional[CallStats]] = ContextVar("llm_call_stats", default=None)
+
+
+class UsageCallback(BaseCallbackHandler):
+    """
+    Adds the token usage Gemini reports on each response to the current CallStats.
+    """
+
+    def __init__(self, stats: CallStats):
+        self.stats = stats
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.stats.llm_calls += 1
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.stats.prompt_tokens += usage.get("input_tokens", 0)
+                self.stats.completion_tokens += usage.get("output_tokens", 0)
+
+
+class _RetryLogCounter(logging.Handler):
+    """
+    The Gemini client retries inside tenacity without telling LangChain; its
+    only trace is a "Retrying ..." warning, which is counted here against the
+    CallStats of the request that triggered it.
+    """
+
+    def emit(self, record: logging.LogRecord):
+        stats = _current.get()
+        if stats is not None and record.getMessage().startswith("Retrying"):
+            stats.retries += 1
+
+
+logging.getLogger("langchain_google_genai.chat_models").addHandler(_RetryLogCounter())
+
+
+def _outcome(error: Optional[BaseException]) -> str:
+    if error is None:
+        return "ok"
+    if isinstance(error, (OutputParserException, ValidationError)):
+        return "parse_error"
+    return "error"
+
+
+def _record(stats: CallStats, started: float, error: Optional[BaseException]):
+    latency = time.time() - started
+    outcome = _outcome(error)
+    labels = {"template": stats.template, "endpoint": stats.endpoint}
+
+    metrics.increment("llm_requests_total", outcome=outcome, **labels)
+    metrics.observe("llm_request_seconds", latency, **labels)
+    metrics.increment("llm_calls_total", stats.llm_calls, **labels)
+    metrics.increment("llm_prompt_tokens_total", stats.prompt_tokens, **labels)
+    metrics.increment("llm_completion_tokens_total", stats.completion_tokens, **labels)
+    metrics.increment("llm_retries_total", stats.retries, **labels)
+    if outcome == "parse_error":
+        metrics.increment("llm_output_parse_failures_total", **labels)
+    cost = (stats.prompt_tokens * INPUT_COST_PER_MTOK + stats.completion_tokens * OUTPUT_COST_PER_MTOK) / 1e6
+    if cost:
+        metrics.increment("llm_cost_usd_total", cost, **labels)
+
+    entry = {
+        "event": "llm_request",
+        **labels,
+        "outcome": outcome,
+        "latency_ms": round(latency * 1000, 1),
+        "llm_calls": stats.llm_calls,
+        "prompt_tokens": stats.prompt_tokens,
+        "completion_tokens": stats.completion_tokens,
+        "retries": stats.retries,
+        "cost_usd": round(cost, 6),
+    }
+    if error is not None:
+        entry["error"] = str(error)[:200]
+    logger.info(json.dumps(entry))
+
+
+@contextmanager
+def instrument(prompt_template_str: str, endpoint: Optional[str]):
+    """
+    Measures the LLM work done inside the block; yields the LangChain
+    callback to pass in the chain's config.
+    """
+    stats = CallStats(template_name(prompt_template_str), endpoint or "internal")
+    # Restored by value rather than reset(): streaming generators may exit
+    # this block from a different context than the one they entered it in
+    previous = _current.get()
+    _current.set(stats)
+    started = time.time()
+    try:
+        yield UsageCallback(stats)
+    except BaseException as e:
+        _record(stats, started, e)
+        raise
+    else:
+        _record(stats, started, None)
+    finally:
+        _current.set(previous)
+
+
+def record_item_failures(prompt_template_str: str, endpoint: Optional[str], results: list):
+    """
+    Counts output-parse failures among batch items returned as exceptions.
+    """
+    labels = {"template": template_name(prompt_template_str), "endpoint": endpoint or "internal"}
+    for result in results:
+        if isinstance(result, BaseException) and _outcome(result) == "parse_error":
+            metrics.increment("llm_output_parse_failures_total", **labels)
+
+
+def prompt_size_report(pydantic_models: Dict[str, Type[BaseModel]]) -> Dict[str, Any]:
+    """
+    Size of each template's own text against the PydanticOutputParser
+    format instructions appended to it, in characters and estimated tokens
+    (about 4 characters per token). ``pydantic_models`` maps template names
+    to their response models.
+    """
+    report = {}
+    for template, name in TEMPLATE_NAMES.items():
+        model = pydantic_models.get(name)
+        if model is None:
+            continue
+        instructions = PydanticOutputParser(pydantic_object=model).get_format_instructions()
+        total = len(template) + len(instructions)
+        report[name] = {
+            "template_chars": len(template),
+            "format_instructions_chars": len(instructions),
+            "estimated_prompt_tokens": total // 4,
+            "format_instructions_share": round(len(instructions) / total, 3),
+        }
+    return report
@@ -0,0 +1,294 @@
+import fcntl
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Dict, List, Optional
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+from infrastructure.http_client import get_client
+from infrastructure.metrics import metrics
+from infrastructure.storage_service import download_to_path, upload_path
+
+load_dotenv()
+
+logger = logging.getLogger("media_cache")
+
+# Seconds between attempts to take a lock file that renders hold pinned
+FILL_LOCK_POLL = 0.2
+
+
+class MediaLease:
+    """
+    The files fetched through one render. Each stays pinned (a shared flock
+    on its lock file) until the lease is closed, so neither this process nor
+    another worker on the host evicts it while ffmpeg may still read it.
+    """
+
+    def __init__(self, cache: "MediaCache"):
+        self.cache = cache
+        self._pins: List[IO] = []
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str) -> str:
+        """
+        Returns a local path holding the content of ``url``, downloading it if needed.
+        """
+        return self.cache._fetch(url, self)
+
+    def fetch_all(self, urls: List[str]) -> List[str]:
+        """
+        Fetches several URLs in parallel, returning local paths in the same order.
+        """
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.cache.concurrency, len(urls))) as executor:
+            return list(executor.map(self.fetch, urls))
+
+    def _add(self, pin: IO):
+        with self._lock:
+            self._pins.append(pin)
+
+    def close(self):
+        with self._lock:
+            pins, self._pins = self._pins, []
+        for pin in pins:
+            pin.close()  # closing the descriptor releases its flock
+
+    def __enter__(self) -> "MediaLease":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MediaCache:
+    """
+    Disk cache of remote clips and music on a worker, so ffmpeg reads local
+    files instead of streaming every URL again on every render.
+
+    - Files are named by the SHA-256 of their URL and evicted least recently
+      used first once the directory exceeds ``max_bytes``. Files pinned by
+      an open MediaLease (in any process on the host) are never evicted.
+    - At most ``concurrency`` downloads run at once per process.
+    - Concurrent requests for the same URL download it once: threads share a
+      Future, and processes on the same host serialize on a lock file. Lock
+      files are deleted with their entry on eviction.
+    - With ``mirror_bucket`` set, misses are first looked up in MinIO and new
+      downloads are copied there so other workers skip the CDN.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        concurrency: int = 4,
+        mirror_bucket: Optional[str] = None,
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self.mirror_bucket = mirror_bucket
+        self._download_slots = threading.BoundedSemaphore(concurrency)
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def lease(self) -> MediaLease:
+        """
+        Starts a lease; use it as a context manager around everything that reads the fetched files.
+        """
+        return MediaLease(self)
+
+    def path_for(self, url: str) -> str:
+        extension = os.path.splitext(urlparse(url).path)[1] or ".bin"
+        return os.path.join(self.directory, hashlib.sha256(url.encode()).hexdigest() + extension)
+
+    def _fetch(self, url: str, lease: MediaLease) -> str:
+        path = self.path_for(url)
+        filled = False
+        # Another worker may evict the file between the download and the pin; fetch it again then
+        for _ in range(3):
+            pin = self._pin(path)
+            if os.path.exists(path):
+                os.utime(path)  # mark as recently used; pinned, so eviction cannot race it
+                lease._add(pin)
+                if filled:
+                    self._evict()
+                else:
+                    metrics.increment("media_cache_requests_total", result="hit")
+                return path
+            pin.close()
+            self._fill_once(url, path)
+            filled = True
+        raise Exception(f"Media cache could not keep {url}: evicted as soon as it was downloaded")
+
+    def _fill_once(self, url: str, path: str):
+        with self._inflight_lock:
+            future = self._inflight.get(url)
+            if future is None and os.path.exists(path):
+                return  # filled by a request that finished since _fetch looked
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[url] = future
+
+        if not owner:
+            metrics.increment("media_cache_requests_total", result="shared")
+            future.result()
+            return
+
+        try:
+            future.set_result(self._fill(url, path))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(url, None)
+        future.result()
+
+    def _lock(self, path: str, operation: int) -> Optional[IO]:
+        """
+        Opens the lock file of ``path`` and flocks it with ``operation``;
+        returns None if LOCK_NB was given and the lock is held. Eviction
+        deletes lock files, so a lock taken on a file that was deleted
+        meanwhile is dropped and taken again on the current one.
+        """
+        lock_path = path + ".lock"
+        while True:
+            lock_file = open(lock_path, "a")
+            try:
+                fcntl.flock(lock_file, operation)
+            except BlockingIOError:
+                lock_file.close()
+                return None
+            try:
+                if os.fstat(lock_file.fileno()).st_ino == os.stat(lock_path).st_ino:
+                    return lock_file
+            except FileNotFoundError:
+                pass
+            lock_file.close()
+
+    def _pin(self, path: str) -> IO:
+        # Shared lock: any number of renders may pin a file, eviction needs it exclusively
+        return self._lock(path, fcntl.LOCK_SH)
+
+    def _fill(self, url: str, path: str) -> str:
+        # The exclusive lock is not waited for: renders pinning the file once
+        # it exists (this process's own included) would hold it off forever
+        while True:
+            lock_file = self._lock(path, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if lock_file is not None:
+                break
+            if os.path.exists(path):
+                metrics.increment("media_cache_requests_total", result="shared")
+                return path
+            # Another process on this host is downloading the same file
+            time.sleep(FILL_LOCK_POLL)
+
+        with lock_file:  # closing the descriptor releases its flock
+            if os.path.exists(path):
+                metrics.increment("media_cache_requests_total", result="shared")
+                return path
+
+            metrics.increment("media_cache_requests_total", result="miss")
+            mirror_key = os.path.basename(path)
+            if self.mirror_bucket and self._from_mirror(mirror_key, path):
+                metrics.increment("media_cache_mirror_hits_total")
+            else:
+                self._download(url, path)
+                if self.mirror_bucket:
+                    threading.Thread(
+                        target=self._to_mirror, args=(path, mirror_key), daemon=True
+                    ).start()
+        return path
+
+    def _download(self, url: str, path: str):
+        started = time.time()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        try:
+            with self._download_slots, os.fdopen(fd, "wb") as tmp_file:
+                with get_client().stream("GET", url) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_bytes(chunk_size=1024 * 1024):
+                        tmp_file.write(chunk)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        metrics.increment("media_cache_downloaded_bytes_total", os.path.getsize(path))
+        metrics.observe("media_cache_download_seconds", time.time() - started)
+
+    def _from_mirror(self, key: str, path: str) -> bool:
+        tmp_path = path + ".mirror"
+        try:
+            if download_to_path(key, self.mirror_bucket, tmp_path):
+                os.replace(tmp_path, path)
+                return True
+        except Exception as e:
+            logger.warning(f"Mirror lookup for {key} failed: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+
+    def _to_mirror(self, path: str, key: str):
+        try:
+            upload_path(path, key, self.mirror_bucket)
+        except Exception as e:
+            logger.warning(f"Mirroring {key} to {self.mirror_bucket} failed: {e}")
+
+    def _evict(self):
+        entries = []
+        names = os.listdir(self.directory)
+        for name in names:
+            if name.endswith(".lock"):
+                # Left by a download that failed: nothing to keep it for
+                if name.removesuffix(".lock") not in names:
+                    self._remove_unpinned(os.path.join(self.directory, name.removesuffix(".lock")))
+                continue
+            if name.endswith((".part", ".mirror")):
+                continue
+            file_path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if self._remove_unpinned(file_path):
+                total -= size
+                metrics.increment("media_cache_evictions_total")
+            else:
+                metrics.increment("media_cache_eviction_skips_total")
+
+    def _remove_unpinned(self, file_path: str) -> bool:
+        lock_file = self._lock(file_path, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        if lock_file is None:
+            return False  # pinned by a render, or being downloaded
+        with lock_file:
+            # The lock file goes too, while still locked: anyone waiting on it
+            # notices in _lock and locks the path's new lock file instead
+            for stale_path in (file_path, file_path + ".lock"):
+                try:
+                    os.remove(stale_path)
+                except FileNotFoundError:
+                    pass
+        return True
+
+
+media_cache = MediaCache(
+    directory=os.getenv("MEDIA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "socialspark-media")),
+    max_bytes=int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(2 * 1024**3))),
+    concurrency=int(os.getenv("MEDIA_DOWNLOAD_CONCURRENCY", "4")),
+    mirror_bucket=os.getenv("MEDIA_CACHE_MIRROR_BUCKET") or None,
+)
@@ -0,0 +1,93 @@
+import os
+import threading
+from fractions import Fraction
+from typing import Optional
+
+import ffmpeg
+from cachetools import LRUCache
+
+_cache = LRUCache(maxsize=int(os.getenv("MEDIA_PROBE_CACHE_SIZE", "2048")))
+_cache_lock = threading.Lock()
+
+
+class VideoInfo:
+    """
+    The ffprobe fields that decide whether clips can be concatenated without re-encoding.
+    """
+
+    def __init__(
+        self,
+        codec: str,
+        profile: str,
+        width: int,
+        height: int,
+        pix_fmt: str,
+        fps: Fraction,
+        time_base: str,
+        has_b_frames: int = 0,
+        duration: Optional[float] = None,
+    ):
+        self.codec = codec
+        self.profile = profile
+        self.width = width
+        self.height = height
+        self.pix_fmt = pix_fmt
+        self.fps = fps
+        self.time_base = time_base
+        self.has_b_frames = has_b_frames
+        self.duration = duration
+
+    def needs_cut(self, duration: float) -> bool:
+        return self.duration is None or self.duration > duration + 0.05
+
+    def stream_signature(self) -> tuple:
+        return (self.codec, self.profile, self.width, self.height, self.pix_fmt, self.fps, self.time_base)
+
+
+def _frame_rate(value: Optional[str]) -> Fraction:
+    try:
+        return Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return Fraction(0)
+
+
+def probe_video(path: str) -> Optional[VideoInfo]:
+    """
+    Returns the first video stream's format, or None if the file has none or
+    cannot be probed. Results are cached per (path, size, inode), so a clip
+    served from the media cache is only probed once per worker process even
+    though cache hits touch its mtime.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_size, stat.st_ino)
+
+    with _cache_lock:
+        if key in _cache:
+            return _cache[key]
+
+    try:
+        streams = ffmpeg.probe(path, select_streams="v:0")["streams"]
+    except (ffmpeg.Error, OSError):
+        streams = []
+
+    info = None
+    if streams:
+        stream = streams[0]
+        info = VideoInfo(
+            codec=stream.get("codec_name"),
+            profile=stream.get("profile"),
+            width=int(stream.get("width", 0)),
+            height=int(stream.get("height", 0)),
+            pix_fmt=stream.get("pix_fmt"),
+            fps=_frame_rate(stream.get("r_frame_rate")),
+            time_base=stream.get("time_base"),
+            has_b_frames=int(stream.get("has_b_frames", 0)),
+            duration=float(stream["duration"]) if stream.get("duration") else None,
+        )
+
+    with _cache_lock:
+        _cache[key] = info
+    return info
@@ -0,0 +1,61 @@
+import threading
+from typing import Dict, Tuple
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process counters and summaries shared by the services.
+
+    Each process (web, worker, poller) keeps its own registry; values are
+    keyed by metric name plus a sorted tuple of label pairs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, tuple], float] = {}
+        self._summaries: Dict[Tuple[str, tuple], Dict[str, float]] = {}
+
+    def increment(self, name: str, amount: float = 1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is None:
+                self._summaries[key] = {"count": 1, "sum": value, "min": value, "max": value}
+            else:
+                summary["count"] += 1
+                summary["sum"] += value
+                summary["min"] = min(summary["min"], value)
+                summary["max"] = max(summary["max"], value)
+
+    def counter_value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0.0)
+
+    def snapshot(self) -> dict:
+        """
+        Returns a JSON-friendly copy of every counter and summary.
+        """
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in self._counters.items()
+                ],
+                "summaries": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        **summary,
+                        "avg": summary["sum"] / summary["count"],
+                    }
+                    for (name, labels), summary in self._summaries.items()
+                ],
+            }
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,195 @@
+import json
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from langchain_core.exceptions import OutputParserException
+from langchain_core.output_parsers import BaseOutputParser, PydanticOutputParser
+from langchain_core.outputs import Generation
+from langchain_core.runnables import Runnable
+from langchain_core.utils.json import parse_partial_json
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+from domain.captions_dto import CaptiononResponse
+from domain.videos_dto import StoryboardResponse
+from infrastructure.llm_instrumentation import instrument
+from infrastructure.metrics import metrics
+from templates.prompt_templates import FIX_UP_PROMPT_TEMPLATE
+
+logger = logging.getLogger("output_repair")
+
+_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+def lenient_json(text: str) -> Any:
+    """
+    Parses model output that is almost JSON: wrapped in code fences or prose,
+    with smart quotes, trailing commas, raw newlines in strings, or cut off
+    before the closing brackets. Raises ValueError if nothing can be recovered.
+    """
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        raise ValueError("no JSON object in output")
+    text = _TRAILING_COMMA.sub(r"\1", text[start:].translate(_SMART_QUOTES))
+
+    end = max(text.rfind("}"), text.rfind("]"))
+    if end >= 0:
+        try:
+            return json.loads(text[: end + 1], strict=False)
+        except json.JSONDecodeError:
+            pass
+    # Truncated output: parse_partial_json closes open strings and brackets
+    parsed = parse_partial_json(text)
+    if parsed is None:
+        raise ValueError("output is not parseable as JSON")
+    return parsed
+
+
+def _clamp_shot_durations(data: dict) -> dict:
+    # Shot.duration is described as 3 - 5 seconds; models drift to 2, 6, "4s" or 4.5
+    for shot in data.get("shots") or []:
+        if isinstance(shot, dict) and "duration" in shot:
+            try:
+                duration = round(float(str(shot["duration"]).rstrip("s ")))
+            except (ValueError, OverflowError, TypeError):
+                # "four", "inf", "nan" and the like are left for validation to reject
+                continue
+            shot["duration"] = min(max(duration, 3), 5)
+    return data
+
+
+def _split_hashtags(data: dict) -> dict:
+    if isinstance(data.get("hashtags"), str):
+        data["hashtags"] = data["hashtags"].replace(",", " ").split()
+    return data
+
+
+# Response model -> in-place fixes applied to its parsed JSON before validation
+COERCIONS: Dict[Type[BaseModel], List[Callable[[dict], dict]]] = {
+    StoryboardResponse: [_clamp_shot_durations],
+    CaptiononResponse: [_split_hashtags],
+}
+
+
+def coerce_to_model(data: Any, pydantic_model: Type[BaseModel]) -> BaseModel:
+    """
+    Validates parsed output against ``pydantic_model`` after applying the
+    model's known coercions. Raises ValidationError if it still does not fit.
+    """
+    if isinstance(data, dict):
+        for coerce in COERCIONS.get(pydantic_model, []):
+            data = coerce(data)
+    return pydantic_model.model_validate(data)
+
+
+def _model_label(pydantic_model: Type[BaseModel]) -> str:
+    return pydantic_model.__name__
+
+
+class RepairingOutputParser(BaseOutputParser):
+    """
+    PydanticOutputParser that repairs output instead of failing the request.
+
+    1. The normal parse.
+    2. Local fixes: lenient JSON parsing and the model's COERCIONS.
+    3. Only if those fail, and a ``fixer`` chain is set: one small fix-up
+       prompt containing the bad output and the validation errors (not the
+       original prompt), whose answer goes through step 2 again.
+
+    Outputs that need repair and the time spent repairing them are recorded
+    per response model.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    pydantic_object: Type[BaseModel]
+    fixer: Optional[Runnable] = None
+
+    @property
+    def _type(self) -> str:
+        return "repairing_pydantic"
+
+    def get_format_instructions(self) -> str:
+        return PydanticOutputParser(pydantic_object=self.pydantic_object).get_format_instructions()
+
+    def parse(self, text: str) -> BaseModel:
+        parsed, first_error = self._parse(text)
+        if first_error is None:
+            return parsed
+
+        started = time.time()
+        repaired = self._local_repair(text)
+        if repaired is not None:
+            return self._done("local", started, repaired)
+        if self.fixer is None:
+            return self._fail(started, text, first_error)
+
+        with instrument(FIX_UP_PROMPT_TEMPLATE, "repair") as callback:
+            fixed_text = self.fixer.invoke(self._fixer_input(text, first_error), config={"callbacks": [callback]})
+        repaired = self._local_repair(fixed_text)
+        if repaired is not None:
+            return self._done("fixup", started, repaired)
+        return self._fail(started, text, first_error)
+
+    async def aparse(self, text: str) -> BaseModel:
+        parsed, first_error = self._parse(text)
+        if first_error is None:
+            return parsed
+
+        started = time.time()
+        repaired = self._local_repair(text)
+        if repaired is not None:
+            return self._done("local", started, repaired)
+        if self.fixer is None:
+            return self._fail(started, text, first_error)
+
+        with instrument(FIX_UP_PROMPT_TEMPLATE, "repair") as callback:
+            fixed_text = await self.fixer.ainvoke(
+                self._fixer_input(text, first_error), config={"callbacks": [callback]}
+            )
+        repaired = self._local_repair(fixed_text)
+        if repaired is not None:
+            return self._done("fixup", started, repaired)
+        return self._fail(started, text, first_error)
+
+    async def aparse_result(self, result: List[Generation], *, partial: bool = False) -> BaseModel:
+        return await self.aparse(result[0].text)
+
+    def _parse(self, text: str) -> Tuple[Optional[BaseModel], Optional[OutputParserException]]:
+        try:
+            return PydanticOutputParser(pydantic_object=self.pydantic_object).parse(text), None
+        except OutputParserException as e:
+            metrics.increment("llm_output_invalid_total", model=_model_label(self.pydantic_object))
+            return None, e
+
+    def _local_repair(self, text: str) -> Optional[BaseModel]:
+        try:
+            return coerce_to_model(lenient_json(text), self.pydantic_object)
+        except (ValueError, ValidationError):
+            return None
+
+    def _fixer_input(self, text: str, error: Exception) -> dict:
+        return {
+            "output": text,
+            "errors": str(error),
+            "format_instructions": self.get_format_instructions(),
+        }
+
+    def _done(self, stage: str, started: float, repaired: BaseModel) -> BaseModel:
+        label = _model_label(self.pydantic_object)
+        metrics.increment("llm_output_repairs_total", model=label, result=stage)
+        metrics.observe("llm_output_repair_seconds", time.time() - started, model=label, result=stage)
+        return repaired
+
+    def _fail(self, started: float, text: str, error: Exception):
+        label = _model_label(self.pydantic_object)
+        metrics.increment("llm_output_repairs_total", model=label, result="failed")
+        metrics.observe("llm_output_repair_seconds", time.time() - started, model=label, result="failed")
+        logger.warning(f"Could not repair {label} output: {error}")
+        raise OutputParserException(f"Could not repair {label} output: {error}", llm_output=text)
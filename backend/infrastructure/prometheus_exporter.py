@@ -0,0 +1,227 @@
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from collections import defaultdict
+from typing import List, Optional, Sequence, Tuple
+
+import redis
+from dotenv import load_dotenv
+
+from infrastructure.metrics import MetricsRegistry, metrics
+
+load_dotenv()
+
+logger = logging.getLogger("prometheus_exporter")
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest, start_http_server
+    from prometheus_client.core import Metric
+
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+
+# Processes without an HTTP endpoint (Celery workers) publish their registry
+# under this prefix; the API merges every live snapshot into its /metrics.
+# Seconds between snapshots; 0 turns publishing off
+PUBLISHED_METRICS_PREFIX = "metrics:published:"
+METRICS_PUBLISH_INTERVAL = float(os.getenv("METRICS_PUBLISH_INTERVAL", "15"))
+
+
+def _metric_name(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_:]", "_", name)
+
+
+class PublishedSnapshots:
+    """
+    Registry snapshots that other processes wrote with start_metrics_publisher.
+    """
+
+    def __init__(self, redis_url: str):
+        self.client = redis.Redis.from_url(redis_url, socket_timeout=2)
+
+    def read(self) -> List[Tuple[str, dict]]:
+        keys = list(self.client.scan_iter(match=f"{PUBLISHED_METRICS_PREFIX}*", count=500))
+        if not keys:
+            return []
+        return [
+            (key.decode().removeprefix(PUBLISHED_METRICS_PREFIX).split(":", 1)[0], json.loads(value))
+            for key, value in zip(keys, self.client.mget(keys))
+            if value is not None
+        ]
+
+
+class RegistryCollector:
+    """
+    Exposes an in-process MetricsRegistry to Prometheus at scrape time:
+    counters as counters, summaries as summaries (count and sum).
+
+    With ``published``, the registries of other processes are merged in,
+    summed per kind of process and labelled with it (process="worker").
+    """
+
+    def __init__(self, registry: MetricsRegistry, published: Optional[PublishedSnapshots] = None):
+        self.registry = registry
+        self.published = published
+
+    def _snapshots(self) -> List[Tuple[dict, dict]]:
+        snapshots = [({}, self.registry.snapshot())]
+        if self.published is not None:
+            try:
+                snapshots += [({"process": source}, snapshot) for source, snapshot in self.published.read()]
+            except (redis.RedisError, ValueError) as e:
+                logger.warning(f"Could not read published metrics: {e}")
+        return snapshots
+
+    def collect(self):
+        counters = defaultdict(float)
+        summaries = defaultdict(lambda: {"count": 0, "sum": 0.0})
+        for extra_labels, snapshot in self._snapshots():
+            for counter in snapshot["counters"]:
+                labels = {**{key: str(value) for key, value in counter["labels"].items()}, **extra_labels}
+                name = _metric_name(counter["name"]).removesuffix("_total")
+                counters[(name, tuple(sorted(labels.items())))] += counter["value"]
+            for summary in snapshot["summaries"]:
+                labels = {**{key: str(value) for key, value in summary["labels"].items()}, **extra_labels}
+                merged = summaries[(_metric_name(summary["name"]), tuple(sorted(labels.items())))]
+                merged["count"] += summary["count"]
+                merged["sum"] += summary["sum"]
+
+        families = {}
+        for (name, labels), value in counters.items():
+            if name not in families:
+                families[name] = Metric(name, f"{name} (in-process counter)", "counter")
+            families[name].add_sample(f"{name}_total", dict(labels), value)
+        yield from families.values()
+
+        families = {}
+        for (name, labels), summary in summaries.items():
+            if name not in families:
+                families[name] = Metric(name, f"{name} (in-process summary)", "summary")
+            families[name].add_sample(f"{name}_count", dict(labels), summary["count"])
+            families[name].add_sample(f"{name}_sum", dict(labels), summary["sum"])
+        yield from families.values()
+
+
+class QueueDepthCollector:
+    """
+    Messages waiting in each Celery queue, and delivered but not yet
+    acknowledged (running or reserved), read from the Redis broker at
+    scrape time.
+    """
+
+    def __init__(self, broker_url: str, queues: List[str]):
+        self.client = redis.Redis.from_url(broker_url, socket_timeout=2)
+        self.queues = queues
+
+    def collect(self):
+        try:
+            with self.client.pipeline(transaction=False) as pipe:
+                for queue in self.queues:
+                    pipe.llen(queue)
+                pipe.hlen("unacked")
+                *depths, unacked = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not read Celery queue depths: {e}")
+            return
+
+        family = Metric("celery_queue_depth", "Messages waiting in the Celery queue", "gauge")
+        for queue, depth in zip(self.queues, depths):
+            family.add_sample("celery_queue_depth", {"queue": queue}, depth)
+        yield family
+        family = Metric("celery_unacked_messages", "Messages delivered to workers and not yet acknowledged", "gauge")
+        family.add_sample("celery_unacked_messages", {}, unacked)
+        yield family
+
+
+class FairQueueCollector:
+    """
+    Renders waiting in the fair queue (repository.render_queue_repository)
+    per Celery queue and lane, read at scrape time.
+    """
+
+    def __init__(self, queues: List[str]):
+        self.queues = queues
+
+    def collect(self):
+        from repository import render_queue_repository
+
+        try:
+            pending = {queue: render_queue_repository.pending(queue) for queue in self.queues}
+        except redis.RedisError as e:
+            logger.warning(f"Could not read the fair queue: {e}")
+            return
+
+        family = Metric("render_fair_queue_pending", "Renders waiting in the fair queue for dispatch", "gauge")
+        for queue, lanes in pending.items():
+            for lane, depth in lanes.items():
+                family.add_sample("render_fair_queue_pending", {"queue": queue, "lane": lane}, depth)
+        yield family
+
+
+def celery_queue_names() -> List[str]:
+    from infrastructure.celery_app import celery_app
+
+    return [queue.name for queue in celery_app.conf.task_queues or []] or ["celery"]
+
+
+def _build_registry(broker_url: Optional[str] = None):
+    registry = CollectorRegistry()
+    if broker_url and broker_url.startswith("redis"):
+        registry.register(RegistryCollector(metrics, PublishedSnapshots(broker_url)))
+        registry.register(QueueDepthCollector(broker_url, celery_queue_names()))
+    else:
+        registry.register(RegistryCollector(metrics))
+    return registry
+
+
+# The API's registry also reports the workers' metrics and the broker's queue depths
+prometheus_registry = _build_registry(os.getenv("CELERY_BROKER_URI")) if PROMETHEUS_AVAILABLE else None
+
+
+def render_latest() -> Tuple[bytes, str]:
+    """
+    Returns this process's metrics in the Prometheus text format.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        raise Exception("prometheus_client is not installed")
+    return generate_latest(prometheus_registry), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int, collectors: Sequence = ()):
+    """
+    Serves /metrics on ``port`` from a background thread, for processes
+    without an HTTP API such as the Stable Horde poller. ``collectors`` are
+    registered alongside the process's own metrics.
+    """
+    if not PROMETHEUS_AVAILABLE:
+        raise Exception("prometheus_client is not installed")
+    registry = _build_registry()
+    for collector in collectors:
+        registry.register(collector)
+    start_http_server(port, registry=registry)
+
+
+def start_metrics_publisher(redis_url: str, source: str, interval: float = METRICS_PUBLISH_INTERVAL):
+    """
+    Writes this process's registry to Redis every ``interval`` seconds from a
+    daemon thread, for processes that cannot serve /metrics themselves such
+    as prefork Celery workers. The key expires once the process is gone, so
+    the API's totals drop its counters like a Prometheus counter reset.
+    """
+    client = redis.Redis.from_url(redis_url, socket_timeout=2)
+    key = f"{PUBLISHED_METRICS_PREFIX}{source}:{socket.gethostname()}:{os.getpid()}"
+
+    def publish():
+        while True:
+            try:
+                client.set(key, json.dumps(metrics.snapshot()), ex=max(int(interval * 4), 60))
+            except redis.RedisError as e:
+                logger.warning(f"Could not publish metrics: {e}")
+            time.sleep(interval)
+
+    threading.Thread(target=publish, name="metrics-publisher", daemon=True).start()
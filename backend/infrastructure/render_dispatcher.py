@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+import redis
+from dotenv import load_dotenv
+
+from infrastructure.celery_app import TASK_QUEUES, celery_app
+from infrastructure.metrics import metrics
+from infrastructure.prometheus_exporter import FairQueueCollector, start_metrics_server
+from repository import render_queue_repository
+from repository.render_queue_repository import QueuedRender
+
+load_dotenv()
+
+logger = logging.getLogger("render_dispatcher")
+logger.setLevel(logging.INFO)
+if not logger.hasHandlers():
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    ch.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+    logger.addHandler(ch)
+
+# "fair" holds renders in the per-tenant fair queue until the dispatcher
+# releases them; "direct" sends them straight to Celery (FIFO)
+RENDER_DISPATCH_MODE = os.getenv("RENDER_DISPATCH_MODE", "fair")
+
+# Tenants without an entry get weight 1
+DEFAULT_TENANT = "default"
+
+
+def tenant_weights() -> Dict[str, float]:
+    """
+    Parses RENDER_TENANT_WEIGHTS ("acme=3,globex=0.5"): a tenant with weight
+    3 is dispatched three renders for every one of a weight-1 tenant while
+    both have work waiting.
+    """
+    weights = {}
+    for entry in os.getenv("RENDER_TENANT_WEIGHTS", "").split(","):
+        tenant, _, weight = entry.partition("=")
+        if tenant.strip() and weight.strip():
+            weights[tenant.strip()] = float(weight)
+    return weights
+
+
+TENANT_WEIGHTS = tenant_weights()
+
+# Label for the tenants that are not listed in RENDER_TENANT_WEIGHTS
+OTHER_TENANT_LABEL = "other"
+
+
+def tenant_label(tenant: str) -> str:
+    """
+    Metric label for ``tenant``: its name for the default tenant and those
+    in RENDER_TENANT_WEIGHTS, OTHER_TENANT_LABEL for everyone else, so the
+    tenant label's cardinality is bounded by configuration rather than by
+    request input.
+    """
+    return tenant if tenant == DEFAULT_TENANT or tenant in TENANT_WEIGHTS else OTHER_TENANT_LABEL
+
+# Bounds on one render's cost (seconds of video), so a single request can
+# neither push its tenant's share out indefinitely nor get in for free
+RENDER_MIN_COST = 1.0
+RENDER_MAX_COST = float(os.getenv("RENDER_MAX_COST", "300"))
+
+
+def enqueue_render(task, args: list, task_id: str, tenant: Optional[str], priority: str, cost: float = 1.0):
+    """
+    Submits a render task under ``task_id``. In fair mode it waits in its
+    tenant's share of the ``priority`` lane until the dispatcher sends it to
+    Celery; until then its status reads as queued like any pending task.
+    ``cost`` is clamped to [RENDER_MIN_COST, RENDER_MAX_COST].
+    """
+    tenant = tenant or DEFAULT_TENANT
+    cost = min(max(cost, RENDER_MIN_COST), RENDER_MAX_COST)
+    metrics.increment("render_submitted_total", tenant=tenant_label(tenant), lane=priority)
+    if RENDER_DISPATCH_MODE == "direct":
+        task.apply_async(args=args, task_id=task_id)
+        return
+    render_queue_repository.push(
+        QueuedRender(
+            task_name=task.name,
+            task_id=task_id,
+            args=args,
+            queue=TASK_QUEUES[task.name],
+            tenant=tenant,
+            lane=priority,
+            cost=cost,
+        ),
+        TENANT_WEIGHTS.get(tenant, 1.0),
+    )
+
+
+class RenderDispatcher:
+    """
+    Feeds the render queues from the fair queue only as fast as the workers
+    drain them.
+
+    Celery queues are FIFO, so anything already in them is served in arrival
+    order. The dispatcher keeps at most ``slack`` messages waiting in each
+    Celery queue and fills the free places from repository.render_queue_repository:
+    interactive renders first, and within a lane the tenant whose share is
+    furthest behind.
+
+    Run one dispatcher per deployment: on startup it requeues the renders a
+    previous one popped but did not get to send.
+    """
+
+    def __init__(self, broker_url: str, queues: List[str], slack: int = 2, tick: float = 0.5, stats_interval: float = 300):
+        self.broker = redis.Redis.from_url(broker_url, socket_timeout=5)
+        self.queues = queues
+        self.slack = slack
+        self.tick = tick
+        self.stats_interval = stats_interval
+
+    async def run(self):
+        logger.info(f"Dispatching {', '.join(self.queues)} renders, keeping {self.slack} waiting per queue")
+        for queue in self.queues:
+            requeued = await asyncio.to_thread(render_queue_repository.requeue_processing, queue)
+            if requeued:
+                logger.warning(f"Requeued {requeued} {queue} renders left undispatched by a previous dispatcher")
+        last_stats = time.time()
+        while True:
+            try:
+                await asyncio.to_thread(self.dispatch_once)
+            except Exception as e:
+                logger.error(f"Dispatch cycle failed: {e}", exc_info=True)
+            if time.time() - last_stats >= self.stats_interval:
+                try:
+                    pruned = sum(await asyncio.to_thread(render_queue_repository.prune_finish_tags, queue) for queue in self.queues)
+                    pending = {queue: render_queue_repository.pending(queue) for queue in self.queues}
+                    logger.info(f"Waiting renders: {pending}; dropped {pruned} idle tenants' finish tags; dispatcher metrics: {metrics.snapshot()}")
+                except Exception as e:
+                    logger.error(f"Fair queue housekeeping failed: {e}", exc_info=True)
+                last_stats = time.time()
+            await asyncio.sleep(self.tick)
+
+    def dispatch_once(self) -> int:
+        dispatched = 0
+        for queue in self.queues:
+            free = self.slack - self.broker.llen(queue)
+            while free > 0:
+                job = render_queue_repository.pop(queue)
+                if job is None:
+                    break
+                self._send(job)
+                dispatched += 1
+                free -= 1
+        return dispatched
+
+    def _send(self, job: QueuedRender):
+        try:
+            celery_app.send_task(job.task_name, args=job.args, task_id=job.task_id, queue=job.queue)
+        except Exception:
+            # Back into the fair queue (behind the tenant's other renders) rather than lost
+            render_queue_repository.push_back(job, TENANT_WEIGHTS.get(job.tenant, 1.0))
+            raise
+        render_queue_repository.ack(job)
+        wait = time.time() - job.enqueued_at
+        labels = {"tenant": tenant_label(job.tenant), "lane": job.lane, "queue": job.queue}
+        metrics.increment("render_dispatched_total", **labels)
+        metrics.observe("render_queue_wait_seconds", wait, **labels)
+        logger.info(f"Dispatched {job.lane} render {job.task_id} for {job.tenant} after {wait:.1f}s")
+
+
+def main():
+    queues = list(dict.fromkeys(TASK_QUEUES[f"usecases.tasks.{name}"] for name in ("render_video", "render_image")))
+    metrics_port = os.getenv("RENDER_DISPATCHER_METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(int(metrics_port), [FairQueueCollector(queues)])
+
+    dispatcher = RenderDispatcher(
+        os.getenv("CELERY_BROKER_URI"),
+        queues,
+        slack=int(os.getenv("RENDER_DISPATCH_SLACK", "2")),
+    )
+    asyncio.run(dispatcher.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,71 @@
-import requests
+import httpx
 import time
 import os
-from typing import Dict, Any
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+from infrastructure.horde_poll_schedule import PollSchedule
+from infrastructure.http_client import get_client
+from infrastructure.metrics import metrics
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header, given as delay-seconds or an HTTP-date
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class StableHordeHTTPError(Exception):
+    """
+    Non-success response from Stable Horde, keeping the status for backoff decisions
+    """
+    def __init__(self, message: str, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code == 429 or self.status_code >= 500
 
 
 class StableHordeService:
     def __init__(self):
-        self.base_url = "https://stablehorde.net/api/v2"
+        self.base_url = os.getenv("STABLE_HORDE_BASE_URL", "https://stablehorde.net/api/v2")
         self.api_key = os.getenv("STABLE_HORDE_API_KEY", "0000000000")
         print(f"[StableHorde] Initialized with API key: {self.api_key}")
     
-    def generate_image(self, prompt: str, style: str = "realistic", aspect_ratio: str = "1:1") -> Dict[str, Any]:
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "apikey": self.api_key
+        }
+
+    def generate_image(self, prompt: str, style: str = "realistic", aspect_ratio: str = "1:1", max_wait: float = 1200) -> Dict[str, Any]:
+        """
+        Generate image using Stable Horde API, blocking until the generation is
+        done or ``max_wait`` seconds have passed
+        """
+        request_id = self.submit_generation(prompt, style=style, aspect_ratio=aspect_ratio)
+
+        # Poll for completion
+        return self._wait_for_generation(request_id, max_wait)
+
+    def submit_generation(self, prompt: str, style: str = "realistic", aspect_ratio: str = "1:1") -> str:
         """
-        Generate image using Stable Horde API
+        Submit a generation request to Stable Horde and return its request ID without waiting
         """
         try:
             # Convert aspect ratio to width/height
@@ -37,18 +90,13 @@ class StableHordeService:
                 "models": ["stable_diffusion"]
             }
             
-            headers = {
-                "Content-Type": "application/json",
-                "apikey": self.api_key
-            }
-            
             print(f"[StableHorde] Submitting request to: {self.base_url}/generate/async")
             
             # Submit generation request with timeout
-            response = requests.post(
+            response = get_client().post(
                 f"{self.base_url}/generate/async",
                 json=payload,
-                headers=headers,
+                headers=self._headers(),
                 timeout=30  # 30 second timeout
             )
             
@@ -65,121 +113,146 @@ class StableHordeService:
                 raise Exception(f"No request ID returned: {request_data}")
             
             print(f"[StableHorde] Request ID: {request_id}")
+            return request_id
             
-            # Poll for completion
-            return self._wait_for_generation(request_id)
-            
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             raise Exception("Request to Stable Horde API timed out")
-        except requests.exceptions.ConnectionError:
+        except httpx.NetworkError:
             raise Exception("Failed to connect to Stable Horde API")
         except Exception as e:
-            print(f"[StableHorde] Error in generate_image: {e}")
+            print(f"[StableHorde] Error in submit_generation: {e}")
             raise
     
-    def _wait_for_generation(self, request_id: str) -> Dict[str, Any]:
+    def _wait_for_generation(self, request_id: str, max_wait: float = 1200) -> Dict[str, Any]:
         """
-        Wait for image generation to complete
+        Wait for image generation to complete, checking on the PollSchedule
+        driven by the horde's wait_time and queue_position
         """
-        headers = {
-            "Content-Type": "application/json",
-            "apikey": self.api_key
-        }
-        
-        max_attempts = 40  # 20 minutes max (30 seconds each)
-        attempts = 0
+        headers = self._headers()
+        schedule = PollSchedule()
+        deadline = time.time() + max_wait
         
         print(f"[StableHorde] Waiting for generation to complete...")
         
-        while attempts < max_attempts:
+        while time.time() < deadline:
+            time.sleep(max(0, min(schedule.state(request_id).next_check_at, deadline) - time.time()))
+            if time.time() >= deadline:
+                break
+            metrics.increment("horde_checks_total")
             try:
-                print(f"[StableHorde] Checking status, attempt {attempts + 1}/{max_attempts}")
-                
-                response = requests.get(
+                response = get_client().get(
                     f"{self.base_url}/generate/check/{request_id}",
                     headers=headers,
                     timeout=15
                 )
-                
-                if response.status_code != 200:
-                    print(f"[StableHorde] Status check failed: {response.status_code} - {response.text}")
-                    time.sleep(30)
-                    attempts += 1
-                    continue
-                
-                status_data = response.json()
-                print(f"[StableHorde] Status: {status_data}")
-                
-                if status_data.get("done", False):
-                    print("[StableHorde] Generation completed, fetching results...")
-                    return self._get_generation_result(request_id)
-                
-                # Check if there's useful info in the status
-                if "queue_position" in status_data:
-                    print(f"[StableHorde] Queue position: {status_data['queue_position']}")
-                if "wait_time" in status_data:
-                    print(f"[StableHorde] Estimated wait time: {status_data['wait_time']} seconds")
-                
-                # Check if request failed
-                if status_data.get("faulted", False):
-                    raise Exception("Image generation failed on Stable Horde")
-                
-                time.sleep(30)  # Wait 30 seconds between checks
-                attempts += 1
-                
-            except requests.exceptions.Timeout:
-                print("[StableHorde] Status check timed out, retrying...")
-                attempts += 1
-                time.sleep(10)
+            except httpx.TransportError as e:
+                delay = schedule.record_error(request_id, time.time())
+                print(f"[StableHorde] Status check failed ({e}), retrying in {delay:.1f}s")
                 continue
-            except Exception as e:
-                print(f"[StableHorde] Error checking status: {e}")
-                if attempts >= max_attempts - 1:
-                    raise
-                attempts += 1
-                time.sleep(10)
+            
+            if response.status_code != 200:
+                error = StableHordeHTTPError(
+                    f"Status check failed: {response.status_code} - {response.text}",
+                    status_code=response.status_code,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                )
+                if not error.retryable:
+                    raise error
+                delay = schedule.record_error(request_id, time.time(), error.retry_after)
+                print(f"[StableHorde] {error}, retrying in {delay:.1f}s")
                 continue
+            
+            status_data = response.json()
+            print(f"[StableHorde] Status: {status_data}")
+            
+            # Check if request failed
+            if status_data.get("faulted", False):
+                raise Exception("Image generation failed on Stable Horde")
+            
+            if status_data.get("done", False):
+                print("[StableHorde] Generation completed, fetching results...")
+                stats = schedule.record_done(request_id, time.time())
+                metrics.observe("horde_checks_per_job", stats["checks"])
+                if stats["detection_lag"] is not None:
+                    metrics.observe("horde_detection_lag_seconds", stats["detection_lag"])
+                return self._get_generation_result(request_id)
+            
+            delay = schedule.record_pending(request_id, status_data, time.time())
+            print(
+                f"[StableHorde] Queue position: {status_data.get('queue_position')}, "
+                f"estimated wait: {status_data.get('wait_time')}s, next check in {delay:.1f}s"
+            )
         
-        raise Exception("Image generation timed out after maximum attempts")
+        raise Exception("Image generation timed out after maximum wait")
     
     def _get_generation_result(self, request_id: str) -> Dict[str, Any]:
         """
         Get the final generation result
         """
-        headers = {
-            "Content-Type": "application/json",
-            "apikey": self.api_key
-        }
-        
         try:
-            result_response = requests.get(
+            result_response = get_client().get(
                 f"{self.base_url}/generate/status/{request_id}",
-                headers=headers,
+                headers=self._headers(),
                 timeout=15
             )
             
             if result_response.status_code != 200:
                 raise Exception(f"Failed to get generation result: {result_response.status_code} - {result_response.text}")
             
-            result_data = result_response.json()
-            print(f"[StableHorde] Result data: {result_data}")
-            
-            if not result_data.get("generations") or len(result_data["generations"]) == 0:
-                raise Exception("No images were generated")
-            
-            generation = result_data["generations"][0]
-            
-            return {
-                "image_url": generation.get("img", ""),
-                "seed": generation.get("seed", ""),
-                "worker_id": generation.get("worker_id", ""),
-                "worker_name": generation.get("worker_name", ""),
-                "model": generation.get("model", "stable_diffusion")
-            }
+            return self._parse_generation_result(result_response.json())
             
         except Exception as e:
             print(f"[StableHorde] Error getting result: {e}")
             raise
+
+    async def check_generation_async(self, client: httpx.AsyncClient, request_id: str) -> Dict[str, Any]:
+        """
+        Fetch the lightweight status of a generation without blocking the event loop
+        """
+        response = await client.get(
+            f"{self.base_url}/generate/check/{request_id}",
+            headers=self._headers(),
+            timeout=15
+        )
+        if response.status_code != 200:
+            raise StableHordeHTTPError(
+                f"Status check failed: {response.status_code} - {response.text}",
+                status_code=response.status_code,
+                retry_after=parse_retry_after(response.headers.get("Retry-After")),
+            )
+        return response.json()
+
+    async def get_generation_result_async(self, client: httpx.AsyncClient, request_id: str) -> Dict[str, Any]:
+        """
+        Fetch the final generation result without blocking the event loop
+        """
+        response = await client.get(
+            f"{self.base_url}/generate/status/{request_id}",
+            headers=self._headers(),
+            timeout=15
+        )
+        if response.status_code != 200:
+            raise Exception(f"Failed to get generation result: {response.status_code} - {response.text}")
+        return self._parse_generation_result(response.json())
+
+    def _parse_generation_result(self, result_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extract the first generation from a /generate/status payload
+        """
+        print(f"[StableHorde] Result data: {result_data}")
+
+        if not result_data.get("generations") or len(result_data["generations"]) == 0:
+            raise Exception("No images were generated")
+
+        generation = result_data["generations"][0]
+
+        return {
+            "image_url": generation.get("img", ""),
+            "seed": generation.get("seed", ""),
+            "worker_id": generation.get("worker_id", ""),
+            "worker_name": generation.get("worker_name", ""),
+            "model": generation.get("model", "stable_diffusion")
+        }
     
     def _get_dimensions(self, aspect_ratio: str) -> tuple:
         """
@@ -1,10 +1,21 @@
 import boto3
+from botocore.exceptions import ClientError
 import os
 from dotenv import load_dotenv
-from typing import BinaryIO
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Optional
 
 load_dotenv()
 
+# S3 requires every part except the last to be at least 5 MiB
+MULTIPART_PART_SIZE = max(int(os.getenv("S3_MULTIPART_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "4"))
+
+# Lifetime of presigned download URLs, in seconds
+PRESIGNED_URL_EXPIRY = int(os.getenv("PRESIGNED_URL_EXPIRY", "3600"))
+
 s3_client = boto3.client(
     "s3",
     endpoint_url=os.getenv("MINIO_ENDPOINT"),
@@ -13,12 +24,13 @@ s3_client = boto3.client(
 )
 
 
-def upload_file(file: BinaryIO, object_name: str, bucket_name: str) -> str:
+def upload_file(file: BinaryIO, object_name: str, bucket_name: str, content_type: Optional[str] = None) -> str:
     """
     Uploads a binary file to an S3 bucket.
     """
     try:
-        s3_client.upload_fileobj(file, bucket_name, object_name)
+        extra = {"ContentType": content_type} if content_type else None
+        s3_client.upload_fileobj(file, bucket_name, object_name, ExtraArgs=extra)
         return object_name
     except Exception as e:
         raise Exception(f"Failed to upload file: {e}")
@@ -32,8 +44,156 @@ def get_download_url(object_name: str, bucket_name: str) -> str:
         url: str = s3_client.generate_presigned_url(
             "get_object",
             Params={"Bucket": bucket_name, "Key": object_name},
-            ExpiresIn=3600,
+            ExpiresIn=PRESIGNED_URL_EXPIRY,
         )
         return url.replace("http://minio:9000", os.getenv("BACKEND_HOST_URL"))
     except Exception as e:
         raise Exception(f"Failed to generate download URL: {e}")
+
+
+def object_age(object_name: str, bucket_name: str) -> Optional[float]:
+    """
+    Returns how many seconds ago an object was last written, or None if it does not exist.
+    """
+    try:
+        response = s3_client.head_object(Bucket=bucket_name, Key=object_name)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise Exception(f"Failed to look up file: {e}")
+    return (datetime.now(timezone.utc) - response["LastModified"]).total_seconds()
+
+
+def download_to_path(object_name: str, bucket_name: str, file_path: str) -> bool:
+    """
+    Downloads an object to a local path. Returns False if the object does not exist.
+    """
+    try:
+        s3_client.download_file(bucket_name, object_name, file_path)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey"):
+            return False
+        raise Exception(f"Failed to download file: {e}")
+
+
+def upload_path(file_path: str, object_name: str, bucket_name: str) -> str:
+    """
+    Uploads a local file to an S3 bucket.
+    """
+    try:
+        s3_client.upload_file(file_path, bucket_name, object_name)
+        return object_name
+    except Exception as e:
+        raise Exception(f"Failed to upload file: {e}")
+
+
+class MultipartUpload:
+    """
+    Uploads a stream of unknown length (e.g. ffmpeg's stdout) as an S3
+    multipart upload, sending each part as soon as it has been read.
+
+    At most ``concurrency`` parts are in flight, which also bounds memory to
+    roughly ``concurrency + 1`` parts. Call ``complete()`` only once the
+    producer is known to have succeeded, and ``abort()`` otherwise so MinIO
+    discards the parts already stored.
+    """
+
+    def __init__(
+        self,
+        object_name: str,
+        bucket_name: str,
+        content_type: Optional[str] = None,
+        part_size: int = MULTIPART_PART_SIZE,
+        concurrency: int = UPLOAD_CONCURRENCY,
+    ):
+        self.object_name = object_name
+        self.bucket_name = bucket_name
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self._parts = []
+        extra = {"ContentType": content_type} if content_type else {}
+        try:
+            response = s3_client.create_multipart_upload(Bucket=bucket_name, Key=object_name, **extra)
+        except Exception as e:
+            raise Exception(f"Failed to start multipart upload: {e}")
+        self.upload_id = response["UploadId"]
+
+    def upload_from(self, stream: BinaryIO):
+        """
+        Reads ``stream`` to EOF, uploading it part by part. Returns once every part is stored.
+        """
+        slots = threading.BoundedSemaphore(self.concurrency)
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            part_number = 1
+            while True:
+                chunk = self._read_part(stream)
+                if not chunk:
+                    break
+                slots.acquire()
+                if any(f.done() and f.exception() for f in futures):
+                    break  # stop reading; the failure is raised below
+                future = executor.submit(self._upload_part, part_number, chunk)
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+                part_number += 1
+        try:
+            self._parts = [future.result() for future in futures]
+        except Exception as e:
+            raise Exception(f"Failed to upload file: {e}")
+
+    def _read_part(self, stream: BinaryIO) -> bytes:
+        # Pipes return short reads, so keep reading until a full part or EOF
+        buffer = bytearray()
+        while len(buffer) < self.part_size:
+            data = stream.read(self.part_size - len(buffer))
+            if not data:
+                break
+            buffer.extend(data)
+        return bytes(buffer)
+
+    def _upload_part(self, part_number: int, body: bytes) -> dict:
+        response = s3_client.upload_part(
+            Bucket=self.bucket_name,
+            Key=self.object_name,
+            UploadId=self.upload_id,
+            PartNumber=part_number,
+            Body=body,
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def complete(self) -> str:
+        if not self._parts:
+            raise Exception("Failed to upload file: stream was empty")
+        try:
+            s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.object_name,
+                UploadId=self.upload_id,
+                MultipartUpload={"Parts": self._parts},
+            )
+            return self.object_name
+        except Exception as e:
+            raise Exception(f"Failed to complete multipart upload: {e}")
+
+    def abort(self):
+        try:
+            s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=self.object_name, UploadId=self.upload_id
+            )
+        except Exception:
+            pass
+
+
+def upload_stream(stream: BinaryIO, object_name: str, bucket_name: str, content_type: Optional[str] = None) -> str:
+    """
+    Uploads a stream of unknown length to an S3 bucket, aborting on failure.
+    """
+    upload = MultipartUpload(object_name, bucket_name, content_type=content_type)
+    try:
+        upload.upload_from(stream)
+        return upload.complete()
+    except Exception:
+        upload.abort()
+        raise
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+
+import redis
+import redis.asyncio as aioredis
+from dotenv import load_dotenv
+
+from infrastructure.celery_app import celery_app
+from infrastructure.metrics import metrics
+
+load_dotenv()
+
+logger = logging.getLogger("task_events")
+
+# Only the latest states matter to a watcher; older ones are dropped beyond this
+SUBSCRIBER_QUEUE_SIZE = 16
+
+# Longest a new subscriber waits for the pattern subscription to be in place
+# before it reads the task's state anyway (the backend is down meanwhile)
+SUBSCRIBE_READY_TIMEOUT = float(os.getenv("TASK_EVENTS_READY_TIMEOUT", "5"))
+
+# Put on every subscriber queue after the listener resubscribed: states
+# stored while it was disconnected were not delivered, so read the backend
+RESYNC = None
+
+
+class TaskEventHub:
+    """
+    Fans Celery task state changes out to in-process subscribers.
+
+    The Redis result backend publishes every stored state (including
+    update_state progress) on the task's result key. One pattern
+    subscription per process receives all of them and hands each one to the
+    queues of the clients watching that task, so watchers cost no backend
+    reads and no Redis connections of their own.
+    """
+
+    def __init__(self, url: Optional[str], key_prefix: str):
+        self.url = url
+        self.key_prefix = key_prefix
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        # Set while the pattern subscription is active
+        self._ready = asyncio.Event()
+
+    @asynccontextmanager
+    async def subscribe(self, task_id: str) -> AsyncIterator[asyncio.Queue]:
+        """
+        Queue receiving the backend's meta dict ({"status", "result", ...})
+        for each state ``task_id`` is stored in while the block runs, or
+        RESYNC when states may have been missed.
+
+        The block is entered once the pattern subscription is active (or
+        after SUBSCRIBE_READY_TIMEOUT), so a state read from the backend
+        inside it cannot be overtaken by an undelivered change.
+        """
+        self._ensure_listener()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        try:
+            try:
+                await asyncio.wait_for(self._ready.wait(), SUBSCRIBE_READY_TIMEOUT)
+            except asyncio.TimeoutError:
+                metrics.increment("task_events_ready_timeouts_total")
+            yield queue
+        finally:
+            queues = self._subscribers.get(task_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[task_id]
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def _ensure_listener(self):
+        if self.url is None:
+            raise Exception("CELERY_BACKEND_URI is not set; task events need the Redis result backend")
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def _listen(self):
+        delay = 1.0
+        reconnect = False
+        while True:
+            client = aioredis.Redis.from_url(self.url)
+            pubsub = client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{self.key_prefix}*")
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+                    elif message["type"] == "psubscribe":
+                        # Confirmed by Redis: every state published from here on is received
+                        self._ready.set()
+                        if reconnect:
+                            self._resync()
+                        reconnect = True
+                        delay = 1.0
+            except asyncio.CancelledError:
+                raise
+            except (redis.RedisError, OSError) as e:
+                metrics.increment("task_events_listener_errors_total")
+                logger.warning(f"Task event listener lost Redis, reconnecting in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30)
+            finally:
+                self._ready.clear()
+                await pubsub.aclose()
+                await client.aclose()
+
+    def _resync(self):
+        for queues in list(self._subscribers.values()):
+            for queue in list(queues):
+                if queue.full():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+    def _dispatch(self, channel: bytes, data: bytes):
+        metrics.increment("task_events_received_total")
+        task_id = channel.decode().removeprefix(self.key_prefix)
+        queues = self._subscribers.get(task_id)
+        if not queues:
+            return
+        try:
+            meta = json.loads(data)
+        except ValueError:
+            return
+        for queue in list(queues):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(meta)
+            metrics.increment("task_events_delivered_total")
+
+
+def _key_prefix() -> str:
+    prefix = getattr(celery_app.backend, "task_keyprefix", "celery-task-meta-")
+    return prefix.decode() if isinstance(prefix, bytes) else prefix
+
+
+task_event_hub = TaskEventHub(os.getenv("CELERY_BACKEND_URI"), _key_prefix())
@@ -1,7 +1,11 @@
 import datetime
+import logging
 from typing import List, Optional
+from infrastructure.celery_app import eta_beyond_visibility_timeout
 from usecases.tasks import publish_post
 
+logger = logging.getLogger("task_queue_service")
+
 class TaskQueueService:
     def enqueue_post(self, asset_Id: str, platforms: List[str], post_text: Optional[str], run_at: Optional[datetime.datetime] = None):
         payload = {
@@ -12,6 +16,8 @@ class TaskQueueService:
 
         if run_at:
             payload["run_at"] = run_at
+            if eta_beyond_visibility_timeout(run_at):
+                logger.warning(f"Post of {asset_Id} is due after CELERY_VISIBILITY_TIMEOUT and may be delivered twice")
             task = publish_post.apply_async(args=[payload], eta=run_at)
         else:
             task = publish_post.apply_async(args=[payload]) 
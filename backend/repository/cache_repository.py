@@ -0,0 +1,128 @@
+import redis
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+from infrastructure.metrics import metrics
+
+r = redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
+
+logger = logging.getLogger("cache")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Case- and whitespace-insensitive form of a search term, so "Coffee " and
+    "coffee" share a cache entry.
+    """
+    return " ".join(query.lower().split())
+
+
+class CacheEntry:
+    def __init__(self, value: Any, fetched_at: float):
+        self.value = value
+        self.fetched_at = fetched_at
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class RedisCache:
+    """
+    Namespaced JSON cache in Redis with a TTL, an LRU bound on the number of
+    entries and stale-while-revalidate reads.
+
+    Entries younger than ``fresh_ttl`` are served as-is. Older entries are
+    still served until ``stale_ttl`` while one caller refreshes them in the
+    background. Past ``stale_ttl`` Redis expires them and the next read
+    fetches synchronously. Redis errors never fail the caller: the cache is
+    skipped and the value is fetched directly.
+    """
+
+    def __init__(self, namespace: str, fresh_ttl: int, stale_ttl: int, max_entries: int):
+        self.namespace = namespace
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = max(stale_ttl, fresh_ttl)
+        self.max_entries = max_entries
+        self._lru_key = f"cache:{namespace}:lru"
+
+    def key(self, *parts) -> str:
+        digest = hashlib.sha256(
+            json.dumps(parts, sort_keys=True, separators=(",", ":")).encode()
+        ).hexdigest()
+        return f"cache:{self.namespace}:{digest}"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        data = r.get(key)
+        if data is None:
+            return None
+        r.zadd(self._lru_key, {key: time.time()})
+        payload = json.loads(data)
+        return CacheEntry(payload["value"], payload["fetched_at"])
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        pipe = r.pipeline()
+        pipe.set(key, json.dumps({"value": value, "fetched_at": now}), ex=self.stale_ttl)
+        pipe.zadd(self._lru_key, {key: now})
+        pipe.zcard(self._lru_key)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            self._evict(size - self.max_entries)
+
+    def _evict(self, count: int):
+        evicted = [member for member, _ in r.zpopmin(self._lru_key, count)]
+        if evicted:
+            r.delete(*evicted)
+            metrics.increment("cache_evictions_total", len(evicted), cache=self.namespace)
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any]) -> Any:
+        try:
+            entry = self.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"[{self.namespace}] cache read failed, fetching directly: {e}")
+            metrics.increment("cache_requests_total", cache=self.namespace, result="error")
+            return fetch()
+
+        if entry is None:
+            metrics.increment("cache_requests_total", cache=self.namespace, result="miss")
+            value = fetch()
+            self._safe_set(key, value)
+            return value
+
+        if entry.age() > self.fresh_ttl:
+            metrics.increment("cache_requests_total", cache=self.namespace, result="stale")
+            self._revalidate(key, fetch)
+        else:
+            metrics.increment("cache_requests_total", cache=self.namespace, result="hit")
+        return entry.value
+
+    def _revalidate(self, key: str, fetch: Callable[[], Any]):
+        # Only one process refreshes a given entry; everyone else keeps serving it
+        try:
+            if not r.set(f"{key}:refresh", "1", nx=True, ex=60):
+                return
+        except redis.RedisError:
+            return
+
+        def refresh():
+            try:
+                self._safe_set(key, fetch())
+            except Exception as e:
+                logger.warning(f"[{self.namespace}] background refresh failed: {e}")
+            finally:
+                try:
+                    r.delete(f"{key}:refresh")
+                except redis.RedisError:
+                    pass
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+    def _safe_set(self, key: str, value: Any):
+        try:
+            self.set(key, value)
+        except redis.RedisError as e:
+            logger.warning(f"[{self.namespace}] cache write failed: {e}")
@@ -0,0 +1,45 @@
+import redis
+import json
+import time
+from typing import List, Optional
+
+r = redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
+
+JOBS_KEY = "horde:jobs"
+
+
+class HordeJob:
+    def __init__(self, request_id: str, task_id: str, image_data: dict, submitted_at: Optional[float] = None):
+        self.request_id = request_id
+        self.task_id = task_id
+        self.image_data = image_data
+        self.submitted_at = submitted_at if submitted_at is not None else time.time()
+
+    def to_dict(self):
+        return {
+            "request_id": self.request_id,
+            "task_id": self.task_id,
+            "image_data": self.image_data,
+            "submitted_at": self.submitted_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HordeJob":
+        return cls(
+            request_id=data["request_id"],
+            task_id=data["task_id"],
+            image_data=data["image_data"],
+            submitted_at=data.get("submitted_at"),
+        )
+
+
+def add(job: HordeJob):
+    r.hset(JOBS_KEY, job.request_id, json.dumps(job.to_dict()))
+
+
+def list_all() -> List[HordeJob]:
+    return [HordeJob.from_dict(json.loads(data)) for data in r.hvals(JOBS_KEY)]
+
+
+def remove(request_id: str) -> bool:
+    return r.hdel(JOBS_KEY, request_id) > 0
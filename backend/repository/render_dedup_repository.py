@@ -0,0 +1,70 @@
+import redis
+from typing import Optional
+
+r = redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
+
+
+def _key(fingerprint: str) -> str:
+    return f"render:inflight:{fingerprint}"
+
+
+def claim(fingerprint: str, task_id: str, ttl: int) -> Optional[str]:
+    """
+    Registers ``task_id`` as the render for ``fingerprint``. Returns None if
+    the claim was taken, or the id of the task that already holds it.
+    """
+    if r.set(_key(fingerprint), task_id, nx=True, ex=ttl):
+        return None
+    existing = r.get(_key(fingerprint))
+    if existing is None:
+        # The other claim expired between SET and GET; try once more
+        return None if r.set(_key(fingerprint), task_id, nx=True, ex=ttl) else r.get(_key(fingerprint))
+    return existing
+
+
+def claim_age(fingerprint: str, ttl: int) -> Optional[float]:
+    """
+    Seconds since the current claim for ``fingerprint`` was made with
+    ``ttl``, or None if there is none.
+    """
+    remaining = r.ttl(_key(fingerprint))
+    return ttl - remaining if remaining >= 0 else None
+
+
+def take_over(fingerprint: str, stale_task_id: str, task_id: str, ttl: int) -> Optional[str]:
+    """
+    Moves the claim from ``stale_task_id`` to ``task_id``. Like claim(),
+    returns None on success or the id of the task holding the claim now.
+    """
+    key = _key(fingerprint)
+    with r.pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            current = pipe.get(key)
+            if current is not None and current != stale_task_id:
+                pipe.unwatch()
+                return current
+            pipe.multi()
+            pipe.set(key, task_id, ex=ttl)
+            pipe.execute()
+            return None
+        except redis.WatchError:
+            return r.get(key) or claim(fingerprint, task_id, ttl)
+
+
+def release(fingerprint: str, task_id: str):
+    """
+    Drops the claim if ``task_id`` still holds it, so a failed render is not reused.
+    """
+    key = _key(fingerprint)
+    with r.pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            if pipe.get(key) != task_id:
+                pipe.unwatch()
+                return
+            pipe.multi()
+            pipe.delete(key)
+            pipe.execute()
+        except redis.WatchError:
+            pass
@@ -0,0 +1,216 @@
+import redis
+import json
+import time
+from typing import Dict, Optional
+
+r = redis.Redis(host="redis", port=6379, db=0, decode_responses=True)
+
+# Served strictly in this order: bulk jobs only start when no interactive job waits
+LANES = ["interactive", "bulk"]
+
+# Task ids of every job in a lane or a processing hash, whatever its queue
+WAITING_KEY = "render:fq:waiting"
+
+# How long the time a job was handed to Celery is kept
+DISPATCHED_TTL = 7 * 24 * 3600
+
+
+class QueuedRender:
+    def __init__(
+        self,
+        task_name: str,
+        task_id: str,
+        args: list,
+        queue: str,
+        tenant: str,
+        lane: str,
+        cost: float = 1.0,
+        enqueued_at: Optional[float] = None,
+    ):
+        self.task_name = task_name
+        self.task_id = task_id
+        self.args = args
+        self.queue = queue
+        self.tenant = tenant
+        self.lane = lane
+        self.cost = cost
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.time()
+
+    def to_dict(self):
+        return {
+            "task_name": self.task_name,
+            "task_id": self.task_id,
+            "args": self.args,
+            "queue": self.queue,
+            "tenant": self.tenant,
+            "lane": self.lane,
+            "cost": self.cost,
+            "enqueued_at": self.enqueued_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QueuedRender":
+        return cls(**data)
+
+
+def _jobs_key(queue: str, lane: str) -> str:
+    return f"render:fq:{queue}:{lane}"
+
+
+def _finish_key(queue: str, lane: str) -> str:
+    return f"render:fq:{queue}:{lane}:finish"
+
+
+def _vtime_key(queue: str, lane: str) -> str:
+    return f"render:fq:{queue}:{lane}:vtime"
+
+
+def _processing_key(queue: str) -> str:
+    return f"render:fq:{queue}:processing"
+
+
+def _dispatched_key(task_id: str) -> str:
+    return f"render:fq:dispatched:{task_id}"
+
+
+def push(job: QueuedRender, weight: float = 1.0):
+    """
+    Adds ``job`` to its lane, tagged with its weighted-fair-queuing finish
+    time: the later of the lane's virtual time and the tenant's previous
+    finish tag, plus cost / weight. Jobs are dispatched in tag order, so a
+    tenant with a long backlog only delays others by its fair share.
+    """
+    _enqueue(job, weight)
+
+
+def _enqueue(job: QueuedRender, weight: float, from_processing: bool = False):
+    jobs_key, finish_key, vtime_key = _jobs_key(job.queue, job.lane), _finish_key(job.queue, job.lane), _vtime_key(job.queue, job.lane)
+
+    def enqueue(pipe):
+        start = max(float(pipe.get(vtime_key) or 0), float(pipe.hget(finish_key, job.tenant) or 0))
+        finish = start + job.cost / weight
+        pipe.multi()
+        pipe.hset(finish_key, job.tenant, finish)
+        pipe.zadd(jobs_key, {json.dumps(job.to_dict()): finish})
+        pipe.hset(WAITING_KEY, job.task_id, job.queue)
+        if from_processing:
+            pipe.hdel(_processing_key(job.queue), job.task_id)
+
+    r.transaction(enqueue, vtime_key, finish_key)
+
+
+def pop(queue: str) -> Optional[QueuedRender]:
+    """
+    Takes the next job for ``queue``: the lowest finish tag of the first
+    lane that has any. The job moves to the queue's processing hash in the
+    same transaction and stays there until ack(), so a dispatcher that dies
+    before handing it to Celery does not lose it (see requeue_processing).
+    """
+    keys = [_processing_key(queue)]
+    for lane in LANES:
+        keys += [_jobs_key(queue, lane), _vtime_key(queue, lane)]
+
+    def claim(pipe):
+        for lane in LANES:
+            head = pipe.zrange(_jobs_key(queue, lane), 0, 0, withscores=True)
+            if head:
+                member, finish = head[0]
+                job = QueuedRender.from_dict(json.loads(member))
+                pipe.multi()
+                pipe.zrem(_jobs_key(queue, lane), member)
+                # Virtual time follows the tags of dispatched jobs
+                pipe.set(_vtime_key(queue, lane), finish)
+                pipe.hset(_processing_key(queue), job.task_id, json.dumps({"member": member, "finish": finish}))
+                return job
+        return None
+
+    return r.transaction(claim, *keys, value_from_callable=True)
+
+
+def ack(job: QueuedRender):
+    """
+    Forgets a popped job once Celery has it, noting when that happened
+    (see dispatched_at).
+    """
+    pipe = r.pipeline()
+    pipe.hdel(_processing_key(job.queue), job.task_id)
+    pipe.hdel(WAITING_KEY, job.task_id)
+    pipe.set(_dispatched_key(job.task_id), time.time(), ex=DISPATCHED_TTL)
+    pipe.execute()
+
+
+def push_back(job: QueuedRender, weight: float = 1.0):
+    """
+    Returns a popped job that could not be handed to Celery to its lane,
+    behind the tenant's other jobs, in the same transaction that drops it
+    from the processing hash.
+    """
+    _enqueue(job, weight, from_processing=True)
+
+
+def is_waiting(task_id: str) -> bool:
+    """
+    Whether ``task_id`` is still in the fair queue: waiting in a lane or
+    popped but not yet handed to Celery.
+    """
+    return bool(r.hexists(WAITING_KEY, task_id))
+
+
+def dispatched_at(task_id: str) -> Optional[float]:
+    """
+    When the dispatcher handed ``task_id`` to Celery, or None if it did not
+    (or longer than DISPATCHED_TTL ago).
+    """
+    value = r.get(_dispatched_key(task_id))
+    return float(value) if value is not None else None
+
+
+def requeue_processing(queue: str) -> int:
+    """
+    Puts jobs popped but never acknowledged (their dispatcher died) back in
+    their lanes under their original finish tags; returns how many. A job
+    that reached Celery just before the crash is sent again, so a render
+    may run twice but is never dropped. Only safe while no dispatcher is
+    popping from ``queue``.
+    """
+    requeued = 0
+    for task_id, entry in r.hgetall(_processing_key(queue)).items():
+        entry = json.loads(entry)
+        job = QueuedRender.from_dict(json.loads(entry["member"]))
+        pipe = r.pipeline()
+        pipe.zadd(_jobs_key(queue, job.lane), {entry["member"]: entry["finish"]})
+        pipe.hdel(_processing_key(queue), task_id)
+        pipe.execute()
+        requeued += 1
+    return requeued
+
+
+def prune_finish_tags(queue: str) -> int:
+    """
+    Drops the finish tags that the lane's virtual time has passed. Those
+    tenants have nothing waiting and their next job starts from the virtual
+    time either way, so only tenants with recent work keep an entry.
+    Returns how many were dropped.
+    """
+    pruned = 0
+    for lane in LANES:
+        finish_key, vtime_key = _finish_key(queue, lane), _vtime_key(queue, lane)
+
+        def prune(pipe):
+            vtime = float(pipe.get(vtime_key) or 0)
+            idle = [tenant for tenant, finish in pipe.hgetall(finish_key).items() if float(finish) <= vtime]
+            pipe.multi()
+            if idle:
+                pipe.hdel(finish_key, *idle)
+            return len(idle)
+
+        pruned += r.transaction(prune, vtime_key, finish_key, value_from_callable=True)
+    return pruned
+
+
+def pending(queue: str) -> Dict[str, int]:
+    """
+    Jobs waiting per lane for ``queue``.
+    """
+    return {lane: r.zcard(_jobs_key(queue, lane)) for lane in LANES}
+
@@ -50,3 +50,34 @@ Include relevant keywords for the {style} style (e.g., "photorealistic, highly d
 
 Return the enhanced prompt that will be used for generation.
 """
+
+POST_KIT_PROMPT_TEMPLATE = """
+You are a creative assistant that prepares everything needed for one social media post.
+
+The brand is {brand_name}.
+The brand personality is {brand_tone}.
+The color pallete for the brand is {colors}.
+The platform is {platform}.
+The language is {language}.
+The post is about "{idea}".
+
+Produce all of the following in one response:
+
+1. storyboard: a video with {number_of_shots} shots and the call to action "{cta}". Each shot has a duration between 3 and 5 seconds and a short searchable word to find a good shot from pixaby (1 word only, never a phrase joined with hyphens). Also suggest a one word background music genre.
+2. caption: a caption for the post and at most {hashtags_count} hashtags, including {default_hashtags} if there are any.
+3. image: a concise but descriptive Stable Diffusion prompt for "{image_prompt}" in {style} style with aspect ratio {aspect_ratio}. It should use the brand colors, match the brand tone, suit the platform and include keywords for the style (e.g., "photorealistic, highly detailed" for realistic style).
+"""
+
+FIX_UP_PROMPT_TEMPLATE = """
+The following output was supposed to be JSON matching a schema, but it failed validation.
+
+Output:
+{output}
+
+Errors:
+{errors}
+
+{format_instructions}
+
+Return only the corrected JSON, keeping the content of the output unchanged wherever it is already valid.
+"""
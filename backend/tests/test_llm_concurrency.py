@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+
+from infrastructure.llm_backends import ConcurrencyLimit
+
+
+class Peak:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.current = 0
+        self.peak = 0
+
+    def enter(self):
+        with self.lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def leave(self):
+        with self.lock:
+            self.current -= 1
+
+
+def test_limit_is_shared_by_threads_and_event_loops():
+    limit = ConcurrencyLimit(3)
+    peak = Peak()
+
+    def sync_call():
+        limit.acquire()
+        peak.enter()
+        time.sleep(0.05)
+        peak.leave()
+        limit.release()
+
+    async def async_call():
+        await limit.aacquire()
+        peak.enter()
+        await asyncio.sleep(0.05)
+        peak.leave()
+        limit.release()
+
+    async def many():
+        await asyncio.gather(*[async_call() for _ in range(6)])
+
+    threads = [threading.Thread(target=sync_call) for _ in range(6)]
+    threads += [threading.Thread(target=asyncio.run, args=(many(),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak.peak == 3
+    assert limit._available == 3
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    limit = ConcurrencyLimit(1)
+
+    async def scenario():
+        await limit.aacquire()
+        waiter = asyncio.create_task(limit.aacquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        limit.release()
+        await asyncio.gather(waiter, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert limit._available == 1
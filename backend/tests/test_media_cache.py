@@ -0,0 +1,55 @@
+import os
+import threading
+
+import pytest
+
+from infrastructure.media_cache import MediaCache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = MediaCache(str(tmp_path), max_bytes=10)
+    downloads = []
+
+    def download(url, path):
+        downloads.append(url)
+        with open(path, "wb") as f:
+            f.write(b"x" * 8)
+
+    monkeypatch.setattr(cache, "_download", download)
+    cache.downloads = downloads
+    return cache
+
+
+def test_fill_does_not_wait_on_its_own_process_pin(cache):
+    url = "https://cdn.example/clip.mp4"
+    path = cache.path_for(url)
+    with cache.lease() as lease:
+        lease.fetch(url)
+        # A second shot of the same render that missed the file before the first finished
+        done = threading.Event()
+        threading.Thread(target=lambda: (cache._fill(url, path), done.set()), daemon=True).start()
+        assert done.wait(5)
+        cache._fill_once(url, path)
+    assert cache.downloads == [url]
+
+
+def test_eviction_removes_lock_files(cache):
+    urls = [f"https://cdn.example/{i}.mp4" for i in range(3)]
+    for url in urls:
+        with cache.lease() as lease:
+            lease.fetch(url)
+
+    # Only the newest 8-byte file fits into 10 bytes, and no lock file outlives its entry
+    assert sorted(os.listdir(cache.directory)) == sorted(
+        [os.path.basename(cache.path_for(urls[-1])), os.path.basename(cache.path_for(urls[-1])) + ".lock"]
+    )
+
+
+def test_pinned_file_is_not_evicted(cache):
+    first, second = "https://cdn.example/a.mp4", "https://cdn.example/b.mp4"
+    with cache.lease() as lease:
+        path = lease.fetch(first)
+        with cache.lease() as other:
+            other.fetch(second)
+        assert os.path.exists(path)
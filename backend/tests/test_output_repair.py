@@ -0,0 +1,13 @@
+import json
+
+from domain.videos_dto import StoryboardResponse
+from infrastructure.output_repair import RepairingOutputParser
+
+
+def storyboard(*durations):
+    return json.dumps({"shots": [{"duration": d, "text": f"shot {i}"} for i, d in enumerate(durations)], "music": "upbeat"})
+
+
+def test_out_of_range_durations_are_clamped():
+    parsed = RepairingOutputParser(pydantic_object=StoryboardResponse).parse(storyboard(10, 0, 4))
+    assert [shot.duration for shot in parsed.shots] == [5, 3, 4]
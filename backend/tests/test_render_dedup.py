@@ -0,0 +1,59 @@
+import time
+
+import fakeredis
+import pytest
+
+from repository import render_dedup_repository, render_queue_repository
+from repository.render_queue_repository import QueuedRender
+from usecases import videos_service
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(render_dedup_repository, "r", client)
+    monkeypatch.setattr(render_queue_repository, "r", client)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def pending_tasks(monkeypatch):
+    class PendingResult:
+        state = "PENDING"
+
+        def __init__(self, task_id, app=None):
+            pass
+
+    monkeypatch.setattr(videos_service, "AsyncResult", PendingResult)
+
+
+def old_claim(fake_redis, fingerprint, task_id):
+    ttl = videos_service.PRESIGNED_URL_EXPIRY
+    render_dedup_repository.claim(fingerprint, task_id, ttl)
+    # Claimed longer ago than the stale threshold
+    fake_redis.expire(f"render:inflight:{fingerprint}", ttl - videos_service.RENDER_DEDUP_STALE_AFTER - 60)
+
+
+def test_claim_waiting_in_the_fair_queue_is_not_stale(fake_redis):
+    old_claim(fake_redis, "fp", "task")
+    render_queue_repository.push(QueuedRender("usecases.tasks.render_video", "task", [], "video", "acme", "bulk"))
+    assert not videos_service.render_claim_is_stale("fp", "task")
+
+    # Popped but not yet handed to Celery
+    render_queue_repository.pop("video")
+    assert not videos_service.render_claim_is_stale("fp", "task")
+
+
+def test_claim_age_counts_from_dispatch(fake_redis):
+    old_claim(fake_redis, "fp", "task")
+    render_queue_repository.push(QueuedRender("usecases.tasks.render_video", "task", [], "video", "acme", "bulk"))
+    render_queue_repository.ack(render_queue_repository.pop("video"))
+    assert not videos_service.render_claim_is_stale("fp", "task")
+
+    fake_redis.set("render:fq:dispatched:task", time.time() - videos_service.RENDER_DEDUP_STALE_AFTER - 60)
+    assert videos_service.render_claim_is_stale("fp", "task")
+
+
+def test_directly_sent_claim_goes_stale_by_claim_age(fake_redis):
+    old_claim(fake_redis, "fp", "task")
+    assert videos_service.render_claim_is_stale("fp", "task")
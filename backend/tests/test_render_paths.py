@@ -0,0 +1,143 @@
+import os
+import re
+import shutil
+import subprocess
+from fractions import Fraction
+
+import ffmpeg
+import pytest
+
+from domain.videos_dto import RenderProfile
+from infrastructure.media_probe import VideoInfo
+from usecases import tasks
+
+
+def clip_info(width=1280, height=720, codec="h264", pix_fmt="yuv420p", fps=30, duration=3.0, has_b_frames=0):
+    return VideoInfo(
+        codec=codec,
+        profile="High",
+        width=width,
+        height=height,
+        pix_fmt=pix_fmt,
+        fps=Fraction(fps),
+        time_base="1/15360",
+        has_b_frames=has_b_frames,
+        duration=duration,
+    )
+
+
+@pytest.fixture
+def probed(monkeypatch):
+    """
+    Maps clip paths to the VideoInfo probe_video reports for them.
+    """
+    infos = {}
+    monkeypatch.setattr(tasks, "probe_video", infos.get)
+    return infos
+
+
+def rendered_args(clip_paths, durations, profile, music_path=None):
+    with tasks.render_graph(clip_paths, durations, music_path, profile, "out.mp4") as out:
+        return " ".join(ffmpeg.compile(out, cmd="ffmpeg"))
+
+
+def test_matching_clips_are_stream_copied(probed):
+    probed.update({"a.mp4": clip_info(), "b.mp4": clip_info()})
+    profile = RenderProfile(platform="youtube")
+
+    assert tasks.can_stream_copy(["a.mp4", "b.mp4"], [3, 3], profile)
+    args = rendered_args(["a.mp4", "b.mp4"], [3, 3], profile, music_path="music.mp3")
+    assert "-f concat" in args
+    assert "-vcodec copy" in args
+    assert "libx264" not in args
+
+
+@pytest.mark.parametrize(
+    "info, profile",
+    [
+        # Same aspect ratio, smaller frame: must be scaled up to the profile's resolution
+        (clip_info(width=640, height=360), RenderProfile(platform="youtube")),
+        (clip_info(), RenderProfile(aspect_ratio="9:16")),
+        (clip_info(codec="hevc"), RenderProfile(platform="youtube")),
+        (clip_info(pix_fmt="yuv444p"), RenderProfile(platform="youtube")),
+        (clip_info(fps=25), RenderProfile(platform="youtube", fps=30)),
+    ],
+)
+def test_clips_not_matching_the_profile_are_reencoded(probed, info, profile):
+    probed.update({"a.mp4": info, "b.mp4": info})
+
+    assert not tasks.can_stream_copy(["a.mp4", "b.mp4"], [3, 3], profile)
+    args = rendered_args(["a.mp4", "b.mp4"], [3, 3], profile)
+    width, height = profile.resolution()
+    assert "libx264" in args
+    assert f"scale={width}:{height}" in args
+    assert f"crop={width}:{height}" in args
+
+
+def test_mixed_clips_are_reencoded(probed):
+    probed.update({"a.mp4": clip_info(), "b.mp4": clip_info(fps=25)})
+
+    assert not tasks.can_stream_copy(["a.mp4", "b.mp4"], [3, 3], RenderProfile(platform="youtube", fps=None))
+
+
+def test_unprobeable_clip_is_reencoded(probed):
+    probed.update({"a.mp4": clip_info()})
+
+    assert not tasks.can_stream_copy(["a.mp4", "missing.mp4"], [3, 3], RenderProfile(platform="youtube"))
+
+
+def test_b_frame_clip_is_only_copied_whole(probed):
+    probed.update({"a.mp4": clip_info(duration=3.0, has_b_frames=2), "b.mp4": clip_info(duration=6.0, has_b_frames=2)})
+    profile = RenderProfile(platform="youtube")
+
+    assert tasks.can_stream_copy(["a.mp4"], [3], profile)
+    assert not tasks.can_stream_copy(["a.mp4", "b.mp4"], [3, 3], profile)
+
+
+def test_no_fps_in_profile_accepts_any_shared_frame_rate(probed):
+    probed.update({"a.mp4": clip_info(fps=25), "b.mp4": clip_info(fps=25)})
+
+    assert tasks.can_stream_copy(["a.mp4", "b.mp4"], [3, 3], RenderProfile(platform="youtube", fps=None))
+
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+
+def make_clip(path, width, height, seconds=2):
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error", "-f", "lavfi", "-i", f"testsrc=size={width}x{height}:rate=30",
+            "-t", str(seconds), "-c:v", "libx264", "-pix_fmt", "yuv420p", "-bf", "0", path,
+        ],
+        check=True,
+    )
+
+
+def output_size(path):
+    # ffmpeg -i prints the stream line ("... yuv420p(...), 1280x720, ...") and exits non-zero
+    stderr = subprocess.run(["ffmpeg", "-i", path], capture_output=True, text=True).stderr
+    return tuple(map(int, re.search(r"Video: .*?, (\d+)x(\d+)", stderr).groups()))
+
+
+@requires_ffmpeg
+@pytest.mark.parametrize(
+    "clip_size, profile, path",
+    [
+        ((1280, 720), RenderProfile(platform="youtube"), "stream_copy"),
+        ((640, 360), RenderProfile(platform="youtube"), "reencode"),
+        ((1280, 720), RenderProfile(aspect_ratio="1:1"), "reencode"),
+    ],
+)
+def test_stitched_output_has_profile_resolution(probed, tmp_path, clip_size, profile, path):
+    clips = [str(tmp_path / f"clip{i}.mp4") for i in range(2)]
+    for clip in clips:
+        make_clip(clip, *clip_size)
+        probed[clip] = clip_info(width=clip_size[0], height=clip_size[1], duration=2.0)
+    output = str(tmp_path / "out.mp4")
+    before = tasks.metrics.counter_value("render_path_total", path=path)
+
+    tasks.stitch_clips(clips, [2, 2], output, profile=profile)
+
+    assert tasks.metrics.counter_value("render_path_total", path=path) == before + 1
+    assert os.path.getsize(output) > 0
+    assert output_size(output) == profile.resolution()
@@ -0,0 +1,49 @@
+import fakeredis
+import pytest
+
+from repository import render_queue_repository
+from repository.render_queue_repository import QueuedRender
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    monkeypatch.setattr(render_queue_repository, "r", fakeredis.FakeRedis(decode_responses=True))
+
+
+def job(task_id, tenant="acme", lane="bulk"):
+    return QueuedRender("usecases.tasks.render_video", task_id, [], "video", tenant, lane)
+
+
+def test_popped_job_is_requeued_until_acknowledged():
+    render_queue_repository.push(job("a"))
+    render_queue_repository.push(job("b"))
+
+    popped = render_queue_repository.pop("video")
+    assert popped.task_id == "a"
+    # The dispatcher died before sending it: it comes back ahead of "b"
+    assert render_queue_repository.requeue_processing("video") == 1
+    assert render_queue_repository.pop("video").task_id == "a"
+
+    render_queue_repository.ack(job("a"))
+    assert render_queue_repository.requeue_processing("video") == 0
+    assert render_queue_repository.pop("video").task_id == "b"
+
+
+def test_interactive_lane_is_served_first():
+    render_queue_repository.push(job("bulk", lane="bulk"))
+    render_queue_repository.push(job("interactive", lane="interactive"))
+
+    assert render_queue_repository.pop("video").task_id == "interactive"
+    assert render_queue_repository.pop("video").task_id == "bulk"
+    assert render_queue_repository.pop("video") is None
+
+
+def test_idle_tenants_finish_tags_are_pruned():
+    render_queue_repository.push(job("a", tenant="acme"))
+    render_queue_repository.push(job("b", tenant="globex"))
+    render_queue_repository.push(job("c", tenant="globex"))
+    render_queue_repository.pop("video")
+
+    # acme's only job was dispatched; globex still has one waiting
+    assert render_queue_repository.prune_finish_tags("video") == 1
+    assert set(render_queue_repository.r.hkeys("render:fq:video:bulk:finish")) == {"globex"}
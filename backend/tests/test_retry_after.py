@@ -0,0 +1,13 @@
+import time
+from email.utils import formatdate
+
+from infrastructure.stable_horde_service import parse_retry_after
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert parse_retry_after("30") == 30
+    assert 55 <= parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
@@ -0,0 +1,42 @@
+import asyncio
+import json
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from domain.videos_dto import StoryboardResponse
+from infrastructure import ai_services
+
+
+@pytest.fixture
+def model_answers(monkeypatch):
+    def answer(text):
+        monkeypatch.setattr(ai_services, "_chains", {})
+        monkeypatch.setattr(ai_services, "get_llm", lambda model_name=None: GenericFakeChatModel(messages=iter([AIMessage(content=text)] * 2)))
+
+    return answer
+
+
+def stream(prompt="Storyboard for {idea}"):
+    async def collect():
+        return [event async for event in ai_services.astream_structured_response(prompt, {"idea": "coffee"}, StoryboardResponse)]
+
+    return asyncio.run(collect())
+
+
+def test_streamed_output_is_repaired_like_other_endpoints(model_answers):
+    storyboard = {"shots": [{"duration": 10, "text": "a cup"}, {"duration": 4, "text": "a smile"}], "music": "upbeat"}
+    model_answers("```json\n" + json.dumps(storyboard) + "\n```")
+
+    events = stream()
+    assert events[0][0] == "partial"
+    kind, result = events[-1]
+    assert kind == "result"
+    assert [shot.duration for shot in result.shots] == [5, 4]
+
+
+def test_empty_stream_fails_clearly(model_answers):
+    model_answers("")
+    with pytest.raises(Exception, match="without any output"):
+        stream()
@@ -1,24 +1,64 @@
-from infrastructure.ai_services import get_structured_response
-from domain.captions_dto import CaptionRequest,CaptiononResponse
+from infrastructure.ai_services import get_structured_response, aget_structured_response, abatch_structured_responses, astream_structured_response
+from domain.captions_dto import CaptionRequest,CaptiononResponse,CaptionBatchRequest,CaptionBatchItem,CaptionBatchResponse
 from templates.prompt_templates import Caption_PROMPT_TEMPLATE
 
 
 
+def caption_variables(req : CaptionRequest) -> dict:
+    return {
+        "idea": req.idea,
+        "platform": req.platform,
+        "language": req.language ,
+        "brand_name": req.brand_presets.name,
+        "hashtags_count":req.hashtags_count,
+        "colors": ", ".join(req.brand_presets.colors),
+        "brand_tone": req.brand_presets.tone,        
+        "default_hashtags": ", ".join(req.brand_presets.default_hashtags or [])}
+
+
 def generate_captions(req : CaptionRequest):
 
     try:
-        input_variables = {
-            "idea": req.idea,
-            "platform": req.platform,
-            "language": req.language ,
-            "brand_name": req.brand_presets.name,
-            "hashtags_count":req.hashtags_count,
-            "colors": ", ".join(req.brand_presets.colors),
-            "brand_tone": req.brand_presets.tone,        
-            "default_hashtags": ", ".join(req.brand_presets.default_hashtags)}
-         
-        return get_structured_response(prompt_template_str=Caption_PROMPT_TEMPLATE,input_variables=input_variables,pydantic_model=CaptiononResponse)
-         
+        return get_structured_response(prompt_template_str=Caption_PROMPT_TEMPLATE,input_variables=caption_variables(req),pydantic_model=CaptiononResponse,endpoint="caption",use_cache=req.use_cache)
+
+    except Exception as e:
+         raise Exception(f'Failed to generate Caption {e}') 
+
+
+async def agenerate_captions(req : CaptionRequest):
+
+    try:
+        return await aget_structured_response(prompt_template_str=Caption_PROMPT_TEMPLATE,input_variables=caption_variables(req),pydantic_model=CaptiononResponse,endpoint="caption",use_cache=req.use_cache)
 
     except Exception as e:
          raise Exception(f'Failed to generate Caption {e}') 
+
+
+async def agenerate_captions_batch(req : CaptionBatchRequest) -> CaptionBatchResponse:
+    """
+    Generates a caption per item, in order; a failed item carries its error.
+    """
+    try:
+        results = await abatch_structured_responses(
+            prompt_template_str=Caption_PROMPT_TEMPLATE,
+            inputs=[caption_variables(item) for item in req.items],
+            pydantic_model=CaptiononResponse,
+            endpoint="caption",
+            use_cache=[item.use_cache for item in req.items],
+        )
+    except Exception as e:
+        raise Exception(f'Failed to generate Caption batch {e}')
+
+    return CaptionBatchResponse(results=[
+        CaptionBatchItem(index=i, error=f"Failed to generate Caption {result}")
+        if isinstance(result, Exception)
+        else CaptionBatchItem(index=i, result=result)
+        for i, result in enumerate(results)
+    ])
+
+
+def astream_captions(req : CaptionRequest):
+    """
+    Streams partial caption fields as Gemini writes them, then the validated caption.
+    """
+    return astream_structured_response(prompt_template_str=Caption_PROMPT_TEMPLATE,input_variables=caption_variables(req),pydantic_model=CaptiononResponse,endpoint="caption",use_cache=req.use_cache)
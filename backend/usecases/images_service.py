@@ -1,7 +1,34 @@
-from domain.images_dto import ImageGenerationRequest, ImageGenerationResponse, RenderImageRequest
-from infrastructure.ai_services import get_structured_response
+from domain.images_dto import (
+    ImageGenerationRequest,
+    ImageGenerationResponse,
+    ImageGenerationBatchRequest,
+    ImageGenerationBatchItem,
+    ImageGenerationBatchResponse,
+    RenderImageRequest,
+)
+from infrastructure.ai_services import get_structured_response, aget_structured_response, abatch_structured_responses
 from templates.prompt_templates import IMAGE_GENERATION_PROMPT_TEMPLATE
+from infrastructure.render_dispatcher import enqueue_render
 from usecases.tasks import render_image
+import uuid
+
+
+def image_prompt_variables(request: ImageGenerationRequest) -> dict:
+    # Enhance the prompt with brand information
+    enhanced_prompt = f"{request.prompt}, {request.brand_presets.tone} style"
+    if request.brand_presets.colors:
+        enhanced_prompt += f", using colors: {', '.join(request.brand_presets.colors)}"
+
+    return {
+        "prompt": request.prompt,
+        "enhanced_prompt": enhanced_prompt,
+        "style": request.style or "realistic",
+        "aspect_ratio": request.aspect_ratio or "1:1",
+        "brand_name": request.brand_presets.name,
+        "brand_tone": request.brand_presets.tone,
+        "colors": ", ".join(request.brand_presets.colors) if request.brand_presets.colors else "default",
+        "platform": request.platform,
+    }
 
 
 def generate_image_prompt(request: ImageGenerationRequest) -> ImageGenerationResponse:
@@ -9,37 +36,63 @@ def generate_image_prompt(request: ImageGenerationRequest) -> ImageGenerationRes
     Generates an image prompt and metadata based on the provided request.
     """
     try:
-        # Enhance the prompt with brand information
-        enhanced_prompt = f"{request.prompt}, {request.brand_presets.tone} style"
-        if request.brand_presets.colors:
-            enhanced_prompt += f", using colors: {', '.join(request.brand_presets.colors)}"
-        
-        input_variables = {
-            "prompt": request.prompt,
-            "enhanced_prompt": enhanced_prompt,
-            "style": request.style or "realistic",
-            "aspect_ratio": request.aspect_ratio or "1:1",
-            "brand_name": request.brand_presets.name,
-            "brand_tone": request.brand_presets.tone,
-            "colors": ", ".join(request.brand_presets.colors) if request.brand_presets.colors else "default",
-            "platform": request.platform,
-        }
-
         return get_structured_response(
             prompt_template_str=IMAGE_GENERATION_PROMPT_TEMPLATE,
-            input_variables=input_variables,
+            input_variables=image_prompt_variables(request),
+            pydantic_model=ImageGenerationResponse,
+            endpoint="image_prompt",
+            use_cache=request.use_cache,
+        )
+    except Exception as e:
+        raise Exception(f"Failed to generate image prompt: {e}")
+
+
+async def agenerate_image_prompt(request: ImageGenerationRequest) -> ImageGenerationResponse:
+    """
+    Async generate_image_prompt for the API.
+    """
+    try:
+        return await aget_structured_response(
+            prompt_template_str=IMAGE_GENERATION_PROMPT_TEMPLATE,
+            input_variables=image_prompt_variables(request),
             pydantic_model=ImageGenerationResponse,
+            endpoint="image_prompt",
+            use_cache=request.use_cache,
         )
     except Exception as e:
         raise Exception(f"Failed to generate image prompt: {e}")
 
 
+async def agenerate_image_prompts_batch(request: ImageGenerationBatchRequest) -> ImageGenerationBatchResponse:
+    """
+    Generates an image prompt per item, in order; a failed item carries its error.
+    """
+    try:
+        results = await abatch_structured_responses(
+            prompt_template_str=IMAGE_GENERATION_PROMPT_TEMPLATE,
+            inputs=[image_prompt_variables(item) for item in request.items],
+            pydantic_model=ImageGenerationResponse,
+            endpoint="image_prompt",
+            use_cache=[item.use_cache for item in request.items],
+        )
+    except Exception as e:
+        raise Exception(f"Failed to generate image prompt batch: {e}")
+
+    return ImageGenerationBatchResponse(results=[
+        ImageGenerationBatchItem(index=i, error=f"Failed to generate image prompt: {result}")
+        if isinstance(result, Exception)
+        else ImageGenerationBatchItem(index=i, result=result)
+        for i, result in enumerate(results)
+    ])
+
+
 def create_render_image_task(request: RenderImageRequest):
     """
     Creates an async task to render an image based on the provided request.
     """
     try:
-        task = render_image.delay(request.model_dump())
-        return {"task_id": task.id, "status": "queued"}
+        task_id = str(uuid.uuid4())
+        enqueue_render(render_image, [request.model_dump()], task_id, request.tenant, request.priority)
+        return {"task_id": task_id, "status": "queued"}
     except Exception as e:
         raise Exception(f"Failed to create render image task: {e}")
\ No newline at end of file
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import time
+
+from pydantic import ValidationError
+
+from domain.captions_dto import CaptionRequest, CaptiononResponse
+from domain.images_dto import ImageGenerationRequest, ImageGenerationResponse
+from domain.post_kit_dto import PostKitDraft, PostKitReport, PostKitRequest, PostKitResponse
+from domain.videos_dto import StoryboardRequest, StoryboardResponse
+from infrastructure.ai_services import aget_json_response, aget_structured_response, estimate_prompt_tokens
+from infrastructure.llm_cache import llm_cache
+from infrastructure.metrics import metrics
+from infrastructure.output_repair import coerce_to_model
+from templates.prompt_templates import (
+    Caption_PROMPT_TEMPLATE,
+    IMAGE_GENERATION_PROMPT_TEMPLATE,
+    POST_KIT_PROMPT_TEMPLATE,
+    STORYBOARD_PROMPT_TEMPLATE,
+)
+from usecases.captions_service import caption_variables
+from usecases.images_service import image_prompt_variables
+from usecases.videos_service import storyboard_variables
+
+logger = logging.getLogger("post_kit")
+
+# part name -> (response model, template, endpoint used for its fallback call)
+PARTS = {
+    "storyboard": (StoryboardResponse, STORYBOARD_PROMPT_TEMPLATE, "storyboard"),
+    "caption": (CaptiononResponse, Caption_PROMPT_TEMPLATE, "caption"),
+    "image": (ImageGenerationResponse, IMAGE_GENERATION_PROMPT_TEMPLATE, "image_prompt"),
+}
+
+
+def part_variables(request: PostKitRequest) -> dict:
+    """
+    Input variables of the separate per-part prompts for the same post.
+    """
+    brand = request.brand_presets
+    return {
+        "storyboard": storyboard_variables(StoryboardRequest(
+            idea=request.idea,
+            language=request.language,
+            number_of_shots=request.number_of_shots,
+            platform=request.platform,
+            brand_presets=brand,
+            cta=request.cta or "",
+        )),
+        "caption": caption_variables(CaptionRequest(
+            idea=request.idea,
+            platform=request.platform,
+            language=request.language,
+            hashtags_count=request.hashtags_count,
+            brand_presets=brand,
+        )),
+        "image": image_prompt_variables(ImageGenerationRequest(
+            prompt=request.image_prompt or request.idea,
+            style=request.style,
+            aspect_ratio=request.aspect_ratio,
+            brand_presets=brand,
+            platform=request.platform,
+        )),
+    }
+
+
+def post_kit_variables(request: PostKitRequest) -> dict:
+    brand = request.brand_presets
+    return {
+        "idea": request.idea,
+        "language": request.language or "English",
+        "number_of_shots": request.number_of_shots or 3,
+        "cta": request.cta or "tiktok",
+        "brand_name": brand.name,
+        "brand_tone": brand.tone,
+        "colors": ", ".join(brand.colors),
+        "platform": request.platform,
+        "hashtags_count": request.hashtags_count or 4,
+        "default_hashtags": ", ".join(brand.default_hashtags or []),
+        "image_prompt": request.image_prompt or request.idea,
+        "style": request.style or "realistic",
+        "aspect_ratio": request.aspect_ratio or "1:1",
+    }
+
+
+async def agenerate_post_kit(request: PostKitRequest) -> PostKitResponse:
+    """
+    Generates the storyboard, caption and image prompt of a post with one
+    Gemini call sharing a single brand preamble. Each part is validated on
+    its own; only parts that are missing or invalid are regenerated with
+    their separate prompt.
+    """
+    started = time.time()
+    variables = post_kit_variables(request)
+    per_part = part_variables(request)
+    llm_calls = 0
+
+    key = llm_cache.key(POST_KIT_PROMPT_TEMPLATE, variables, os.getenv("GOOGLE_LLM_MODEL"), PostKitDraft)
+    cached = await asyncio.to_thread(llm_cache.lookup, "post_kit", key, PostKitDraft) if request.use_cache else None
+
+    parts = {}
+    if cached is not None:
+        parts = {name: getattr(cached, name) for name in PARTS}
+    else:
+        llm_calls += 1
+        try:
+            draft = await aget_json_response(POST_KIT_PROMPT_TEMPLATE, variables, PostKitDraft, endpoint="post_kit")
+        except Exception as e:
+            logger.warning(f"Post kit generation failed, falling back to separate calls: {e}")
+            draft = {}
+        for name, (model, _, _) in PARTS.items():
+            try:
+                parts[name] = coerce_to_model((draft or {}).get(name), model)
+            except ValidationError as e:
+                logger.warning(f"Post kit part '{name}' is invalid, regenerating it: {e.error_count()} error(s)")
+
+    fallback_parts = [name for name in PARTS if name not in parts]
+    if fallback_parts:
+        try:
+            results = await asyncio.gather(*(
+                aget_structured_response(
+                    prompt_template_str=PARTS[name][1],
+                    input_variables=per_part[name],
+                    pydantic_model=PARTS[name][0],
+                    endpoint=PARTS[name][2],
+                    use_cache=request.use_cache,
+                )
+                for name in fallback_parts
+            ))
+        except Exception as e:
+            raise Exception(f"Failed to generate post kit: {e}")
+        llm_calls += len(fallback_parts)
+        parts.update(zip(fallback_parts, results))
+        for name in fallback_parts:
+            metrics.increment("post_kit_fallbacks_total", part=name)
+
+    if cached is None and not fallback_parts:
+        await asyncio.to_thread(llm_cache.save, "post_kit", key, PostKitDraft(**parts), time.time() - started)
+
+    prompt_tokens = 0 if cached is not None else estimate_prompt_tokens(POST_KIT_PROMPT_TEMPLATE, variables, PostKitDraft)
+    prompt_tokens += sum(estimate_prompt_tokens(PARTS[name][1], per_part[name], PARTS[name][0]) for name in fallback_parts)
+    three_call_tokens = sum(estimate_prompt_tokens(template, per_part[name], model) for name, (model, template, _) in PARTS.items())
+
+    latency = time.time() - started
+    metrics.observe("post_kit_latency_seconds", latency)
+    metrics.increment("post_kit_llm_calls_saved_total", len(PARTS) - llm_calls)
+    metrics.increment("post_kit_prompt_tokens_saved_total", three_call_tokens - prompt_tokens)
+
+    return PostKitResponse(
+        **parts,
+        report=PostKitReport(
+            llm_calls=llm_calls,
+            fallback_parts=fallback_parts,
+            latency_ms=round(latency * 1000, 1),
+            prompt_tokens_estimate=prompt_tokens,
+            three_call_prompt_tokens_estimate=three_call_tokens,
+        ),
+    )
@@ -1,5 +1,6 @@
+import logging
 from datetime import datetime, timezone
-from infrastructure.celery_app import celery_app
+from infrastructure.celery_app import celery_app, eta_beyond_visibility_timeout
 from domain.schedule_dto import (
 	ScheduleReminderRequest,
 	ScheduleReminderResponse,
@@ -8,6 +9,7 @@ from domain.schedule_dto import (
 )
 from repository import schedule_repository
 
+logger = logging.getLogger("schedule_service")
 
 class SchedulePostUsecase:
     def __init__(self, taskQueue):
@@ -36,6 +38,8 @@ def schedule_reminder_service(payload: ScheduleReminderRequest) -> ScheduleRemin
 		run_at_utc = run_at_utc.astimezone(timezone.utc)
 
 	eta = run_at_utc
+	if eta_beyond_visibility_timeout(eta):
+		logger.warning(f"Reminder for {payload.asset_id} is due after CELERY_VISIBILITY_TIMEOUT and may be sent twice")
 	async_result = celery_app.send_task(
 		"usecases.tasks.send_reminder",
 		kwargs={
@@ -1,33 +1,44 @@
-from infrastructure.celery_app import celery_app
-from infrastructure.storage_service import upload_file, get_download_url
-from infrastructure.stable_horde_service import StableHordeService
-from dotenv import load_dotenv
-import os
-import requests
-import tempfile
-import uuid
-import ffmpeg
-import logging
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
 import ffmpeg
 import os
 import logging
-import requests
+import httpx
 import datetime
 import io
 import tempfile
+import time
 import uuid
 from typing import Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from PIL import Image, UnidentifiedImageError
+from celery.exceptions import Ignore
+from domain.videos_dto import RenderProfile
 from infrastructure.celery_app import celery_app
-from infrastructure.storage_service import upload_file, get_download_url
+from infrastructure.http_client import get_client
+from infrastructure.image_storage import build_render_image_result
+from infrastructure.media_cache import MediaLease, media_cache
+from infrastructure.media_probe import probe_video
+from infrastructure.metrics import metrics
+from infrastructure.stable_horde_service import StableHordeService
+from infrastructure.storage_service import MultipartUpload, get_download_url
+from repository import horde_job_repository, render_dedup_repository
+from repository.cache_repository import RedisCache, normalize_query
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# "async" hands Stable Horde jobs to infrastructure.horde_poller, "blocking" waits in the worker
+HORDE_POLL_MODE = os.getenv("STABLE_HORDE_POLL_MODE", "async")
+
+# The io worker's threads pool enforces no time_limit/soft_time_limit, so
+# tasks there bound themselves: a blocking render_image gives up waiting on
+# Stable Horde this many seconds after it started, and publish_post's
+# requests time out after PUBLISH_HTTP_TIMEOUT
+RENDER_IMAGE_DEADLINE = float(os.getenv("RENDER_IMAGE_DEADLINE", "780"))
+PUBLISH_HTTP_TIMEOUT = httpx.Timeout(60, connect=5)
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("tasks")
 logger.setLevel(logging.INFO)
 if not logger.hasHandlers():
@@ -42,8 +53,25 @@ if not logger.hasHandlers():
 MAX_INSTAGRAM_WIDTH = 6000
 MAX_INSTAGRAM_HEIGHT = 6000
 
+AYRSHARE_POST_URL = os.getenv("AYRSHARE_POST_URL", "https://api.ayrshare.com/api/post")
+
+# Upper bound on concurrent Pixabay/Freesound lookups per render
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "8"))
 
-@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3})
+# Fragmented MP4 needs no seekable output, so ffmpeg can write it to a pipe
+FRAGMENTED_MP4_FLAGS = "frag_keyframe+empty_moov+default_base_moof"
+
+# Pixabay/Freesound results keyed by normalized query; served stale while refreshing
+search_cache = RedisCache(
+    "search",
+    fresh_ttl=int(os.getenv("SEARCH_CACHE_TTL", "21600")),
+    stale_ttl=int(os.getenv("SEARCH_CACHE_STALE_TTL", "86400")),
+    max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "10000")),
+)
+
+
+# Acknowledged on receipt: redelivering a post that may already be out would publish it twice
+@celery_app.task(bind=True, autoretry_for=(Exception,), retry_kwargs={"max_retries": 3}, acks_late=False)
 def publish_post(self, post_data: Dict):
     API_KEY = os.getenv("AYRSHARE_API_KEY")
     logger.info(f"Loaded AYRSHARE_API_KEY: {API_KEY}")
@@ -79,7 +107,7 @@ def publish_post(self, post_data: Dict):
 
     # --- Image Resizing Logic ---
     try:
-        image_response = requests.get(media_url)
+        image_response = get_client().get(media_url, timeout=PUBLISH_HTTP_TIMEOUT)
         image_response.raise_for_status()
 
         image_buffer = io.BytesIO(image_response.content)
@@ -118,24 +146,26 @@ def publish_post(self, post_data: Dict):
                     f"image/{img.format.lower()}",
                 )
             }
-            response = requests.post(
-                "https://api.ayrshare.com/api/post",
+            response = get_client().post(
+                AYRSHARE_POST_URL,
                 headers={"Authorization": f"Bearer {API_KEY}"},
                 data=payload,
                 files=files,
+                timeout=PUBLISH_HTTP_TIMEOUT,
             )
         else:
             payload["mediaUrls"] = [media_url]
-            response = requests.post(
-                "https://api.ayrshare.com/api/post",
+            response = get_client().post(
+                AYRSHARE_POST_URL,
                 headers={
                     "Authorization": f"Bearer {API_KEY}",
                     "Content-Type": "application/json",
                 },
                 json=payload,
+                timeout=PUBLISH_HTTP_TIMEOUT,
             )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Error downloading or posting image: {e}")
         raise self.retry(exc=e)
 
@@ -154,8 +184,15 @@ def publish_post(self, post_data: Dict):
 
 
 def prepare_music(music_desc: str):
+    return search_cache.get_or_fetch(
+        search_cache.key("freesound", normalize_query(music_desc), "preview-lq-mp3"),
+        lambda: _search_music(music_desc),
+    )
+
+
+def _search_music(music_desc: str) -> Optional[str]:
     url = os.getenv("FREESOUND_SEARCH_URL")
-    response = requests.get(
+    response = get_client().get(
         url,
         params={
             "query": music_desc,
@@ -163,96 +200,315 @@ def prepare_music(music_desc: str):
             "fields": "previews",
         },
     )
+    response.raise_for_status()
     results = response.json()["results"]
     if len(results) > 0:
-        music_url = response.json()["results"][0]["previews"]["preview-lq-mp3"]
-        return music_url
+        return results[0]["previews"]["preview-lq-mp3"]
+    return None
+
+
+def search_clip(query: str) -> Optional[str]:
+    """
+    Returns the URL of the first Pixabay video matching the query, if any.
+    Results are shared across renders through the Redis search cache.
+    """
+    return search_cache.get_or_fetch(
+        search_cache.key("pixabay", normalize_query(query), "tiny"),
+        lambda: _search_pixabay(query),
+    )
+
+
+def _search_pixabay(query: str) -> Optional[str]:
+    url = os.getenv("PIXABAY_VIDEO_URL")
+    response = get_client().get(
+        url, params={"key": os.getenv("PIXABAY_API_KEY"), "q": query}
+    )
+    response.raise_for_status()
+    hits = response.json()["hits"]
+    if len(hits) > 0:
+        return hits[0]["videos"]["tiny"]["url"]
     return None
 
 
+def normalize_clip(stream, profile: RenderProfile):
+    """
+    Scales and crops a clip to fill the profile's frame, then normalizes fps.
+    """
+    width, height = profile.resolution()
+    stream = stream.filter(
+        "scale", width, height, force_original_aspect_ratio="increase"
+    ).filter("crop", width, height)
+    stream = stream.filter("setsar", 1)
+    if profile.fps:
+        stream = stream.filter("fps", fps=profile.fps)
+    return stream
+
+
+def encoder_options(profile: RenderProfile) -> dict:
+    options = {
+        "vcodec": "libx264",
+        "preset": profile.preset,
+        "crf": profile.crf,
+        "pix_fmt": "yuv420p",
+    }
+    if profile.threads is not None:
+        options["threads"] = profile.threads
+    return options
+
+
+def can_stream_copy(clip_paths: list[str], durations: list[int], profile: RenderProfile) -> bool:
+    """
+    True when every clip is already what the re-encode would produce:
+    H.264/yuv420p at exactly the profile's resolution, and at its frame rate
+    when one is set, with one shared time base. Such clips can be joined by
+    the concat demuxer without decoding.
+
+    Cutting a clip short without decoding is only clean when it has no
+    B-frames; otherwise the packets around the outpoint overlap the next
+    clip's timestamps, so such clips must be used whole.
+    """
+    infos = [probe_video(path) for path in clip_paths]
+    if not infos or any(info is None for info in infos):
+        return False
+    if len({info.stream_signature() for info in infos}) != 1:
+        return False
+    if any(info.has_b_frames and info.needs_cut(duration) for info, duration in zip(infos, durations)):
+        return False
+
+    info = infos[0]
+    width, height = profile.resolution()
+    return (
+        info.codec == "h264"
+        and info.pix_fmt == "yuv420p"
+        and (info.width, info.height) == (width, height)
+        and (not profile.fps or info.fps == profile.fps)
+    )
+
+
+@contextmanager
+def render_graph(
+    clip_paths: list[str],
+    durations: list[int],
+    music_path: Optional[str],
+    profile: RenderProfile,
+    target: str,
+    **output_options,
+):
+    """
+    Yields the ffmpeg output node rendering the clips to ``target`` (a file
+    path or "pipe:1"), taking the stream-copy path when the clips allow it.
+    """
+    if can_stream_copy(clip_paths, durations, profile):
+        metrics.increment("render_path_total", path="stream_copy")
+        list_path = _write_concat_list(clip_paths, durations)
+        try:
+            yield _stream_copy_output(list_path, music_path, target, **output_options)
+        finally:
+            os.remove(list_path)
+    else:
+        metrics.increment("render_path_total", path="reencode")
+        yield _reencode_output(clip_paths, durations, music_path, profile, target, **output_options)
+
+
 def stitch_clips(
-    clip_urls: list[str], durations: list[int], output_file: str, music_url: str = None
+    clip_paths: list[str],
+    durations: list[int],
+    output_file: str,
+    music_path: str = None,
+    profile: Optional[RenderProfile] = None,
 ):
     """
     Stitches individual clips and adds background music
     """
-    # Create normalized streams
-    inputs = []
-    for i, url in enumerate(clip_urls):
-        stream = ffmpeg.input(url, ss=0, t=durations[i])
-        stream = stream.filter("scale", 1280, 720)
-        inputs.append(stream)
-
-    # Concatenate all video streams
-    video_stream = ffmpeg.concat(*inputs, v=1, a=0).node[0]
-
-    if music_url:
-        audio_stream = ffmpeg.input(music_url)
-        # Use amix to loop audio to match video duration
-        mixed_audio = ffmpeg.filter(
-            [audio_stream], "amix", inputs=1, duration="first", dropout_transition=0
+    with render_graph(clip_paths, durations, music_path, profile or RenderProfile(), output_file) as out:
+        ffmpeg.run(out, overwrite_output=True)
+
+
+def stream_video_to_storage(
+    clip_paths: list[str],
+    durations: list[int],
+    music_path: Optional[str],
+    profile: RenderProfile,
+    object_name: str,
+    bucket_name: str,
+) -> str:
+    """
+    Renders fragmented MP4 to ffmpeg's stdout and uploads it as a multipart
+    upload while encoding is still running. A failed render aborts the upload.
+    """
+    with render_graph(
+        clip_paths, durations, music_path, profile, "pipe:1", format="mp4", movflags=FRAGMENTED_MP4_FLAGS
+    ) as out:
+        upload = MultipartUpload(object_name, bucket_name, content_type="video/mp4")
+        process = ffmpeg.run_async(out, pipe_stdout=True)
+        try:
+            upload.upload_from(process.stdout)
+            if process.wait() != 0:
+                raise Exception(f"ffmpeg exited with status {process.returncode}")
+            return upload.complete()
+        except Exception:
+            process.kill()
+            process.wait()
+            upload.abort()
+            raise
+
+
+def _write_concat_list(clip_paths: list[str], durations: list[int]) -> str:
+    with tempfile.NamedTemporaryFile("w", delete=False, suffix=".txt") as concat_list:
+        for path, duration in zip(clip_paths, durations):
+            escaped = path.replace("'", "'\\''")
+            concat_list.write(f"file '{escaped}'\n")
+            if probe_video(path).needs_cut(duration):
+                concat_list.write(f"outpoint {duration}\n")
+        return concat_list.name
+
+
+def _stream_copy_output(list_path: str, music_path: Optional[str], target: str, **output_options):
+    """
+    Joins compatible clips with the concat demuxer, copying the video
+    packets as they are; only the music is encoded.
+    """
+    video_stream = ffmpeg.input(list_path, format="concat", safe=0).video
+    if music_path:
+        audio_stream = ffmpeg.input(music_path, stream_loop=-1).audio
+        return ffmpeg.output(
+            video_stream, audio_stream, target, vcodec="copy", acodec="aac", shortest=None, **output_options
         )
-        out = ffmpeg.output(
+    return ffmpeg.output(video_stream, target, vcodec="copy", **output_options)
+
+
+def _reencode_output(
+    clip_paths: list[str],
+    durations: list[int],
+    music_path: Optional[str],
+    profile: RenderProfile,
+    target: str,
+    **output_options,
+):
+    """
+    Decodes every clip, normalizes it to the profile's frame and re-encodes.
+    """
+    # Create normalized streams. ffmpeg-python merges identical nodes, so a
+    # clip used several times with the same duration is decoded once and split.
+    uses = {}
+    for key in zip(clip_paths, durations):
+        uses[key] = uses.get(key, 0) + 1
+
+    sources = {}
+    for (path, duration), count in uses.items():
+        stream = normalize_clip(ffmpeg.input(path, ss=0, t=duration), profile)
+        if count > 1:
+            split = stream.filter_multi_output("split", count)
+            sources[(path, duration)] = [split.stream(i) for i in range(count)]
+        else:
+            sources[(path, duration)] = [stream]
+
+    inputs = [sources[key].pop(0) for key in zip(clip_paths, durations)]
+
+    # Concatenate all video streams; a single clip needs no concat node
+    if len(inputs) > 1:
+        video_stream = ffmpeg.concat(*inputs, v=1, a=0).node[0]
+    else:
+        video_stream = inputs[0]
+
+    if music_path:
+        # Loop the track so it always covers the video; -shortest ends it with the video
+        audio_stream = ffmpeg.input(music_path, stream_loop=-1).audio
+        return ffmpeg.output(
             video_stream,
-            mixed_audio,
-            output_file,
-            vcodec="libx264",
+            audio_stream,
+            target,
             acodec="aac",
             shortest=None,
+            **encoder_options(profile),
+            **output_options,
         )
-    else:
-        out = ffmpeg.output(video_stream, output_file, vcodec="libx264", acodec="aac")
+    return ffmpeg.output(video_stream, target, **encoder_options(profile), **output_options)
 
-    # Run the ffmpeg pipeline
-    ffmpeg.run(out, overwrite_output=True)
+
+def serve_video(
+    clips: list[str],
+    durations: list[int],
+    music_path: Optional[str],
+    profile: Optional[RenderProfile] = None,
+    object_name: Optional[str] = None,
+):
+    """
+    Store the generated video and return the render_video task result: just
+    its object key, the download URL is presigned whenever the task is read
+    """
+    object_name = object_name or f"video_{uuid.uuid4()}.mp4"
+    stream_video_to_storage(
+        clips, durations, music_path, profile or RenderProfile(), object_name, "videos"
+    )
+    return {"video_key": object_name}
 
 
-def serve_video(clips: list[str], durations: list[int], music_desc: str):
+def fetch_clip(query: str, lease: MediaLease) -> Optional[str]:
     """
-    Store and generate download link for the generated videos
+    Resolves a shot's search term to a locally cached clip file, if one is found.
     """
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as tmp_video:
-        output_path = tmp_video.name
+    clip_url = search_clip(query)
+    return lease.fetch(clip_url) if clip_url else None
 
-    try:
-        music_url = prepare_music(music_desc)
-        stitch_clips(clips, durations, output_path, music_url)
 
-        with open(output_path, "rb") as f:
-            object_name = f"video_{uuid.uuid4()}.mp4"
-            upload_file(f, object_name, "videos")
+def fetch_music(music_desc: str, lease: MediaLease) -> Optional[str]:
+    music_url = prepare_music(music_desc)
+    return lease.fetch(music_url) if music_url else None
 
-        download_url = get_download_url(object_name, "videos")
-        return download_url
 
-    finally:
-        if os.path.exists(output_path):
-            os.remove(output_path)
+def render_object_name(fingerprint: str) -> str:
+    return f"video_{fingerprint}.mp4"
 
 
 @celery_app.task(bind=True)
 def render_video(self, payload):
-    url = os.getenv("PIXABAY_VIDEO_URL")
-    clips = []
-    durations = []
-
-    for shot in payload["shots"]:
-        response = requests.get(
-            url, params={"key": os.getenv("PIXABAY_API_KEY"), "q": shot["text"]}
-        )
-        hits = response.json()["hits"]
-        if len(hits) > 0:
-            video_url = response.json()["hits"][0]["videos"]["tiny"]["url"]
-            clips.append(video_url)
-            durations.append(shot["duration"])
-    return serve_video(clips, durations, payload["music"])
+    fingerprint = payload.get("fingerprint")
+    try:
+        return _render_video(payload, render_object_name(fingerprint) if fingerprint else None)
+    except Exception:
+        # Let the next identical request start a fresh render
+        if fingerprint:
+            render_dedup_repository.release(fingerprint, self.request.id)
+        raise
 
 
+def _render_video(payload, object_name: Optional[str]):
+    shots = payload["shots"]
+
+    # One search round trip for the whole storyboard: the music lookup and
+    # every clip lookup run concurrently, bounded by SEARCH_CONCURRENCY.
+    # Each download starts as soon as its search returns and goes through
+    # the worker's media cache, so ffmpeg only ever reads local files; the
+    # lease keeps them from being evicted until the render is done.
+    with media_cache.lease() as lease:
+        with ThreadPoolExecutor(max_workers=min(SEARCH_CONCURRENCY, len(shots) + 1)) as executor:
+            music_future = executor.submit(fetch_music, payload["music"], lease)
+            # map() yields results in submission order, so shot order is kept
+            clip_paths = list(executor.map(lambda shot: fetch_clip(shot["text"], lease), shots))
+            music_path = music_future.result()
+
+        clips = []
+        durations = []
+        for shot, clip_path in zip(shots, clip_paths):
+            if clip_path:
+                clips.append(clip_path)
+                durations.append(shot["duration"])
+        profile = RenderProfile(**(payload.get("profile") or {}))
+        return serve_video(clips, durations, music_path, profile, object_name)
+
+
+# The limits only apply under a prefork pool; see RENDER_IMAGE_DEADLINE
 @celery_app.task(bind=True, time_limit=900, soft_time_limit=800)  # 15 min timeout
 def render_image(self, image_data):
     """
     Celery task to render an image using Stable Horde API.
+
+    In the default "async" poll mode the task only submits the generation and
+    hands the request ID to the shared horde poller, which stores the final
+    result under this task's ID. The worker slot is released immediately.
     """
+    started = time.time()
     try:
         logger.info(f"Starting render_image task with data: {image_data}")
 
@@ -265,7 +521,6 @@ def render_image(self, image_data):
         prompt = image_data["prompt_used"]
         style = image_data["style"]
         aspect_ratio = image_data["aspect_ratio"]
-        platform = image_data["platform"]
 
         logger.info(
             f"Extracted parameters - Prompt: {prompt[:50]}..., Style: {style}, Aspect: {aspect_ratio}"
@@ -281,10 +536,36 @@ def render_image(self, image_data):
             meta={"progress": 20, "message": "Submitting to Stable Horde"},
         )
 
+        if HORDE_POLL_MODE == "async":
+            request_id = stable_horde.submit_generation(
+                prompt=prompt, style=style, aspect_ratio=aspect_ratio
+            )
+            horde_job_repository.add(
+                horde_job_repository.HordeJob(
+                    request_id=request_id,
+                    task_id=self.request.id,
+                    image_data=image_data,
+                )
+            )
+            self.update_state(
+                state="PROCESSING",
+                meta={
+                    "progress": 30,
+                    "message": "Waiting for Stable Horde",
+                    "horde_request_id": request_id,
+                },
+            )
+            logger.info(f"Handed Stable Horde request {request_id} to the poller")
+            # The poller finalizes this task ID; don't let the worker overwrite it
+            raise Ignore()
+
         # Generate image using Stable Horde
         logger.info("Calling Stable Horde generate_image")
         result = stable_horde.generate_image(
-            prompt=prompt, style=style, aspect_ratio=aspect_ratio
+            prompt=prompt,
+            style=style,
+            aspect_ratio=aspect_ratio,
+            max_wait=max(0, RENDER_IMAGE_DEADLINE - (time.time() - started)),
         )
 
         logger.info(f"Stable Horde returned result: {result}")
@@ -294,24 +575,14 @@ def render_image(self, image_data):
             state="PROCESSING", meta={"progress": 90, "message": "Processing complete"}
         )
 
-        final_result = {
-            "status": "completed",
-            "image_url": result["image_url"],
-            "prompt_used": prompt,
-            "style": style,
-            "aspect_ratio": aspect_ratio,
-            "platform": platform,
-            "metadata": {
-                "seed": result.get("seed"),
-                "worker_id": result.get("worker_id"),
-                "worker_name": result.get("worker_name"),
-                "model": result.get("model"),
-            },
-        }
+        final_result = build_render_image_result(self.request.id, image_data, result)
 
         logger.info(f"Task completed successfully: {final_result}")
         return final_result
 
+    except Ignore:
+        raise
+
     except Exception as e:
         logger.error(f"Error in render_image task: {str(e)}", exc_info=True)
         self.update_state(
@@ -1,5 +1,57 @@
+import asyncio
+import os
+import time
+from typing import AsyncIterator, List, Optional
+
 from celery.result import AsyncResult
+from domain.tasks_dto import TaskStatusBatchRequest, TaskStatusBatchResponse, TaskStatusItem
 from infrastructure.celery_app import celery_app
+from infrastructure.metrics import metrics
+from infrastructure.storage_service import get_download_url
+from infrastructure.task_events import RESYNC, task_event_hub
+
+# States after which a task's status no longer changes
+TERMINAL_STATES = {"SUCCESS", "FAILURE", "REVOKED"}
+
+# Seconds between keep-alive events, and the longest a client may watch one task
+TASK_EVENTS_HEARTBEAT = float(os.getenv("TASK_EVENTS_HEARTBEAT", "15"))
+TASK_EVENTS_MAX_SECONDS = float(os.getenv("TASK_EVENTS_MAX_SECONDS", "1800"))
+
+
+def task_result_with_urls(result):
+    """
+    A finished render's result as clients see it. The backend only stores
+    object keys; download URLs are presigned here, on every read, so a
+    client is never handed an expired link. Results stored before that
+    (a URL, or an image dict with its URL) are returned as they are.
+    """
+    if isinstance(result, dict) and "video_key" in result:
+        return get_download_url(result["video_key"], "videos")
+    if isinstance(result, dict) and "image_key" in result:
+        readable = {key: value for key, value in result.items() if key != "image_key"}
+        readable["image_url"] = get_download_url(result["image_key"], "images")
+        return readable
+    return result
+
+
+def describe_task(status: str, result) -> dict:
+    """
+    Client-facing status of a task in ``status`` with backend ``result``
+    (the return value, or the update_state meta while in progress).
+    """
+    if status == "PENDING":
+        return {"status": "queued", "video_url": None}
+    if status == "SUCCESS":
+        return {"status": "ready", "video_url": task_result_with_urls(result)}
+    if status == "FAILURE":
+        return {"status": "failed", "video_url": None}
+
+    response = {"status": status}
+    if isinstance(result, dict):
+        for key in ("progress", "message"):
+            if key in result:
+                response[key] = result[key]
+    return response
 
 
 def get_task_status(task_id: str):
@@ -7,19 +59,112 @@ def get_task_status(task_id: str):
     Returns the status of a Celery task.
     """
     try:
+        metrics.increment("task_status_reads_total", source="poll")
         task_result = AsyncResult(task_id, app=celery_app)
+        return describe_task(task_result.status, task_result.result)
+    except Exception as e:
+        raise Exception(f"Failed to get task status: {e}")
+
 
-        status = task_result.status
+def task_status_item(task_id: str, meta: Optional[dict]) -> TaskStatusItem:
+    """
+    Compact status of a task from its raw result backend entry (None when
+    nothing is stored yet).
+    """
+    if meta is None:
+        return TaskStatusItem(task_id=task_id, status="queued")
+    state, result = meta.get("status"), meta.get("result")
 
-        if status == "PENDING":
-            response = {"status": "queued", "video_url": None}
-        elif status == "SUCCESS":
-            response = {"status": "ready", "video_url": task_result.get()}
-        elif status == "FAILURE":
-            response = {"status": "failed", "video_url": None}
-        else:
-            response = {"status": status}
+    if state == "SUCCESS":
+        item = TaskStatusItem(task_id=task_id, status="ready")
+        result = task_result_with_urls(result)
+        if isinstance(result, str):
+            item.video_url = result
+        elif isinstance(result, dict):
+            item.image_url = result.get("image_url")
+            item.metadata = result.get("metadata")
+        return item
+    if state == "FAILURE":
+        error = result.get("exc_message") if isinstance(result, dict) else result
+        if isinstance(error, list):
+            error = " ".join(map(str, error))
+        return TaskStatusItem(task_id=task_id, status="failed", error=str(error) if error else None)
 
-        return response
+    item = TaskStatusItem(task_id=task_id, status="queued" if state == "PENDING" else state)
+    if isinstance(result, dict):
+        item.progress = result.get("progress")
+        item.message = result.get("message")
+    return item
+
+
+def _read_metas(task_ids: List[str]) -> List[Optional[dict]]:
+    backend = celery_app.backend
+    if not hasattr(backend, "client"):
+        # Not the Redis backend: fall back to one read per task
+        return [backend.get_task_meta(task_id) for task_id in task_ids]
+    values = backend.client.mget([backend.get_key_for_task(task_id) for task_id in task_ids])
+    return [backend.decode_result(value) if value is not None else None for value in values]
+
+
+def get_task_statuses(request: TaskStatusBatchRequest) -> TaskStatusBatchResponse:
+    """
+    Statuses of many tasks with a single MGET against the result backend.
+    """
+    try:
+        task_ids = list(dict.fromkeys(request.task_ids))
+        metrics.increment("task_status_reads_total", len(task_ids), source="bulk")
+        metrics.observe("task_status_bulk_size", len(task_ids))
+        metas = dict(zip(task_ids, _read_metas(task_ids)))
+        return TaskStatusBatchResponse(
+            results=[task_status_item(task_id, metas[task_id]) for task_id in request.task_ids]
+        )
     except Exception as e:
-        raise Exception(f"Failed to get task status: {e}")
+        raise Exception(f"Failed to get task statuses: {e}")
+
+
+async def _read_status(task_id: str, source: str):
+    metrics.increment("task_status_reads_total", source=source)
+    task_result = AsyncResult(task_id, app=celery_app)
+    return await asyncio.to_thread(lambda: (task_result.status, task_result.result))
+
+
+async def watch_task(task_id: str) -> AsyncIterator[Optional[dict]]:
+    """
+    Yields the task's current status, then every change pushed by the result
+    backend, until the task finishes or TASK_EVENTS_MAX_SECONDS pass. Yields
+    None every TASK_EVENTS_HEARTBEAT seconds without a change so the caller
+    can keep the connection alive.
+
+    The status is read from the backend again at each heartbeat and after
+    the event listener reconnects, so a change published while nobody was
+    subscribed is picked up late rather than never.
+    """
+    async with task_event_hub.subscribe(task_id) as events:
+        # Subscribed before reading, so a state stored in between is not missed
+        status, result = await _read_status(task_id, "subscribe")
+        last = describe_task(status, result)
+        yield last
+        if status in TERMINAL_STATES:
+            return
+
+        deadline = time.monotonic() + TASK_EVENTS_MAX_SECONDS
+        while time.monotonic() < deadline:
+            try:
+                meta = await asyncio.wait_for(
+                    events.get(), min(TASK_EVENTS_HEARTBEAT, deadline - time.monotonic())
+                )
+                source = "resync"
+            except asyncio.TimeoutError:
+                meta, source = RESYNC, "heartbeat"
+            if meta is RESYNC:
+                status, result = await _read_status(task_id, source)
+            else:
+                status, result = meta.get("status"), meta.get("result")
+            current = describe_task(status, result)
+            if current != last:
+                last = current
+                yield current
+            elif source == "heartbeat":
+                yield None
+            if status in TERMINAL_STATES:
+                return
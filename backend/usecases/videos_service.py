@@ -1,7 +1,44 @@
-from domain.videos_dto import StoryboardRequest, StoryboardResponse, RenderRequest
-from infrastructure.ai_services import get_structured_response
+from domain.videos_dto import (
+    StoryboardRequest,
+    StoryboardResponse,
+    StoryboardBatchRequest,
+    StoryboardBatchItem,
+    StoryboardBatchResponse,
+    RenderRequest,
+)
+from infrastructure.ai_services import get_structured_response, aget_structured_response, abatch_structured_responses, astream_structured_response
 from templates.prompt_templates import STORYBOARD_PROMPT_TEMPLATE
-from usecases.tasks import render_video
+import hashlib
+import json
+import os
+import time
+import uuid
+from celery import states
+from celery.result import AsyncResult
+from infrastructure.celery_app import celery_app
+from infrastructure.metrics import metrics
+from infrastructure.render_dispatcher import enqueue_render
+from infrastructure.storage_service import PRESIGNED_URL_EXPIRY, get_download_url, object_age
+from repository import render_dedup_repository, render_queue_repository
+from repository.cache_repository import normalize_query
+from usecases.tasks import render_video, render_object_name
+
+# A claimed render still unfinished after this many seconds is presumed lost
+# (e.g. its worker was killed) and the next identical request starts afresh
+RENDER_DEDUP_STALE_AFTER = int(os.getenv("RENDER_DEDUP_STALE_AFTER", "1800"))
+
+
+def storyboard_variables(request: StoryboardRequest) -> dict:
+    return {
+        "idea": request.idea,
+        "language": request.language or "English",
+        "number_of_shots": request.number_of_shots or 3,
+        "brand_name": request.brand_presets.name,
+        "colors": ", ".join(request.brand_presets.colors),
+        "brand_tone": request.brand_presets.tone,
+        "platform": request.platform,
+        "cta": request.cta or "tiktok",
+    }
 
 
 def generate_storyboard(request: StoryboardRequest) -> StoryboardResponse:
@@ -10,32 +47,158 @@ def generate_storyboard(request: StoryboardRequest) -> StoryboardResponse:
     Generates a storyboard for a video based on the provided request.
     """
     try:
-        input_variables = {
-            "idea": request.idea,
-            "language": request.language or "English",
-            "number_of_shots": request.number_of_shots or 3,
-            "brand_name": request.brand_presets.name,
-            "colors": ", ".join(request.brand_presets.colors),
-            "brand_tone": request.brand_presets.tone,
-            "platform": request.platform,
-            "cta": request.cta or "tiktok",
-        }
-
         return get_structured_response(
             prompt_template_str=STORYBOARD_PROMPT_TEMPLATE,
-            input_variables=input_variables,
+            input_variables=storyboard_variables(request),
             pydantic_model=StoryboardResponse,
+            endpoint="storyboard",
+            use_cache=request.use_cache,
         )
     except Exception as e:
         raise Exception(f"Failed to generate storyboard: {e}")
 
 
+async def agenerate_storyboard(request: StoryboardRequest) -> StoryboardResponse:
+    """
+    Async generate_storyboard for the API.
+    """
+    try:
+        return await aget_structured_response(
+            prompt_template_str=STORYBOARD_PROMPT_TEMPLATE,
+            input_variables=storyboard_variables(request),
+            pydantic_model=StoryboardResponse,
+            endpoint="storyboard",
+            use_cache=request.use_cache,
+        )
+    except Exception as e:
+        raise Exception(f"Failed to generate storyboard: {e}")
+
+
+def astream_storyboard(request: StoryboardRequest):
+    """
+    Streams partial storyboard fields as Gemini writes them, then the validated storyboard.
+    """
+    return astream_structured_response(
+        prompt_template_str=STORYBOARD_PROMPT_TEMPLATE,
+        input_variables=storyboard_variables(request),
+        pydantic_model=StoryboardResponse,
+        endpoint="storyboard",
+        use_cache=request.use_cache,
+    )
+
+
+async def agenerate_storyboards_batch(request: StoryboardBatchRequest) -> StoryboardBatchResponse:
+    """
+    Generates a storyboard per item, in order; a failed item carries its error.
+    """
+    try:
+        results = await abatch_structured_responses(
+            prompt_template_str=STORYBOARD_PROMPT_TEMPLATE,
+            inputs=[storyboard_variables(item) for item in request.items],
+            pydantic_model=StoryboardResponse,
+            endpoint="storyboard",
+            use_cache=[item.use_cache for item in request.items],
+        )
+    except Exception as e:
+        raise Exception(f"Failed to generate storyboard batch: {e}")
+
+    return StoryboardBatchResponse(results=[
+        StoryboardBatchItem(index=i, error=f"Failed to generate storyboard: {result}")
+        if isinstance(result, Exception)
+        else StoryboardBatchItem(index=i, result=result)
+        for i, result in enumerate(results)
+    ])
+
+
+def render_fingerprint(request: RenderRequest) -> str:
+    """
+    Hash of everything that decides the rendered file: the normalized shot
+    texts and durations, the music description and the effective output
+    settings (so a platform and its explicit aspect ratio fingerprint alike).
+    """
+    width, height = request.profile.resolution()
+    canonical = {
+        "shots": [[normalize_query(shot.text), shot.duration] for shot in request.shots],
+        "music": normalize_query(request.music),
+        "output": [width, height, request.profile.preset, request.profile.crf, request.profile.fps],
+    }
+    return hashlib.sha256(
+        json.dumps(canonical, sort_keys=True, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
+def render_claim_is_stale(fingerprint: str, task_id: str) -> bool:
+    """
+    True when the render holding the claim will not finish: it failed or was
+    revoked without releasing the claim (its worker was killed), or it has
+    been with Celery for longer than RENDER_DEDUP_STALE_AFTER.
+
+    Time spent waiting in the fair queue does not count: a bulk render may
+    legitimately wait there for longer than the threshold.
+    """
+    state = AsyncResult(task_id, app=celery_app).state
+    if state in ("FAILURE", "REVOKED"):
+        return True
+    if state == "SUCCESS":
+        return False
+    if render_queue_repository.is_waiting(task_id):
+        return False
+    dispatched_at = render_queue_repository.dispatched_at(task_id)
+    if dispatched_at is not None:
+        age = time.time() - dispatched_at
+    else:
+        # Sent straight to Celery (RENDER_DISPATCH_MODE=direct) when claimed
+        age = render_dedup_repository.claim_age(fingerprint, PRESIGNED_URL_EXPIRY)
+    return age is not None and age > RENDER_DEDUP_STALE_AFTER
+
+
 def create_render_task(request: RenderRequest):
     """
     Renders a video based on the provided request.
+
+    Identical requests are de-duplicated: a render already stored in MinIO
+    is returned as a completed task, and a render still in flight is shared.
+    Both expire after PRESIGNED_URL_EXPIRY, like the download URLs.
     """
     try:
-        task = render_video.delay(request.model_dump())
-        return {"task_id": task.id, "status": "queued"}
+        fingerprint = render_fingerprint(request)
+        object_name = render_object_name(fingerprint)
+
+        age = object_age(object_name, "videos")
+        if age is not None and age < PRESIGNED_URL_EXPIRY:
+            task_id = str(uuid.uuid4())
+            # Stored like a finished render so /tasks/{task_id} answers as usual
+            celery_app.backend.store_result(task_id, {"video_key": object_name}, states.SUCCESS)
+            video_url = get_download_url(object_name, "videos")
+            metrics.increment("render_dedup_total", result="stored")
+            return {"task_id": task_id, "status": "ready", "video_url": video_url}
+
+        task_id = str(uuid.uuid4())
+        existing_task_id = render_dedup_repository.claim(fingerprint, task_id, PRESIGNED_URL_EXPIRY)
+        if existing_task_id and render_claim_is_stale(fingerprint, existing_task_id):
+            metrics.increment("render_dedup_total", result="stale")
+            existing_task_id = render_dedup_repository.take_over(
+                fingerprint, existing_task_id, task_id, PRESIGNED_URL_EXPIRY
+            )
+        if existing_task_id:
+            metrics.increment("render_dedup_total", result="inflight")
+            return {"task_id": existing_task_id, "status": "queued"}
+
+        metrics.increment("render_dedup_total", result="new")
+        payload = {**request.model_dump(), "fingerprint": fingerprint}
+        try:
+            # Fair share is by seconds of video, so long renders count for more
+            enqueue_render(
+                render_video,
+                [payload],
+                task_id,
+                request.tenant,
+                request.priority,
+                cost=sum(shot.duration for shot in request.shots),
+            )
+        except Exception:
+            render_dedup_repository.release(fingerprint, task_id)
+            raise
+        return {"task_id": task_id, "status": "queued"}
     except Exception as e:
         raise Exception(f"Failed to create render task: {e}")